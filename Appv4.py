@@ -1,13 +1,32 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-from io import BytesIO
+import time
+from functools import partial
+from animation import DEFAULT_FRAMES, DEFAULT_POINTS_PER_FRAME, animated_scatter
+from charts import correlation_heatmap_figure, distribution_figure
+from correlation import ANNOT_MAX_COLUMNS
+from data_cache import cache_stats_caption
+from downsampling import DEFAULT_POINT_BUDGET, LINE_METHODS, decimation_caption, downsample_line, downsample_scatter
+from filters import filter_panel
+from ingestion import UPLOAD_TYPES, columnar_columns, is_columnar, load_uploaded_file, to_parquet_bytes
+from pairplot import PAIRPLOT_SAMPLE_ROWS, pairplot_figure
+from profiling import finish_run, span, start_run
+from render import EXPORT_FORMATS, EXPORT_MIME_TYPES, figure_cache, figure_key
+from startup import lazy_import, start_prewarm
+from views import is_visible, lazy_tabs, render_view
+from webgl import RENDER_MODE_LABELS, RENDER_MODES, WEBGL_AUTO_ROWS, binary_columns, resolve_render_mode
+
+# Bibliothèques de graphiques, importées au premier graphique (voir startup.py)
+px = lazy_import("plotly.express")
 
 # Configuration de la page
 st.set_page_config(page_title="Easyviz", layout="wide")
 
+# Mesures de performance de cette exécution (?profile=1 ou EASYVIZ_PROFILE=1)
+start_run()
+
+# Préchargement des bibliothèques de graphiques en arrière-plan (une fois par processus)
+start_prewarm()
+
 # CSS pour ajouter un fond personnalisé
 st.markdown(
     """
@@ -28,13 +47,6 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Fonction pour télécharger des graphiques
-def download_plot(fig, filename="graphique.png"):
-    buf = BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight")
-    buf.seek(0)
-    return buf
-
 # Titre et logo de l'application
 st.image("Easyviz.png", width=350)
 st.markdown("""
@@ -45,30 +57,75 @@ Téléversez un fichier CSV pour explorer et visualiser vos données.
 """)
 
 # Téléverser un fichier CSV
-uploaded_file = st.file_uploader("📂 Téléversez un fichier CSV", type=["csv"])
+uploaded_file = st.file_uploader("📂 Téléversez un fichier CSV, Parquet ou Feather", type=UPLOAD_TYPES)
 
 if uploaded_file is not None:
     try:
         # Charger les données
-        data = pd.read_csv(uploaded_file)
+        compact = st.sidebar.checkbox("Mode compact (types réduits)", value=False)
+        columns = None
+        if is_columnar(uploaded_file):
+            # Projection de colonnes : seules les colonnes choisies sont lues
+            available_columns = columnar_columns(uploaded_file)
+            columns = st.sidebar.multiselect("Colonnes à charger :", available_columns, default=available_columns)
+        load = load_uploaded_file(uploaded_file, columns=columns, compact=compact)
+        if not load.done:
+            # Lecture en flux : aperçu dès le premier bloc, puis suivi de la progression
+            load.wait_for_preview()
+            st.subheader("Aperçu des données")
+            st.dataframe(load.preview, use_container_width=True)
+            st.caption("Colonnes : " + ", ".join(load.columns))
+            st.progress(load.progress, text=f"Chargement en cours : {load.rows_read:,} lignes lues")
+            time.sleep(0.5)
+            st.rerun()
+        data = load.result()
+        if load.memory_report is not None:
+            with st.expander("Mémoire par colonne (mode compact)"):
+                st.dataframe(load.memory_report, use_container_width=True)
+        st.sidebar.caption(cache_stats_caption())
+        st.sidebar.caption(cache_stats_caption(figure_cache, label="Cache des graphiques"))
+        if st.sidebar.button("Vider le cache des graphiques"):
+            figure_cache.clear()
+        if not is_columnar(uploaded_file):
+            # Conversion en Parquet, générée uniquement au clic
+            st.sidebar.download_button(
+                label="Convertir en Parquet",
+                data=partial(to_parquet_bytes, data),
+                file_name=uploaded_file.name.rsplit(".", 1)[0] + ".parquet",
+                mime="application/octet-stream"
+            )
         st.success("Fichier téléversé avec succès !")
         
         # Aperçu des données
         st.subheader("Aperçu des données")
         st.dataframe(data.head(), use_container_width=True)
+
+        # Filtres de lignes (index construits une fois par jeu de données) : tous les onglets utilisent la vue filtrée
+        data, data_key = filter_panel(data, load.key)
         
         # Colonnes disponibles
         all_columns = data.columns.tolist()
-        numeric_columns = data.select_dtypes(include=["float64", "int64"]).columns.tolist()
+        numeric_columns = data.select_dtypes(include="number").columns.tolist()
 
         # Interface de sélection des axes
         with st.sidebar:
             st.header("Paramètres de visualisation")
             x_column = st.selectbox("Sélectionnez les données pour l'axe X :", all_columns, index=0)
             y_column = st.selectbox("Sélectionnez les données pour l'axe Y :", numeric_columns, index=0 if numeric_columns else -1)
+            full_resolution = st.checkbox("Pleine résolution (sans décimation)", value=False)
+            point_budget = st.number_input(
+                "Nombre maximal de points par graphique :", min_value=500, max_value=1_000_000,
+                value=DEFAULT_POINT_BUDGET, step=500
+            )
+            export_format = st.selectbox("Format de téléchargement :", EXPORT_FORMATS, format_func=str.upper)
+            prefetch_views = st.checkbox("Précalculer les autres onglets en arrière-plan", value=False)
+            webgl_threshold = st.number_input(
+                "Rendu WebGL automatique au-delà de (points) :", min_value=1_000, max_value=10_000_000,
+                value=WEBGL_AUTO_ROWS, step=1_000
+            )
 
-        # Ajouter des onglets pour différents graphiques
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        # Ajouter des onglets pour différents graphiques (seul l'onglet affiché est calculé)
+        tab1, tab2, tab3, tab4, tab5 = lazy_tabs([
             "📈 Graphique de distribution",
             "📊 Scatterplot animé",
             "📉 Graphique en ligne animé",
@@ -77,88 +134,168 @@ if uploaded_file is not None:
         ])
 
         # 1. Graphique de distribution
-        with tab1:
+        with tab1, span("onglet distribution"):
             st.subheader("📈 Graphique de distribution")
             if y_column:
                 bins = st.slider("Nombre de classes (bins) :", min_value=5, max_value=50, value=10)
-                fig, ax = plt.subplots()
-                sns.histplot(data[y_column], kde=True, bins=bins, ax=ax)
-                ax.set_title(f"Distribution de {y_column}")
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig),
-                    file_name="distribution.png",
-                    mime="image/png"
+                rendered = render_view(
+                    tab1, figure_key(data_key, "distribution", y_column, bins),
+                    partial(distribution_figure, data, y_column, bins, dataset_key=data_key), prefetch_views
                 )
+                if rendered is not None:
+                    st.image(rendered.png, use_container_width=True)
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"distribution.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
 
         # 2. Scatterplot animé
-        with tab2:
+        with tab2, span("onglet scatterplot"):
             st.subheader("📊 Scatterplot animé")
-            if x_column and y_column:
-                fig = px.scatter(
-                    data, x=x_column, y=y_column,
-                    animation_frame=x_column if x_column in numeric_columns else None,
-                    title=f"Scatterplot : {y_column} vs {x_column}",
-                    color=y_column if y_column in numeric_columns else None,
-                    template="plotly_white"
+            if x_column and y_column and x_column in numeric_columns:
+                # Animation selon X, découpée en trames de taille bornée
+                n_frames = st.slider("Nombre de trames :", min_value=5, max_value=100, value=DEFAULT_FRAMES)
+                points_per_frame = st.number_input(
+                    "Nombre maximal de points par trame :", min_value=100, max_value=100_000,
+                    value=DEFAULT_POINTS_PER_FRAME, step=100
                 )
-                st.plotly_chart(fig)
+                scatter_mode = st.radio(
+                    "Rendu :", RENDER_MODES, horizontal=True, key="scatter_render_mode",
+                    format_func=RENDER_MODE_LABELS.get
+                )
+                if is_visible(tab2):
+                    if full_resolution:
+                        points_per_frame = len(data)
+                    # Une seule trame est affichée à la fois
+                    fig, shown = animated_scatter(
+                        data, x_column, y_column, frame_column=x_column,
+                        color_column=y_column if y_column in numeric_columns else None,
+                        n_frames=n_frames, points_per_frame=points_per_frame,
+                        title=f"Scatterplot : {y_column} vs {x_column}",
+                        template="plotly_white",
+                        render_mode=resolve_render_mode(scatter_mode, min(points_per_frame, len(data)), webgl_threshold)
+                    )
+                    with span("encodage Plotly"):
+                        st.plotly_chart(fig)
+                    if shown < len(data):
+                        st.caption(decimation_caption(shown, len(data)))
+            elif x_column and y_column:
+                scatter_mode = st.radio(
+                    "Rendu :", RENDER_MODES, horizontal=True, key="scatter_render_mode",
+                    format_func=RENDER_MODE_LABELS.get
+                )
+                if is_visible(tab2):
+                    plot_data = data if full_resolution else downsample_scatter(data, x_column, y_column, point_budget)
+                    fig = px.scatter(
+                        binary_columns(plot_data, [x_column, y_column]), x=x_column, y=y_column,
+                        title=f"Scatterplot : {y_column} vs {x_column}",
+                        color=y_column if y_column in numeric_columns else None,
+                        template="plotly_white",
+                        render_mode=resolve_render_mode(scatter_mode, len(plot_data), webgl_threshold)
+                    )
+                    with span("encodage Plotly"):
+                        st.plotly_chart(fig)
+                    if len(plot_data) < len(data):
+                        st.caption(decimation_caption(len(plot_data), len(data)))
 
         # 3. Graphique en ligne animé
-        with tab3:
+        with tab3, span("onglet ligne"):
             st.subheader("📉 Graphique en ligne animé")
             if x_column and y_column:
-                fig = px.line(
-                    data, x=x_column, y=y_column,
-                    title=f"Graphique en ligne : {y_column} vs {x_column}",
-                    markers=True,
-                    template="plotly_white"
+                line_mode = st.radio(
+                    "Rendu :", RENDER_MODES, horizontal=True, key="line_render_mode",
+                    format_func=RENDER_MODE_LABELS.get
+                )
+                line_method = st.radio(
+                    "Décimation :", list(LINE_METHODS), horizontal=True, format_func=LINE_METHODS.get
                 )
-                st.plotly_chart(fig)
+                if is_visible(tab3):
+                    plot_data = data if full_resolution else downsample_line(
+                        data, x_column, y_column, point_budget, method=line_method
+                    )
+                    fig = px.line(
+                        binary_columns(plot_data, [x_column, y_column]), x=x_column, y=y_column,
+                        title=f"Graphique en ligne : {y_column} vs {x_column}",
+                        markers=True,
+                        template="plotly_white",
+                        render_mode=resolve_render_mode(line_mode, len(plot_data), webgl_threshold)
+                    )
+                    with span("encodage Plotly"):
+                        st.plotly_chart(fig)
+                    if len(plot_data) < len(data):
+                        st.caption(decimation_caption(len(plot_data), len(data)))
 
         # 4. Pairplot
-        with tab4:
+        with tab4, span("onglet pairplot"):
             st.subheader("📚 Pairplot")
             pairplot_columns = st.multiselect(
                 "Sélectionnez des colonnes pour le Pairplot (2 minimum) :", numeric_columns, default=numeric_columns[:2]
             )
             if len(pairplot_columns) >= 2:
-                fig = sns.pairplot(data[pairplot_columns])
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig.fig),
-                    file_name="pairplot.png",
-                    mime="image/png"
+                pairplot_mode = "sample"
+                sample_size = len(data) if full_resolution else PAIRPLOT_SAMPLE_ROWS
+                if len(data) > sample_size:
+                    pairplot_mode = st.radio(
+                        "Panneaux hors diagonale :", ["sample", "hist2d"], horizontal=True,
+                        format_func=lambda mode: "Échantillon de lignes" if mode == "sample" else "Histogramme 2D"
+                    )
+                rendered = render_view(
+                    tab4, figure_key(data_key, "pairplot", pairplot_columns, pairplot_mode, sample_size),
+                    partial(pairplot_figure, data, pairplot_columns, mode=pairplot_mode, sample_size=sample_size),
+                    prefetch_views
                 )
+                if rendered is not None:
+                    st.image(rendered.png, use_container_width=True)
+                    if pairplot_mode == "sample" and len(data) > sample_size:
+                        st.caption(decimation_caption(sample_size, len(data)))
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"pairplot.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
 
         # 5. Heatmap des corrélations
-        with tab5:
+        with tab5, span("onglet heatmap"):
             st.subheader("🌀 Heatmap des corrélations")
             if len(numeric_columns) > 1:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                corr = data[numeric_columns].corr()
-                sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
-                ax.set_title("Matrice de corrélation")
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig),
-                    file_name="heatmap.png",
-                    mime="image/png"
+
+                corr_method = st.radio(
+                    "Coefficient :", ["pearson", "spearman"], horizontal=True,
+                    format_func=lambda method: "Pearson" if method == "pearson" else "Spearman (rangs)"
                 )
+                reorder = st.checkbox(
+                    "Regrouper les variables corrélées", value=len(numeric_columns) > ANNOT_MAX_COLUMNS
+                )
+                rendered = render_view(
+                    tab5, figure_key(data_key, "heatmap", numeric_columns, corr_method, reorder),
+                    partial(correlation_heatmap_figure, data, numeric_columns, method=corr_method, reorder=reorder),
+                    prefetch_views
+                )
+                if rendered is not None:
+                    st.image(rendered.png, use_container_width=True)
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"heatmap.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
     except Exception as e:
         st.error(f"Erreur lors de la lecture du fichier : {e}")
 else:
     st.info("Veuillez téléverser un fichier CSV pour commencer.")            
 
+# Détail des performances de l'exécution (si les mesures sont activées)
+finish_run()
+
 # Pied de page
 st.markdown("---")
 st.markdown("Créé avec ❤️ par Jinshan LI,Karim OURDEDINE,Ines BEN MOUSSA,Moyi ZHANG")
\ No newline at end of file
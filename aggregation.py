@@ -0,0 +1,168 @@
+"""Moyennes par groupe et intervalles de confiance, sans bootstrap par défaut.
+
+``sns.barplot`` et ``sns.lineplot`` regroupent les lignes par valeur de X et
+estiment l'intervalle de confiance à 95 % de chaque moyenne par 1000
+rééchantillonnages (bootstrap) : sur un million de lignes, plusieurs minutes.
+Ici, effectif, moyenne et écart-type de chaque groupe sont calculés en une
+passe vectorisée (``np.bincount``) et l'intervalle s'en déduit par
+approximation normale. Au-delà de ``GROUP_MAX_KEYS`` valeurs distinctes, un X
+numérique est d'abord regroupé en ``GROUP_BINS`` classes de même largeur.
+
+Le bootstrap reste disponible sur demande : chaque rééchantillonnage tire les
+lignes de tous les groupes à la fois, et les rééchantillonnages sont répartis
+sur le groupe de processus du pairplot.
+"""
+import os
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from pairplot import get_pool
+
+# Au-delà de ce nombre de valeurs distinctes, un X numérique est regroupé en classes
+GROUP_MAX_KEYS = 200
+
+# Nombre de classes de même largeur d'un X numérique regroupé
+GROUP_BINS = 100
+
+# Quantile de la loi normale pour un intervalle de confiance à 95 %
+Z_95 = 1.96
+
+# Nombre de rééchantillonnages du bootstrap (celui de seaborn)
+DEFAULT_BOOTSTRAP = 1000
+
+# Nombre de tirages (lignes × rééchantillonnages) à partir duquel le bootstrap
+# est réparti sur le groupe de processus
+BOOTSTRAP_PARALLEL_MIN_DRAWS = 50_000_000
+
+
+def bin_edges(low, high, bins=GROUP_BINS):
+    """Bornes de ``bins`` classes de même largeur entre ``low`` et ``high``."""
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def group_codes(keys, edges=None):
+    """Numéro de groupe de chaque ligne (-1 si X manque) et valeur de X de chaque groupe.
+
+    Sans ``edges``, un groupe par valeur distincte, dans l'ordre croissant ;
+    avec ``edges``, un groupe par classe, représenté par le centre de la classe.
+    """
+    if edges is None:
+        codes, uniques = pd.factorize(keys, sort=True, use_na_sentinel=True)
+        return codes, np.asarray(uniques)
+    values = keys.to_numpy(dtype=np.float64, na_value=np.nan)
+    n_bins = len(edges) - 1
+    positions = (values - edges[0]) / (edges[-1] - edges[0]) * n_bins
+    with np.errstate(invalid="ignore"):
+        codes = np.clip(positions, 0, n_bins - 1).astype(np.int64)
+    codes[np.isnan(values)] = -1
+    return codes, (edges[:-1] + edges[1:]) / 2
+
+
+def _valid_rows(codes, values):
+    valid = (codes >= 0) & ~np.isnan(values)
+    return codes[valid], values[valid]
+
+
+def group_moments(keys, values, edges=None):
+    """Effectif, moyenne et écart-type de ``values`` par groupe de ``keys``.
+
+    Renvoie un DataFrame (``keys.name``, count, mean, std) trié par X, sans
+    les groupes vides, comme ``groupby(...).agg(["count", "mean", "std"])``.
+    """
+    codes, uniques = group_codes(keys, edges)
+    codes, y = _valid_rows(codes, values.to_numpy(dtype=np.float64, na_value=np.nan))
+    n_groups = len(uniques)
+    counts = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.bincount(codes, weights=y, minlength=n_groups) / counts
+        # Écarts à la moyenne du groupe : pas de perte de précision comme avec Σy² − n·ȳ²
+        squares = np.bincount(codes, weights=(y - means[codes]) ** 2, minlength=n_groups)
+        stds = np.sqrt(squares / (counts - 1))
+    stds[counts < 2] = np.nan
+    present = counts > 0
+    return pd.DataFrame({
+        keys.name: uniques[present],
+        "count": counts[present].astype(np.int64),
+        "mean": means[present],
+        "std": stds[present],
+    })
+
+
+def normal_interval(stats, z=Z_95):
+    """Bornes (basse, haute) de l'intervalle de confiance de chaque moyenne (approximation normale)."""
+    counts = stats["count"].to_numpy(dtype=np.float64)
+    means = stats["mean"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        errors = z * stats["std"].to_numpy(dtype=np.float64, na_value=np.nan) / np.sqrt(counts)
+    return means - errors, means + errors
+
+
+def _bootstrap_means(codes, y, n_groups, n_boot, seed):
+    """Moyennes par groupe de ``n_boot`` rééchantillonnages (une ligne par rééchantillonnage).
+
+    Les lignes sont triées par groupe : chaque groupe est rééchantillonné dans
+    sa propre plage de lignes, tous les groupes en un seul tirage.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    row_starts, row_counts = starts[codes], counts[codes].astype(np.float64)
+    means = np.empty((n_boot, n_groups))
+    for b in range(n_boot):
+        rows = rng.random(len(codes))
+        rows *= row_counts
+        rows = rows.astype(np.int64)
+        rows += row_starts
+        # Groupes non vides et lignes triées par groupe : une somme par plage contiguë
+        means[b] = np.add.reduceat(y[rows], starts) / counts
+    return means
+
+
+def _bootstrap_task(path, n_groups, n_boot, seed):
+    # Lignes lues par projection mémoire : rien n'est copié entre processus
+    values = np.load(path, mmap_mode="r")
+    return _bootstrap_means(values[0].astype(np.int64), np.asarray(values[1]), n_groups, n_boot, seed)
+
+
+def bootstrap_interval(keys, values, edges=None, n_boot=DEFAULT_BOOTSTRAP, level=95, seed=0, parallel=None):
+    """Intervalle de confiance par bootstrap de la moyenne de chaque groupe non vide.
+
+    Renvoie les bornes (basse, haute), dans l'ordre des lignes de
+    :func:`group_moments` pour les mêmes arguments.
+    """
+    codes, uniques = group_codes(keys, edges)
+    codes, y = _valid_rows(codes, values.to_numpy(dtype=np.float64, na_value=np.nan))
+    # Numérotation des seuls groupes non vides, puis tri des lignes par groupe
+    present = np.bincount(codes, minlength=len(uniques)) > 0
+    codes = (np.cumsum(present) - 1)[codes]
+    order = np.argsort(codes, kind="stable")
+    codes, y = codes[order], y[order]
+    n_groups = int(present.sum())
+    if n_groups == 0:
+        return np.empty(0), np.empty(0)
+
+    if parallel is None:
+        parallel = len(codes) * n_boot >= BOOTSTRAP_PARALLEL_MIN_DRAWS and (os.cpu_count() or 1) > 1
+    seeds = np.random.SeedSequence(seed).spawn(os.cpu_count() if parallel else 1)
+    shares = [len(part) for part in np.array_split(np.arange(n_boot), len(seeds))]
+    if parallel:
+        path = os.path.join(tempfile.gettempdir(), f"easyviz-bootstrap-{uuid.uuid4().hex}.npy")
+        np.save(path, np.vstack([codes.astype(np.float64), y]))
+        try:
+            futures = [
+                get_pool().submit(_bootstrap_task, path, n_groups, share, child)
+                for share, child in zip(shares, seeds) if share
+            ]
+            means = np.concatenate([future.result() for future in futures])
+        finally:
+            os.remove(path)
+    else:
+        means = _bootstrap_means(codes, y, n_groups, n_boot, seeds[0])
+    tail = (100 - level) / 2
+    low, high = np.percentile(means, [tail, 100 - tail], axis=0)
+    return low, high
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Nuages de points animés Plotly à budget de trames.
+
+Avec ``px.scatter(animation_frame=colonne)``, Plotly crée une trame par
+valeur distincte de la colonne : souvent une par ligne, et une figure de
+plusieurs gigaoctets. Ici, la colonne d'animation est découpée en
+``n_frames`` classes de largeur constante, chaque trame est limitée à
+``points_per_frame`` points (échantillon stratifié), et les colonnes tracées
+sont converties en float32 quand la précision le permet : Plotly les transmet au navigateur en tableaux
+binaires encodés en base64 plutôt qu'en listes de nombres JSON.
+"""
+import numpy as np
+import pandas as pd
+
+from downsampling import numeric_values, stratified_indices
+from startup import lazy_import
+from webgl import compact_floats
+
+# Plotly n'est importé qu'à la première animation
+px = lazy_import("plotly.express")
+
+# Nombre de trames par défaut
+DEFAULT_FRAMES = 30
+
+# Nombre maximal de points par trame par défaut
+DEFAULT_POINTS_PER_FRAME = 2_000
+
+# Nom de la colonne des trames dans la figure
+FRAME_COLUMN = "Trame"
+
+
+def _value_range(values):
+    low, high = float(values.min()), float(values.max())
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    return low, high
+
+
+def frame_labels(edges):
+    """Libellé de chaque classe : « [a ; b[ », la dernière étant fermée."""
+    labels = [f"[{low:.4g} ; {high:.4g}[" for low, high in zip(edges[:-1], edges[1:])]
+    labels[-1] = labels[-1][:-1] + "]"
+    return labels
+
+
+def frame_data(data, frame_column, x_column, y_column, color_column=None,
+               n_frames=DEFAULT_FRAMES, points_per_frame=DEFAULT_POINTS_PER_FRAME):
+    """Lignes à animer : colonnes tracées en float32 et colonne ``FRAME_COLUMN``.
+
+    Renvoie aussi les libellés des trames, dans l'ordre.
+    """
+    frames = numeric_values(data[frame_column])
+    x = numeric_values(data[x_column])
+    y = numeric_values(data[y_column])
+    valid = ~(np.isnan(frames) | np.isnan(x) | np.isnan(y))
+    rows = np.flatnonzero(valid)
+    frames, x, y = frames[valid], x[valid], y[valid]
+    if len(rows) == 0:
+        return pd.DataFrame(columns=[x_column, y_column, FRAME_COLUMN]), []
+    low, high = _value_range(frames)
+    edges = np.linspace(low, high, n_frames + 1)
+    frame_index = np.clip(((frames - low) / (high - low) * n_frames).astype(np.int64), 0, n_frames - 1)
+
+    # Regroupement par trame, puis échantillon stratifié dans chaque trame
+    order = np.argsort(frame_index, kind="stable")
+    bounds = np.searchsorted(frame_index[order], np.arange(n_frames + 1))
+    selected = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        members = order[start:end]
+        if len(members) > points_per_frame:
+            members = members[stratified_indices(x[members], y[members], points_per_frame)]
+        selected.append(members)
+    selected = np.concatenate(selected)
+
+    labels = frame_labels(edges)
+    columns = {x_column: compact_floats(x[selected]), y_column: compact_floats(y[selected])}
+    if color_column is not None and color_column not in columns:
+        columns[color_column] = compact_floats(numeric_values(data[color_column])[rows[selected]])
+    result = pd.DataFrame(columns)
+    result[FRAME_COLUMN] = np.asarray(labels, dtype=object)[frame_index[selected]]
+    return result, labels
+
+
+def animated_scatter(data, x_column, y_column, frame_column, color_column=None,
+                     n_frames=DEFAULT_FRAMES, points_per_frame=DEFAULT_POINTS_PER_FRAME, **px_kwargs):
+    """Nuage de points animé selon ``frame_column``, découpée en ``n_frames`` trames.
+
+    Renvoie la figure et le nombre de points qu'elle contient.
+    """
+    plot_data, labels = frame_data(
+        data, frame_column, x_column, y_column, color_column, n_frames=n_frames, points_per_frame=points_per_frame
+    )
+    # Axes fixes pour toute l'animation
+    ranges = {}
+    for axis, column in (("range_x", x_column), ("range_y", y_column)):
+        values = plot_data[column].to_numpy()
+        if len(values):
+            low, high = _value_range(values)
+            margin = (high - low) * 0.05
+            ranges[axis] = [low - margin, high + margin]
+    fig = px.scatter(
+        plot_data, x=x_column, y=y_column, color=color_column,
+        animation_frame=FRAME_COLUMN, category_orders={FRAME_COLUMN: labels},
+        **ranges, **px_kwargs
+    )
+    return fig, len(plot_data)
\ No newline at end of file
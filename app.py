@@ -1,35 +1,96 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import time
+from functools import partial
+from aggregation import DEFAULT_BOOTSTRAP, GROUP_BINS
+from backend import available_backends, choose_backend, draw_group_stats, memory_backend, open_backend, out_of_core_caption
+from data_cache import cache_stats_caption
+from downsampling import DEFAULT_POINT_BUDGET, decimation_caption
+from ingestion import UPLOAD_TYPES, columnar_columns, is_columnar, load_uploaded_file, to_parquet_bytes
+from profiling import finish_run, span, start_run
+from store import check_upload_size
+from startup import lazy_import, start_prewarm
+
+# Bibliothèques de graphiques, importées au premier graphique (voir startup.py)
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
 
 # Configuration de la page
 st.set_page_config(page_title="EasyViz", layout="wide")
 
+# Mesures de performance de cette exécution (?profile=1 ou EASYVIZ_PROFILE=1)
+start_run()
+
+# Préchargement des bibliothèques de graphiques en arrière-plan (une fois par processus)
+start_prewarm()
+
 # Titre de l'application
 st.title("📊 EasyViz : Visualisation de données simplifiée")
 st.write("Téléversez un fichier CSV pour explorer et visualiser vos données rapidement.")
 
 # Section pour téléverser le fichier CSV
-uploaded_file = st.file_uploader("Téléversez un fichier CSV", type=["csv"])
+uploaded_file = st.file_uploader("Téléversez un fichier CSV, Parquet ou Feather", type=UPLOAD_TYPES)
 
 if uploaded_file is not None:
     # Chargement des données
     try:
-        data = pd.read_csv(uploaded_file)
+        # Limite de taille du serveur, quel que soit le moteur de calcul
+        check_upload_size(uploaded_file)
+        engine = st.sidebar.selectbox(
+            "Moteur de calcul :", ["auto"] + available_backends(), help=out_of_core_caption()
+        )
+        engine = choose_backend(uploaded_file, engine)
+        if engine == "pandas":
+            compact = st.sidebar.checkbox("Mode compact (types réduits)", value=False)
+            columns = None
+            if is_columnar(uploaded_file):
+                # Projection de colonnes : seules les colonnes choisies sont lues
+                available_columns = columnar_columns(uploaded_file)
+                columns = st.sidebar.multiselect("Colonnes à charger :", available_columns, default=available_columns)
+            load = load_uploaded_file(uploaded_file, columns=columns, compact=compact)
+            if not load.done:
+                # Lecture en flux : aperçu dès le premier bloc, puis suivi de la progression
+                load.wait_for_preview()
+                st.subheader("Aperçu des données :")
+                st.dataframe(load.preview, use_container_width=True)
+                st.caption("Colonnes : " + ", ".join(load.columns))
+                st.progress(load.progress, text=f"Chargement en cours : {load.rows_read:,} lignes lues")
+                st.subheader("Statistiques descriptives (provisoires) :")
+                st.write(load.summary.result())
+                time.sleep(0.5)
+                st.rerun()
+            data = load.result()
+            if load.memory_report is not None:
+                with st.expander("Mémoire par colonne (mode compact)"):
+                    st.dataframe(load.memory_report, use_container_width=True)
+            st.sidebar.caption(cache_stats_caption())
+            if not is_columnar(uploaded_file):
+                # Conversion en Parquet, générée uniquement au clic
+                st.sidebar.download_button(
+                    label="Convertir en Parquet",
+                    data=partial(to_parquet_bytes, data),
+                    file_name=uploaded_file.name.rsplit(".", 1)[0] + ".parquet",
+                    mime="application/octet-stream"
+                )
+            backend = memory_backend(data, load.key)
+        else:
+            # Calcul hors mémoire : les données restent sur disque, seuls les agrégats sont chargés
+            data = None
+            backend = open_backend(uploaded_file, engine)
+            st.sidebar.caption(f"Calcul hors mémoire ({engine}) : {backend.row_count():,} lignes")
         st.success("Fichier téléversé avec succès !")
         
         # Afficher les données
         st.subheader("Aperçu des données :")
-        st.dataframe(data.head())
+        st.dataframe(backend.head())
         
         # Afficher les statistiques descriptives
         st.subheader("Statistiques descriptives :")
-        st.write(data.describe())
+        with span("statistiques"):
+            st.write(backend.describe())
 
         # Sélectionner les colonnes pour la visualisation
         st.subheader("Créer une visualisation :")
-        numeric_columns = data.select_dtypes(include=['number']).columns
+        numeric_columns = backend.numeric_columns
         
         if len(numeric_columns) < 2:
             st.warning("Le fichier CSV doit contenir au moins deux colonnes numériques pour générer une visualisation.")
@@ -37,24 +98,55 @@ if uploaded_file is not None:
             x_axis = st.selectbox("Sélectionnez la colonne pour l'axe X", options=numeric_columns)
             y_axis = st.selectbox("Sélectionnez la colonne pour l'axe Y", options=numeric_columns)
             chart_type = st.radio("Type de graphique :", options=["Scatter Plot", "Line Plot", "Bar Plot"])
+            full_resolution = st.sidebar.checkbox("Pleine résolution (sans décimation)", value=False)
+            point_budget = st.sidebar.number_input(
+                "Nombre maximal de points par graphique :", min_value=500, max_value=1_000_000,
+                value=DEFAULT_POINT_BUDGET, step=500
+            )
+            bootstrap = False
+            if chart_type != "Scatter Plot" and backend.in_memory:
+                bootstrap = st.sidebar.checkbox(
+                    "Intervalles de confiance par bootstrap (plus lent)", value=False,
+                    help="Par défaut, l'intervalle de confiance à 95 % est calculé par approximation normale."
+                )
+                n_boot = st.sidebar.number_input(
+                    "Nombre de rééchantillonnages :", min_value=100, max_value=10_000,
+                    value=DEFAULT_BOOTSTRAP, step=100, disabled=not bootstrap
+                )
 
             # Créer un graphique en fonction des sélections
             if st.button("Générer le graphique"):
-                fig, ax = plt.subplots(figsize=(10, 6))
-                if chart_type == "Scatter Plot":
-                    sns.scatterplot(data=data, x=x_axis, y=y_axis, ax=ax)
-                elif chart_type == "Line Plot":
-                    sns.lineplot(data=data, x=x_axis, y=y_axis, ax=ax)
-                elif chart_type == "Bar Plot":
-                    sns.barplot(data=data, x=x_axis, y=y_axis, ax=ax)
-
-                st.pyplot(fig)
+                with span(f"dessin {chart_type}"):
+                    fig, ax = plt.subplots(figsize=(10, 6))
+                    plot_data = data
+                    if chart_type == "Scatter Plot":
+                        if not full_resolution or not backend.in_memory:
+                            plot_data = backend.scatter_sample(x_axis, y_axis, point_budget)
+                        sns.scatterplot(data=plot_data, x=x_axis, y=y_axis, ax=ax)
+                    else:
+                        # Moyennes par groupe en une passe ; intervalles analytiques sauf bootstrap demandé
+                        if bootstrap:
+                            stats = backend.bootstrap_group_stats(x_axis, y_axis, n_boot)
+                        else:
+                            stats = backend.group_stats(x_axis, y_axis)
+                        draw_group_stats(ax, stats, x_axis, y_axis, kind="line" if chart_type == "Line Plot" else "bar")
+
+                with span("encodage PNG"):
+                    st.pyplot(fig)
+                plt.close(fig)
+                if chart_type == "Scatter Plot" and len(plot_data) < backend.row_count():
+                    st.caption(decimation_caption(len(plot_data), backend.row_count()))
+                elif chart_type != "Scatter Plot" and backend.group_edges(x_axis) is not None:
+                    st.caption(f"{x_axis} regroupé en {GROUP_BINS} classes de même largeur (trop de valeurs distinctes).")
     except Exception as e:
         st.error(f"Erreur lors de la lecture du fichier : {e}")
 
 else:
     st.info("Veuillez téléverser un fichier CSV pour commencer.")
 
+# Détail des performances de l'exécution (si les mesures sont activées)
+finish_run()
+
 # Pied de page
 st.markdown("---")
 st.markdown("Créé avec ❤️ par Jinshan LI,Karim OURDEDINE,Ines  BEN MOUSSA,Moyi ZHANG")
\ No newline at end of file
@@ -1,18 +1,31 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
+import time
+from functools import partial
+from charts import correlation_heatmap_figure, default_columns, distribution_figure, histogram_figure, lineplot_figure, scatterplot_figure
+from correlation import ANNOT_MAX_COLUMNS, heatmap_figure
+from data_cache import cache_stats_caption, dataset_cache
+from distribution import histogram_cache
+from downsampling import DEFAULT_POINT_BUDGET, LINE_METHODS, decimation_caption, downsample_line, downsample_scatter
+from filters import filter_panel, index_cache, view_cache
+from ingestion import UPLOAD_TYPES, columnar_columns, is_columnar, load_uploaded_file, to_parquet_bytes
+from live import DEFAULT_REFRESH_SECONDS, LIVE_DIR, get_live_tail, live_caption
+from pairplot import PAIRPLOT_SAMPLE_ROWS, pairplot_figure
+from profiling import finish_run, span, start_run
+from rasterize import RASTER_AUTO_ROWS
+from render import EXPORT_FORMATS, EXPORT_MIME_TYPES, cached_render, decimated_figure, figure_cache, figure_key
+from startup import start_prewarm
+from store import dataset_store, is_admin, memory_caption
+from summary import summary_cache
+from views import is_visible, lazy_tabs, render_view
 
 # Configuration de la page
 st.set_page_config(page_title="EasyViz - Visualisation des données", layout="wide")
 
-# Fonction pour télécharger des graphiques
-def download_plot(fig, filename="graphique.png"):
-    buf = BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight")
-    buf.seek(0)
-    return buf
+# Mesures de performance de cette exécution (?profile=1 ou EASYVIZ_PROFILE=1)
+start_run()
+
+# Préchargement des bibliothèques de graphiques en arrière-plan (une fois par processus)
+start_prewarm()
 
 # Titre de l'application avec logo
 st.markdown("""
@@ -27,31 +40,127 @@ Bienvenue sur cette application de visualisation des données !
 Téléversez un fichier CSV pour explorer et visualiser vos données.
 """)
 
+# Suivi en direct d'un CSV local qui grossit (proposé si EASYVIZ_LIVE_DIR est défini)
+live_path = None
+if LIVE_DIR:
+    with st.sidebar.expander("🔴 Suivi en direct d'un fichier CSV"):
+        live_path = st.text_input(f"Fichier à suivre (dans {LIVE_DIR}) :")
+        refresh_seconds = st.number_input(
+            "Intervalle de rafraîchissement (secondes) :", min_value=0.5, max_value=600.0,
+            value=DEFAULT_REFRESH_SECONDS, step=0.5
+        )
+
+
+def live_view(path, bins, export_format):
+    """Graphiques du fichier suivi, mis à jour avec les seules lignes ajoutées depuis le dernier rafraîchissement."""
+    try:
+        tail = get_live_tail(path)
+        added = tail.poll()
+    except (OSError, ValueError) as e:
+        st.error(f"Erreur lors du suivi du fichier : {e}")
+        return
+    st.caption(live_caption(tail, added))
+    preview = tail.preview()
+    st.dataframe(preview, use_container_width=True)
+    if not tail.numeric_columns:
+        st.info("En attente de lignes avec des colonnes numériques.")
+        return
+
+    default_x, default_y = default_columns(preview)
+    x_column = st.selectbox("Sélectionnez les données pour l'axe X :", tail.columns, index=tail.columns.index(default_x))
+    y_column = st.selectbox(
+        "Sélectionnez les données pour l'axe Y :", tail.numeric_columns, index=tail.numeric_columns.index(default_y)
+    )
+    charts = [
+        ("lineplot", partial(lineplot_figure, tail.line(x_column, y_column), x_column, y_column), (x_column, y_column)),
+        ("distribution", partial(histogram_figure, tail.histogram(y_column), y_column, bins), (y_column, bins)),
+    ]
+    if len(tail.numeric_columns) > 1:
+        charts.append(("heatmap", partial(heatmap_figure, tail.correlation()), ()))
+    for chart, build, params in charts:
+        rendered = cached_render(figure_key(tail.key, chart, *params), build)
+        st.image(rendered.png, use_container_width=True)
+        st.download_button(
+            label="Télécharger le graphique",
+            data=rendered.exporter(export_format),
+            file_name=f"{chart}.{export_format}",
+            mime=EXPORT_MIME_TYPES[export_format],
+            key=f"live-{chart}"
+        )
+
+
 # Téléverser un fichier CSV
-uploaded_file = st.file_uploader("📂 Téléversez un fichier CSV", type=["csv"])
+uploaded_file = st.file_uploader("📂 Téléversez un fichier CSV, Parquet ou Feather", type=UPLOAD_TYPES)
 
-if uploaded_file is not None:
+if live_path:
+    with st.sidebar:
+        live_bins = st.slider("Nombre de classes (bins) :", min_value=5, max_value=50, value=10)
+        live_format = st.selectbox("Format de téléchargement :", EXPORT_FORMATS, format_func=str.upper)
+    # Seul ce fragment est relancé à chaque rafraîchissement, pas la page entière
+    st.fragment(live_view, run_every=refresh_seconds)(live_path, live_bins, live_format)
+elif uploaded_file is not None:
     # Charger les données
     try:
-        data = pd.read_csv(uploaded_file)
+        compact = st.sidebar.checkbox("Mode compact (types réduits)", value=False)
+        columns = None
+        if is_columnar(uploaded_file):
+            # Projection de colonnes : seules les colonnes choisies sont lues
+            available_columns = columnar_columns(uploaded_file)
+            columns = st.sidebar.multiselect("Colonnes à charger :", available_columns, default=available_columns)
+        load = load_uploaded_file(uploaded_file, columns=columns, compact=compact)
+        if not load.done:
+            # Lecture en flux : aperçu dès le premier bloc, puis suivi de la progression
+            load.wait_for_preview()
+            st.subheader("Aperçu des données")
+            st.dataframe(load.preview, use_container_width=True)
+            st.caption("Colonnes : " + ", ".join(load.columns))
+            st.progress(load.progress, text=f"Chargement en cours : {load.rows_read:,} lignes lues")
+            time.sleep(0.5)
+            st.rerun()
+        data = load.result()
+        if load.memory_report is not None:
+            with st.expander("Mémoire par colonne (mode compact)"):
+                st.dataframe(load.memory_report, use_container_width=True)
+        st.sidebar.caption(cache_stats_caption())
+        st.sidebar.caption(cache_stats_caption(figure_cache, label="Cache des graphiques"))
+        if st.sidebar.button("Vider le cache des graphiques"):
+            figure_cache.clear()
+        if not is_columnar(uploaded_file):
+            # Conversion en Parquet, générée uniquement au clic
+            st.sidebar.download_button(
+                label="Convertir en Parquet",
+                data=partial(to_parquet_bytes, data),
+                file_name=uploaded_file.name.rsplit(".", 1)[0] + ".parquet",
+                mime="application/octet-stream"
+            )
         st.success("Fichier téléversé avec succès !")
         
         # Aperçu des données
         st.subheader("Aperçu des données")
         st.dataframe(data.head(), use_container_width=True)
+
+        # Filtres de lignes (index construits une fois par jeu de données) : tous les onglets utilisent la vue filtrée
+        data, data_key = filter_panel(data, load.key)
         
         # Colonnes disponibles
         all_columns = data.columns.tolist()
-        numeric_columns = data.select_dtypes(include=["float64", "int64"]).columns.tolist()
+        numeric_columns = data.select_dtypes(include="number").columns.tolist()
 
         # Interface de sélection des axes
         with st.sidebar:
             st.header("Paramètres de visualisation")
             x_column = st.selectbox("Sélectionnez les données pour l'axe X :", all_columns, index=0)
             y_column = st.selectbox("Sélectionnez les données pour l'axe Y :", numeric_columns, index=0 if numeric_columns else -1)
+            full_resolution = st.checkbox("Pleine résolution (sans décimation)", value=False)
+            point_budget = st.number_input(
+                "Nombre maximal de points par graphique :", min_value=500, max_value=1_000_000,
+                value=DEFAULT_POINT_BUDGET, step=500
+            )
+            export_format = st.selectbox("Format de téléchargement :", EXPORT_FORMATS, format_func=str.upper)
+            prefetch_views = st.checkbox("Précalculer les autres onglets en arrière-plan", value=False)
 
-        # Ajouter des onglets pour différents graphiques
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        # Ajouter des onglets pour différents graphiques (seul l'onglet affiché est calculé)
+        tab1, tab2, tab3, tab4, tab5 = lazy_tabs([
             "📈 Graphique de distribution",
             "📊 Scatterplot",
             "📉 Graphique en ligne",
@@ -60,97 +169,180 @@ if uploaded_file is not None:
         ])
 
         # 1. Graphique de distribution
-        with tab1:
+        with tab1, span("onglet distribution"):
             st.subheader("📈 Graphique de distribution")
             if y_column:
                 bins = st.slider("Nombre de classes (bins) :", min_value=5, max_value=50, value=10)
-                fig, ax = plt.subplots()
-                sns.histplot(data[y_column], kde=True, bins=bins, ax=ax)
-                ax.set_title(f"Distribution de {y_column}")
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig),
-                    file_name="distribution.png",
-                    mime="image/png"
+                rendered = render_view(
+                    tab1, figure_key(data_key, "distribution", y_column, bins),
+                    partial(distribution_figure, data, y_column, bins, dataset_key=data_key), prefetch_views
                 )
+                if rendered is not None:
+                    st.image(rendered.png, use_container_width=True)
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"distribution.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
 
         # 2. Scatterplot
-        with tab2:
+        with tab2, span("onglet scatterplot"):
             st.subheader("📊 Scatterplot")
             if x_column and y_column:
-                fig, ax = plt.subplots()
-                sns.scatterplot(data=data, x=x_column, y=y_column, ax=ax, color="blue")
-                ax.set_title(f"Scatterplot : {y_column} vs {x_column}")
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig),
-                    file_name="scatterplot.png",
-                    mime="image/png"
+                render_mode = st.radio(
+                    "Mode de rendu :", ["Points", "Rastérisé"],
+                    index=1 if len(data) > RASTER_AUTO_ROWS else 0, horizontal=True
                 )
+                value_column = None
+                if render_mode == "Rastérisé":
+                    value_column = st.selectbox(
+                        "Couleur des pixels :", [None] + numeric_columns,
+                        format_func=lambda column: "Nombre de points" if column is None else f"Moyenne de {column}"
+                    )
+
+                if is_visible(tab2):
+                    # Décimation faite seulement si le graphique n'est pas en cache
+                    budget = None if full_resolution or render_mode == "Rastérisé" else point_budget
+                    decimate = None if budget is None else partial(
+                        downsample_scatter, x_column=x_column, y_column=y_column, budget=budget
+                    )
+                    rendered = cached_render(
+                        figure_key(data_key, "scatterplot", x_column, y_column, render_mode, value_column, budget),
+                        partial(
+                            decimated_figure, data, decimate, partial(
+                                scatterplot_figure, x_column=x_column, y_column=y_column,
+                                rasterized=render_mode == "Rastérisé", value_column=value_column
+                            )
+                        )
+                    )
+                    st.image(rendered.png, use_container_width=True)
+                    if rendered.rows < len(data):
+                        st.caption(decimation_caption(rendered.rows, len(data)))
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"scatterplot.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
 
         # 3. Graphique en ligne
-        with tab3:
+        with tab3, span("onglet ligne"):
             st.subheader("📉 Graphique en ligne")
             if x_column and y_column:
-                fig, ax = plt.subplots()
-                data.plot(x=x_column, y=y_column, kind="line", ax=ax, color="purple")
-                ax.set_title(f"Graphique en ligne : {y_column} vs {x_column}")
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig),
-                    file_name="lineplot.png",
-                    mime="image/png"
+                line_method = st.radio(
+                    "Décimation :", list(LINE_METHODS), horizontal=True, format_func=LINE_METHODS.get
                 )
+                if is_visible(tab3):
+                    budget = None if full_resolution else point_budget
+                    decimate = None if budget is None else partial(
+                        downsample_line, x_column=x_column, y_column=y_column, budget=budget, method=line_method
+                    )
+                    rendered = cached_render(
+                        figure_key(data_key, "lineplot", x_column, y_column, line_method, budget),
+                        partial(
+                            decimated_figure, data, decimate,
+                            partial(lineplot_figure, x_column=x_column, y_column=y_column)
+                        )
+                    )
+                    st.image(rendered.png, use_container_width=True)
+                    if rendered.rows < len(data):
+                        st.caption(decimation_caption(rendered.rows, len(data)))
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"lineplot.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
 
         # 4. Pairplot
-        with tab4:
+        with tab4, span("onglet pairplot"):
             st.subheader("📚 Pairplot")
             pairplot_columns = st.multiselect(
                 "Sélectionnez des colonnes pour le Pairplot (2 minimum) :", numeric_columns, default=numeric_columns[:2]
             )
             if len(pairplot_columns) >= 2:
-                fig = sns.pairplot(data[pairplot_columns])
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig.fig),
-                    file_name="pairplot.png",
-                    mime="image/png"
+                pairplot_mode = "sample"
+                sample_size = len(data) if full_resolution else PAIRPLOT_SAMPLE_ROWS
+                if len(data) > sample_size:
+                    pairplot_mode = st.radio(
+                        "Panneaux hors diagonale :", ["sample", "hist2d"], horizontal=True,
+                        format_func=lambda mode: "Échantillon de lignes" if mode == "sample" else "Histogramme 2D"
+                    )
+                rendered = render_view(
+                    tab4, figure_key(data_key, "pairplot", pairplot_columns, pairplot_mode, sample_size),
+                    partial(pairplot_figure, data, pairplot_columns, mode=pairplot_mode, sample_size=sample_size),
+                    prefetch_views
                 )
+                if rendered is not None:
+                    st.image(rendered.png, use_container_width=True)
+                    if pairplot_mode == "sample" and len(data) > sample_size:
+                        st.caption(decimation_caption(sample_size, len(data)))
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"pairplot.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
 
         # 5. Heatmap des corrélations
-        with tab5:
+        with tab5, span("onglet heatmap"):
             st.subheader("🌀 Heatmap des corrélations")
             if len(numeric_columns) > 1:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                corr = data[numeric_columns].corr()
-                sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
-                ax.set_title("Matrice de corrélation")
-                st.pyplot(fig)
-
-                # Ajouter un bouton de téléchargement
-                st.download_button(
-                    label="Télécharger le graphique",
-                    data=download_plot(fig),
-                    file_name="heatmap.png",
-                    mime="image/png"
+
+                corr_method = st.radio(
+                    "Coefficient :", ["pearson", "spearman"], horizontal=True,
+                    format_func=lambda method: "Pearson" if method == "pearson" else "Spearman (rangs)"
                 )
+                reorder = st.checkbox(
+                    "Regrouper les variables corrélées", value=len(numeric_columns) > ANNOT_MAX_COLUMNS
+                )
+                rendered = render_view(
+                    tab5, figure_key(data_key, "heatmap", numeric_columns, corr_method, reorder),
+                    partial(correlation_heatmap_figure, data, numeric_columns, method=corr_method, reorder=reorder),
+                    prefetch_views
+                )
+                if rendered is not None:
+                    st.image(rendered.png, use_container_width=True)
+
+                    # Ajouter un bouton de téléchargement
+                    st.download_button(
+                        label="Télécharger le graphique",
+                        data=rendered.exporter(export_format),
+                        file_name=f"heatmap.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
     except Exception as e:
         st.error(f"Erreur lors de la lecture du fichier : {e}")
 else:
     st.info("Veuillez téléverser un fichier CSV pour commencer.")            
 
+# Vue d'administration (?admin=<EASYVIZ_ADMIN_TOKEN>) : mémoire du serveur, toutes sessions confondues
+if is_admin(st.query_params.get("admin")):
+    with st.sidebar.expander("Mémoire du serveur", expanded=True):
+        st.caption(memory_caption({
+            "jeux de données": dataset_cache,
+            "graphiques": figure_cache,
+            "résumés": summary_cache,
+            "histogrammes": histogram_cache,
+            "index des filtres": index_cache,
+            "vues filtrées": view_cache,
+        }))
+        datasets, sessions = dataset_store.usage()
+        st.dataframe(datasets, use_container_width=True, hide_index=True)
+        st.dataframe(sessions, use_container_width=True, hide_index=True)
+
+# Détail des performances de l'exécution (si les mesures sont activées)
+finish_run()
+
 # Pied de page
 st.markdown("---")
 st.markdown("Créé avec ❤️ par Jinshan LI, Karim OURDEDINE, Ines BEN MOUSSA, Moyi ZHANG")
\ No newline at end of file
@@ -1,11 +1,29 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import time
+from functools import partial
+from charts import correlation_heatmap_figure, distribution_figure, lineplot_figure, scatterplot_figure
+from correlation import ANNOT_MAX_COLUMNS
+from data_cache import cache_stats_caption
+from downsampling import DEFAULT_POINT_BUDGET, decimation_caption, downsample_line, downsample_scatter
+from ingestion import UPLOAD_TYPES, columnar_columns, is_columnar, load_uploaded_file, to_parquet_bytes
+from pairplot import PAIRPLOT_SAMPLE_ROWS, pairplot_figure
+from profiling import finish_run, span, start_run
+from rasterize import RASTER_AUTO_ROWS
+from startup import lazy_import, start_prewarm
+from views import is_visible, lazy_tabs
+
+# Bibliothèques de graphiques, importées au premier graphique (voir startup.py)
+plt = lazy_import("matplotlib.pyplot")
 
 # Configuration de la page
 st.set_page_config(page_title="Visualisation des données", layout="wide")
 
+# Mesures de performance de cette exécution (?profile=1 ou EASYVIZ_PROFILE=1)
+start_run()
+
+# Préchargement des bibliothèques de graphiques en arrière-plan (une fois par processus)
+start_prewarm()
+
 # Titre de l'application
 st.title("📊 Visualisation des données interactives")
 st.markdown("""
@@ -14,11 +32,39 @@ Téléversez un fichier CSV pour explorer et visualiser vos données à l'aide d
 """)
 
 # Téléverser un fichier CSV
-uploaded_file = st.file_uploader("📂 Téléversez un fichier CSV", type=["csv"])
+uploaded_file = st.file_uploader("📂 Téléversez un fichier CSV, Parquet ou Feather", type=UPLOAD_TYPES)
 
 if uploaded_file is not None:
     # Charger les données
-    data = pd.read_csv(uploaded_file)
+    compact = st.sidebar.checkbox("Mode compact (types réduits)", value=False)
+    columns = None
+    if is_columnar(uploaded_file):
+        # Projection de colonnes : seules les colonnes choisies sont lues
+        available_columns = columnar_columns(uploaded_file)
+        columns = st.sidebar.multiselect("Colonnes à charger :", available_columns, default=available_columns)
+    load = load_uploaded_file(uploaded_file, columns=columns, compact=compact)
+    if not load.done:
+        # Lecture en flux : aperçu dès le premier bloc, puis suivi de la progression
+        load.wait_for_preview()
+        st.subheader("Aperçu des données")
+        st.dataframe(load.preview, use_container_width=True)
+        st.caption("Colonnes : " + ", ".join(load.columns))
+        st.progress(load.progress, text=f"Chargement en cours : {load.rows_read:,} lignes lues")
+        time.sleep(0.5)
+        st.rerun()
+    data = load.result()
+    if load.memory_report is not None:
+        with st.expander("Mémoire par colonne (mode compact)"):
+            st.dataframe(load.memory_report, use_container_width=True)
+    st.sidebar.caption(cache_stats_caption())
+    if not is_columnar(uploaded_file):
+        # Conversion en Parquet, générée uniquement au clic
+        st.sidebar.download_button(
+            label="Convertir en Parquet",
+            data=partial(to_parquet_bytes, data),
+            file_name=uploaded_file.name.rsplit(".", 1)[0] + ".parquet",
+            mime="application/octet-stream"
+        )
     
     # Aperçu des données
     st.subheader("Aperçu des données")
@@ -26,16 +72,21 @@ if uploaded_file is not None:
     
     # Colonnes disponibles
     all_columns = data.columns.tolist()
-    numeric_columns = data.select_dtypes(include=["float64", "int64"]).columns.tolist()
+    numeric_columns = data.select_dtypes(include="number").columns.tolist()
 
     # Interface de sélection des axes
     with st.sidebar:
         st.header("Paramètres de visualisation")
         x_column = st.selectbox("Sélectionnez une colonne pour l'axe X :", all_columns, index=0)
         y_column = st.selectbox("Sélectionnez une colonne pour l'axe Y :", numeric_columns, index=0 if numeric_columns else -1)
+        full_resolution = st.checkbox("Pleine résolution (sans décimation)", value=False)
+        point_budget = st.number_input(
+            "Nombre maximal de points par graphique :", min_value=500, max_value=1_000_000,
+            value=DEFAULT_POINT_BUDGET, step=500
+        )
 
-    # Ajouter des onglets pour différents graphiques
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    # Ajouter des onglets pour différents graphiques (seul l'onglet affiché est calculé)
+    tab1, tab2, tab3, tab4, tab5 = lazy_tabs([
         "📈 Graphique de distribution",
         "📊 Scatterplot",
         "📉 Graphique en ligne",
@@ -44,53 +95,93 @@ if uploaded_file is not None:
     ])
 
     # 1. Graphique de distribution
-    with tab1:
+    with tab1, span("onglet distribution"):
         st.subheader("📈 Graphique de distribution")
         if y_column:
             bins = st.slider("Nombre de classes (bins) :", min_value=5, max_value=50, value=10)
-            fig, ax = plt.subplots()
-            sns.histplot(data[y_column], kde=True, bins=bins, ax=ax)
-            ax.set_title(f"Distribution de {y_column}")
-            st.pyplot(fig)
+            if is_visible(tab1):
+                fig = distribution_figure(data, y_column, bins, dataset_key=load.key)
+                st.pyplot(fig)
+                plt.close(fig)
 
     # 2. Scatterplot
-    with tab2:
+    with tab2, span("onglet scatterplot"):
         st.subheader("📊 Scatterplot")
         if x_column and y_column:
-            fig, ax = plt.subplots()
-            sns.scatterplot(data=data, x=x_column, y=y_column, ax=ax, color="blue")
-            ax.set_title(f"Scatterplot : {y_column} vs {x_column}")
-            st.pyplot(fig)
+            render_mode = st.radio(
+                "Mode de rendu :", ["Points", "Rastérisé"],
+                index=1 if len(data) > RASTER_AUTO_ROWS else 0, horizontal=True
+            )
+            value_column = None
+            if render_mode == "Rastérisé":
+                value_column = st.selectbox(
+                    "Couleur des pixels :", [None] + numeric_columns,
+                    format_func=lambda column: "Nombre de points" if column is None else f"Moyenne de {column}"
+                )
+            if is_visible(tab2):
+                if render_mode == "Rastérisé":
+                    plot_data = data
+                else:
+                    plot_data = data if full_resolution else downsample_scatter(data, x_column, y_column, point_budget)
+                fig = scatterplot_figure(
+                    plot_data, x_column, y_column, rasterized=render_mode == "Rastérisé", value_column=value_column
+                )
+                st.pyplot(fig)
+                plt.close(fig)
+                if len(plot_data) < len(data):
+                    st.caption(decimation_caption(len(plot_data), len(data)))
 
     # 3. Graphique en ligne
-    with tab3:
+    with tab3, span("onglet ligne"):
         st.subheader("📉 Graphique en ligne")
-        if x_column and y_column:
-            fig, ax = plt.subplots()
-            data.plot(x=x_column, y=y_column, kind="line", ax=ax, color="purple")
-            ax.set_title(f"Graphique en ligne : {y_column} vs {x_column}")
+        if x_column and y_column and is_visible(tab3):
+            plot_data = data if full_resolution else downsample_line(data, x_column, y_column, point_budget)
+            fig = lineplot_figure(plot_data, x_column, y_column)
             st.pyplot(fig)
+            plt.close(fig)
+            if len(plot_data) < len(data):
+                st.caption(decimation_caption(len(plot_data), len(data)))
 
     # 4. Pairplot
-    with tab4:
+    with tab4, span("onglet pairplot"):
         st.subheader("📚 Pairplot")
         pairplot_columns = st.multiselect(
             "Sélectionnez des colonnes pour le Pairplot (2 minimum) :", numeric_columns, default=numeric_columns[:2]
         )
         if len(pairplot_columns) >= 2:
-            fig = sns.pairplot(data[pairplot_columns])
-            st.pyplot(fig)
+            pairplot_mode = "sample"
+            sample_size = len(data) if full_resolution else PAIRPLOT_SAMPLE_ROWS
+            if len(data) > sample_size:
+                pairplot_mode = st.radio(
+                    "Panneaux hors diagonale :", ["sample", "hist2d"], horizontal=True,
+                    format_func=lambda mode: "Échantillon de lignes" if mode == "sample" else "Histogramme 2D"
+                )
+            if is_visible(tab4):
+                fig = pairplot_figure(data, pairplot_columns, mode=pairplot_mode, sample_size=sample_size)
+                st.pyplot(fig)
+                plt.close(fig)
+                if pairplot_mode == "sample" and len(data) > sample_size:
+                    st.caption(decimation_caption(sample_size, len(data)))
 
     # 5. Heatmap des corrélations
-    with tab5:
+    with tab5, span("onglet heatmap"):
         st.subheader("🌀 Heatmap des corrélations")
         if len(numeric_columns) > 1:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            corr = data[numeric_columns].corr()
-            sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
-            ax.set_title("Matrice de corrélation")
-            st.pyplot(fig)
+            corr_method = st.radio(
+                "Coefficient :", ["pearson", "spearman"], horizontal=True,
+                format_func=lambda method: "Pearson" if method == "pearson" else "Spearman (rangs)"
+            )
+            reorder = st.checkbox(
+                "Regrouper les variables corrélées", value=len(numeric_columns) > ANNOT_MAX_COLUMNS
+            )
+            if is_visible(tab5):
+                fig = correlation_heatmap_figure(data, numeric_columns, method=corr_method, reorder=reorder)
+                st.pyplot(fig)
+                plt.close(fig)
             
+# Détail des performances de l'exécution (si les mesures sont activées)
+finish_run()
+
 # Pied de page
 st.markdown("---")
 st.markdown("Créé avec ❤️ par Jinshan LI,Karim OURDEDINE,Ines  BEN MOUSSA,Moyi ZHANG")
\ No newline at end of file
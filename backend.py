@@ -0,0 +1,518 @@
+"""Moteurs de calcul des agrégations affichées par les onglets.
+
+Par défaut, les données sont chargées dans un DataFrame pandas. Pour les
+fichiers trop volumineux, les mêmes agrégations (statistiques descriptives,
+échantillon pour les nuages de points, moyennes par groupe) sont exécutées sous forme de requêtes sur la copie du fichier
+écrite sur disque, par DuckDB ou Polars : seul le résultat, de petite
+taille, est chargé en mémoire.
+
+DuckDB et Polars sont optionnels ; les moteurs absents ne sont pas proposés.
+"""
+import importlib
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregation import GROUP_BINS, GROUP_MAX_KEYS, bin_edges, bootstrap_interval, group_moments, normal_interval
+from data_cache import DATASET_MAX_BYTES, format_bytes, uploaded_file_key
+from distribution import BASE_BINS, ColumnHistogram
+from downsampling import downsample_scatter
+from ingestion import file_format, spill_to_disk
+from store import dataset_store
+from startup import lazy_import
+from summary import QUANTILES, SUMMARY_INDEX, dataset_summary, summarize
+
+# Importé au premier diagramme en barres
+mcollections = lazy_import("matplotlib.collections")
+
+# Au-delà de cette taille de fichier, le mode automatique calcule hors mémoire
+# (EASYVIZ_OUT_OF_CORE_BYTES ; par défaut 1/16 du budget des jeux de données,
+# soit 128 Mo : un CSV occupe plusieurs fois sa taille une fois chargé, et la
+# limite de téléversement de Streamlit est de 200 Mo par défaut)
+OUT_OF_CORE_THRESHOLD_BYTES = int(os.environ.get("EASYVIZ_OUT_OF_CORE_BYTES") or DATASET_MAX_BYTES // 16)
+
+# Moteurs hors mémoire, par ordre de préférence
+OUT_OF_CORE_BACKENDS = ["duckdb", "polars"]
+
+# Nombre maximal d'étiquettes sur l'axe X des diagrammes en barres
+MAX_TICK_LABELS = 30
+
+
+def available_backends():
+    """Moteurs utilisables dans cet environnement."""
+    names = ["pandas"]
+    for name in OUT_OF_CORE_BACKENDS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def _import_backend(name):
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError(f"Le moteur de calcul {name} nécessite le paquet {name}.") from e
+
+
+class _MemoizedBackend:
+    """Les fichiers téléversés ne changent pas : chaque résultat est calculé une fois."""
+
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.RLock()
+
+    def _memo(self, key, compute):
+        with self._lock:
+            if key not in self._results:
+                self._results[key] = compute()
+            return self._results[key]
+
+    def close(self):
+        """Libère les résultats mémorisés."""
+        with self._lock:
+            self._results.clear()
+
+    def group_edges(self, by, max_groups=GROUP_MAX_KEYS, bins=GROUP_BINS):
+        """Bornes des classes de ``by`` pour les moyennes par groupe, ou ``None`` (une valeur par groupe).
+
+        Un X numérique de plus de ``max_groups`` valeurs distinctes est
+        regroupé en ``bins`` classes de même largeur.
+        """
+        if by not in self.numeric_columns:
+            return None
+        distinct = self.describe().loc["distinct (≈)", by]
+        if not distinct > max_groups:
+            return None
+        histogram = self.histogram(by)
+        return bin_edges(histogram.low, histogram.high, bins)
+
+    def group_stats(self, by, value):
+        """Effectif, moyenne et écart-type de ``value`` par valeur (ou classe) de ``by``."""
+        edges = self.group_edges(by)
+        return self._memo(
+            ("group", by, value, None if edges is None else len(edges) - 1),
+            lambda: self._group_stats(by, value, edges)
+        )
+
+
+class PandasBackend(_MemoizedBackend):
+    """Agrégations sur un DataFrame en mémoire."""
+
+    name = "pandas"
+    in_memory = True
+
+    def __init__(self, data, key=None):
+        super().__init__()
+        self.data = data
+        self.key = key
+        self.columns = list(data.columns)
+        self.numeric_columns = data.select_dtypes(include="number").columns.tolist()
+
+    def row_count(self):
+        return len(self.data)
+
+    def head(self, n=5):
+        return self.data.head(n)
+
+    def describe(self):
+        if self.key is None:
+            return summarize(self.data)
+        return dataset_summary(self.key, self.data)
+
+    def histogram(self, column):
+        return self._memo(
+            ("histogram", column),
+            lambda: ColumnHistogram.from_values(self.data[column].to_numpy(dtype=np.float64, na_value=np.nan))
+        )
+
+    def scatter_sample(self, x_column, y_column, budget):
+        return downsample_scatter(self.data, x_column, y_column, budget)
+
+    def _group_stats(self, by, value, edges):
+        return group_moments(self.data[by], self.data[value], edges)
+
+    def bootstrap_group_stats(self, by, value, n_boot, parallel=None):
+        """:meth:`group_stats` avec l'intervalle de confiance par bootstrap (colonnes ``ci_low``, ``ci_high``)."""
+        def compute():
+            stats = self.group_stats(by, value).copy()
+            stats["ci_low"], stats["ci_high"] = bootstrap_interval(
+                self.data[by], self.data[value], self.group_edges(by), n_boot=n_boot, parallel=parallel
+            )
+            return stats
+        return self._memo(("bootstrap", by, value, n_boot), compute)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class DuckDBBackend(_MemoizedBackend):
+    """Agrégations exécutées par DuckDB sur le fichier écrit sur disque."""
+
+    name = "duckdb"
+    in_memory = False
+
+    def __init__(self, path, file_type):
+        super().__init__()
+        self._duckdb = _import_backend("duckdb")
+        self._path = path
+        self._file_type = file_type
+        self._connection = self._connect()
+        schema = self._query("DESCRIBE SELECT * FROM source")
+        self.columns = schema["column_name"].tolist()
+        numeric_types = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "UTINYINT", "USMALLINT",
+                         "UINTEGER", "UBIGINT", "UHUGEINT", "FLOAT", "DOUBLE", "DECIMAL")
+        self.numeric_columns = [
+            column for column, column_type in zip(schema["column_name"], schema["column_type"])
+            if column_type.split("(")[0] in numeric_types
+        ]
+
+    def _connect(self):
+        """Connexion où la vue ``source`` désigne le fichier."""
+        connection = self._duckdb.connect()
+        path = self._path.replace("'", "''")
+        if self._file_type == "csv":
+            connection.execute(f"CREATE VIEW source AS SELECT * FROM read_csv_auto('{path}')")
+        elif self._file_type == "parquet":
+            connection.execute(f"CREATE VIEW source AS SELECT * FROM read_parquet('{path}')")
+        else:
+            # Feather / Arrow IPC : lu par pyarrow, lot par lot
+            import pyarrow.dataset as ds
+            connection.register("source", ds.dataset(path, format="ipc"))
+        return connection
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql, params=None):
+        # Une connexion DuckDB ne doit pas être utilisée par plusieurs threads à la fois
+        with self._lock:
+            return self._connection.execute(sql, params or []).df()
+
+    def row_count(self):
+        return self._memo("rows", lambda: int(self._query("SELECT count(*) AS n FROM source")["n"].iloc[0]))
+
+    def head(self, n=5):
+        return self._memo(("head", n), lambda: self._query(f"SELECT * FROM source LIMIT {int(n)}"))
+
+    def describe(self):
+        return self._memo("describe", self._describe)
+
+    def _describe(self):
+        # Quantiles et valeurs distinctes approchés, comme pour pandas (sketches de summary.py)
+        selects = ["count(*) AS rows"]
+        for i, column in enumerate(self.columns):
+            selects += [f"count({_quote(column)}) AS count_{i}", f"approx_count_distinct({_quote(column)}) AS distinct_{i}"]
+        for i, column in enumerate(self.numeric_columns):
+            c = f"{_quote(column)}::DOUBLE"
+            quantiles = ", ".join(str(q) for q in QUANTILES)
+            selects += [
+                f"avg({c}) AS mean_{i}", f"stddev_samp({c}) AS std_{i}", f"min({c}) AS min_{i}",
+                f"approx_quantile({c}, [{quantiles}]) AS q_{i}", f"max({c}) AS max_{i}",
+            ]
+        row = self._query(f"SELECT {', '.join(selects)} FROM source").iloc[0]
+        table = pd.DataFrame(np.nan, index=SUMMARY_INDEX, columns=self.columns)
+        for i, column in enumerate(self.columns):
+            table.loc[["count", "nulls", "distinct (≈)"], column] = [
+                row[f"count_{i}"], row["rows"] - row[f"count_{i}"], row[f"distinct_{i}"]
+            ]
+        for i, column in enumerate(self.numeric_columns):
+            quantiles = list(row[f"q_{i}"]) if row[f"q_{i}"] is not None else [np.nan] * len(QUANTILES)
+            table.loc[["mean", "std", "min", "25%", "50%", "75%", "max"], column] = [
+                row[f"mean_{i}"], row[f"std_{i}"], row[f"min_{i}"], *quantiles, row[f"max_{i}"]
+            ]
+        return table
+
+    def histogram(self, column):
+        return self._memo(("histogram", column), lambda: self._histogram(column))
+
+    def _histogram(self, column):
+        c = f"{_quote(column)}::DOUBLE"
+        stats = self._query(
+            f"SELECT count({c}) AS n, min({c}) AS low, max({c}) AS high, stddev_samp({c}) AS std "
+            f"FROM source WHERE NOT isnan({c})"
+        ).iloc[0]
+        n = int(stats["n"])
+        if n == 0:
+            return ColumnHistogram(np.zeros(BASE_BINS, dtype=np.int64), 0.0, 1.0, 0, 0.0)
+        low, high = float(stats["low"]), float(stats["high"])
+        std = 0.0 if pd.isna(stats["std"]) else float(stats["std"])
+        if high <= low:
+            low, high = low - 0.5, high + 0.5
+        bins = self._query(
+            f"SELECT least(greatest(floor(({c} - ?) / (? - ?) * {BASE_BINS}), 0), {BASE_BINS - 1})::BIGINT AS bin, "
+            f"count(*) AS n FROM source WHERE NOT isnan({c}) GROUP BY bin",
+            [low, high, low]
+        )
+        counts = np.zeros(BASE_BINS, dtype=np.int64)
+        counts[bins["bin"].to_numpy()] = bins["n"].to_numpy()
+        return ColumnHistogram(counts, low, high, n, std)
+
+    def scatter_sample(self, x_column, y_column, budget, seed=0):
+        columns = ", ".join(_quote(column) for column in dict.fromkeys([x_column, y_column]))
+        return self._memo(
+            ("sample", x_column, y_column, budget, seed),
+            lambda: self._query(
+                f"SELECT {columns} FROM source USING SAMPLE reservoir({int(budget)} ROWS) REPEATABLE ({int(seed)})"
+            )
+        )
+
+    def _group_stats(self, by, value, edges):
+        key, c = _quote(by), f"{_quote(value)}::DOUBLE"
+        aggregates = f"count({c}) AS count, avg({c}) AS mean, stddev_samp({c}) AS std"
+        if edges is None:
+            return self._query(
+                f"SELECT {key}, {aggregates} FROM source WHERE {key} IS NOT NULL GROUP BY {key} ORDER BY {key}"
+            )
+        n_bins = len(edges) - 1
+        stats = self._query(
+            f"SELECT least(greatest(floor(({key}::DOUBLE - ?) / (? - ?) * {n_bins}), 0), {n_bins - 1})::BIGINT AS bin, "
+            f"{aggregates} FROM source WHERE {key} IS NOT NULL AND NOT isnan({key}::DOUBLE) GROUP BY bin ORDER BY bin",
+            [edges[0], edges[-1], edges[0]]
+        )
+        return _bin_centers(stats, by, edges)
+
+
+class PolarsBackend(_MemoizedBackend):
+    """Agrégations exécutées par Polars (exécution en flux) sur le fichier écrit sur disque."""
+
+    name = "polars"
+    in_memory = False
+
+    def __init__(self, path, file_type):
+        super().__init__()
+        self._pl = pl = _import_backend("polars")
+        if file_type == "csv":
+            self._source = pl.scan_csv(path)
+        elif file_type == "parquet":
+            self._source = pl.scan_parquet(path)
+        else:
+            self._source = pl.scan_ipc(path)
+        schema = self._source.collect_schema()
+        self.columns = list(schema.names())
+        self.numeric_columns = [name for name, dtype in schema.items() if dtype.is_numeric()]
+
+    def _collect(self, query):
+        return query.collect(engine="streaming").to_pandas()
+
+    def row_count(self):
+        pl = self._pl
+        return self._memo("rows", lambda: int(self._collect(self._source.select(pl.len().alias("n")))["n"].iloc[0]))
+
+    def head(self, n=5):
+        return self._memo(("head", n), lambda: self._collect(self._source.head(n)))
+
+    def describe(self):
+        return self._memo("describe", self._describe)
+
+    def _describe(self):
+        pl = self._pl
+        exprs = []
+        for i, column in enumerate(self.columns):
+            exprs += [
+                pl.col(column).count().alias(f"count_{i}"), pl.col(column).null_count().alias(f"nulls_{i}"),
+                pl.col(column).approx_n_unique().alias(f"distinct_{i}"),
+            ]
+        for i, column in enumerate(self.numeric_columns):
+            c = pl.col(column).cast(pl.Float64)
+            exprs += [
+                c.mean().alias(f"mean_{i}"), c.std().alias(f"std_{i}"), c.min().alias(f"min_{i}"),
+                *(c.quantile(q, interpolation="linear").alias(f"q{j}_{i}") for j, q in enumerate(QUANTILES)),
+                c.max().alias(f"max_{i}"),
+            ]
+        row = self._collect(self._source.select(exprs)).iloc[0]
+        table = pd.DataFrame(np.nan, index=SUMMARY_INDEX, columns=self.columns)
+        for i, column in enumerate(self.columns):
+            # approx_n_unique compte la valeur manquante comme une valeur distincte
+            distinct = row[f"distinct_{i}"] - (row[f"nulls_{i}"] > 0)
+            table.loc[["count", "nulls", "distinct (≈)"], column] = [row[f"count_{i}"], row[f"nulls_{i}"], distinct]
+        for i, column in enumerate(self.numeric_columns):
+            table.loc[["mean", "std", "min", "25%", "50%", "75%", "max"], column] = [
+                row[f"mean_{i}"], row[f"std_{i}"], row[f"min_{i}"],
+                *(row[f"q{j}_{i}"] for j in range(len(QUANTILES))), row[f"max_{i}"]
+            ]
+        return table
+
+    def histogram(self, column):
+        return self._memo(("histogram", column), lambda: self._histogram(column))
+
+    def _histogram(self, column):
+        pl = self._pl
+        c = pl.col(column).cast(pl.Float64)
+        values = self._source.select(c.alias("v")).filter(pl.col("v").is_not_null() & pl.col("v").is_not_nan())
+        stats = self._collect(values.select(
+            pl.len().alias("n"), pl.col("v").min().alias("low"), pl.col("v").max().alias("high"),
+            pl.col("v").std().alias("std")
+        )).iloc[0]
+        n = int(stats["n"])
+        if n == 0:
+            return ColumnHistogram(np.zeros(BASE_BINS, dtype=np.int64), 0.0, 1.0, 0, 0.0)
+        low, high = float(stats["low"]), float(stats["high"])
+        std = 0.0 if pd.isna(stats["std"]) else float(stats["std"])
+        if high <= low:
+            low, high = low - 0.5, high + 0.5
+        bin_expr = ((pl.col("v") - low) / (high - low) * BASE_BINS).floor().clip(0, BASE_BINS - 1).cast(pl.Int64)
+        bins = self._collect(values.group_by(bin_expr.alias("bin")).agg(pl.len().alias("n")))
+        counts = np.zeros(BASE_BINS, dtype=np.int64)
+        counts[bins["bin"].to_numpy()] = bins["n"].to_numpy()
+        return ColumnHistogram(counts, low, high, n, std)
+
+    def scatter_sample(self, x_column, y_column, budget, seed=0):
+        return self._memo(("sample", x_column, y_column, budget, seed), lambda: self._sample(x_column, y_column, budget, seed))
+
+    def _sample(self, x_column, y_column, budget, seed):
+        pl = self._pl
+        columns = list(dict.fromkeys([x_column, y_column]))
+        rows = self.row_count()
+        query = self._source.select(columns)
+        if rows > budget:
+            # Tirage par hachage du numéro de ligne : reproductible et exécutable en flux
+            threshold = math.ceil(budget / rows * 2 ** 32)
+            index = pl.int_range(pl.len(), dtype=pl.UInt64).hash(seed) % (2 ** 32)
+            query = query.filter(index < threshold).head(budget)
+        return self._collect(query)
+
+    def _group_stats(self, by, value, edges):
+        pl = self._pl
+        c = pl.col(value).cast(pl.Float64)
+        aggregates = [c.count().alias("count"), c.mean().alias("mean"), c.std().alias("std")]
+        if edges is None:
+            query = self._source.filter(pl.col(by).is_not_null()).group_by(by).agg(aggregates).sort(by)
+            return self._collect(query)
+        n_bins = len(edges) - 1
+        k = pl.col(by).cast(pl.Float64)
+        bin_expr = ((k - edges[0]) / (edges[-1] - edges[0]) * n_bins).floor().clip(0, n_bins - 1).cast(pl.Int64)
+        query = (
+            self._source.filter(k.is_not_null() & k.is_not_nan())
+            .group_by(bin_expr.alias("bin")).agg(aggregates).sort("bin")
+        )
+        return _bin_centers(self._collect(query), by, edges)
+
+
+def _bin_centers(stats, by, edges):
+    """Remplace le numéro de classe (colonne ``bin``) par le centre de la classe, sous le nom ``by``."""
+    centers = (edges[:-1] + edges[1:]) / 2
+    stats = stats[stats["count"] > 0]
+    return pd.DataFrame({
+        by: centers[stats["bin"].to_numpy(dtype=np.int64)],
+        "count": stats["count"].to_numpy(dtype=np.int64),
+        "mean": stats["mean"].to_numpy(dtype=np.float64),
+        "std": stats["std"].to_numpy(dtype=np.float64, na_value=np.nan),
+    })
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def choose_backend(uploaded_file, name="auto"):
+    """Moteur à utiliser : ``name``, ou en mode automatique selon la taille du fichier."""
+    if name != "auto":
+        return name
+    if uploaded_file.size <= OUT_OF_CORE_THRESHOLD_BYTES:
+        return "pandas"
+    for candidate in available_backends():
+        if candidate != "pandas":
+            return candidate
+    return "pandas"
+
+
+def out_of_core_caption():
+    """Aide du choix du moteur de calcul."""
+    return (
+        f"En mode auto, les fichiers de plus de {format_bytes(OUT_OF_CORE_THRESHOLD_BYTES)} "
+        "sont traités hors mémoire (DuckDB ou Polars)."
+    )
+
+
+def open_backend(uploaded_file, name):
+    """Moteur hors mémoire ``name`` sur la copie disque de ``uploaded_file`` (partagé entre les sessions).
+
+    Le moteur est fermé quand le fichier n'a plus été utilisé par aucune
+    session depuis ``store.IDLE_TIMEOUT_SECONDS``.
+    """
+    content_key = uploaded_file_key(uploaded_file)
+    key = (content_key, name)
+    with _backends_lock:
+        if key not in _backends:
+            path = spill_to_disk(uploaded_file)
+            file_type = file_format(uploaded_file)
+            cls = DuckDBBackend if name == "duckdb" else PolarsBackend
+            _backends[key] = cls(path, file_type)
+        backend = _backends[key]
+    dataset_store.touch(content_key)
+    return backend
+
+
+def memory_backend(data, key):
+    """Moteur pandas du jeu de données ``key``, conservé d'une relance à l'autre avec ses résultats.
+
+    Comme les moteurs hors mémoire, il est fermé quand le jeu de données est
+    retiré pour inactivité.
+    """
+    with _backends_lock:
+        backend = _backends.get((key, "pandas"))
+        if backend is None or backend.data is not data:
+            # Jeu de données relu (après éviction du cache) : nouveau moteur
+            backend = _backends[(key, "pandas")] = PandasBackend(data, key=key)
+    return backend
+
+
+@dataset_store.on_evict
+def close_idle_backends(dataset_key):
+    """Ferme les moteurs d'un jeu de données retiré pour inactivité."""
+    with _backends_lock:
+        idle = [key for key in _backends if key[0] == dataset_key]
+        backends = [_backends.pop(key) for key in idle]
+    for backend in backends:
+        backend.close()
+
+
+def _tick_label(key):
+    # Centres de classes : quelques chiffres significatifs suffisent
+    return f"{key:.4g}" if isinstance(key, (float, np.floating)) else str(key)
+
+
+def draw_group_stats(ax, stats, by, value, kind="bar"):
+    """Moyenne de ``value`` par valeur de ``by``, avec un intervalle de confiance à 95 %.
+
+    Reproduit ``sns.barplot`` / ``sns.lineplot`` à partir des effectifs,
+    moyennes et écarts-types par groupe : intervalle par approximation
+    normale, ou colonnes ``ci_low`` / ``ci_high`` si ``stats`` les contient
+    (bootstrap).
+    """
+    means = stats["mean"].to_numpy(dtype=np.float64)
+    if "ci_low" in stats:
+        low, high = stats["ci_low"].to_numpy(dtype=np.float64), stats["ci_high"].to_numpy(dtype=np.float64)
+    else:
+        low, high = normal_interval(stats)
+    keys = stats[by].to_numpy()
+    if kind == "bar":
+        positions = np.arange(len(stats))
+        # Une seule collection de rectangles plutôt qu'un objet par barre
+        left, right = positions - 0.4, positions + 0.4
+        heights = np.nan_to_num(means)
+        corners = np.stack([
+            np.column_stack([left, np.zeros_like(heights)]), np.column_stack([left, heights]),
+            np.column_stack([right, heights]), np.column_stack([right, np.zeros_like(heights)]),
+        ], axis=1)
+        ax.add_collection(mcollections.PolyCollection(corners, facecolors="C0", alpha=0.8))
+        ax.vlines(positions, low, high, color="#424242", linewidth=1.5)
+        ax.autoscale_view()
+        # Au plus MAX_TICK_LABELS étiquettes : au-delà, le placement du texte domine le temps de dessin
+        step = max(1, math.ceil(len(stats) / MAX_TICK_LABELS))
+        ax.set_xticks(positions[::step], [_tick_label(key) for key in keys[::step]])
+    else:
+        ax.plot(keys, means, color="C0")
+        ax.fill_between(keys, low, high, color="C0", alpha=0.2, linewidth=0)
+    ax.set_xlabel(by)
+    ax.set_ylabel(value)
+    return ax
\ No newline at end of file
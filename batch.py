@@ -0,0 +1,116 @@
+"""Rendu en lot des graphiques d'EasyViz, sans navigateur.
+
+Dessine, pour chaque fichier (CSV, Parquet ou Feather), les mêmes graphiques
+que l'application, avec les fonctions de :mod:`charts`, et les enregistre
+dans ``<sortie>/<nom du fichier>/<graphique>.<format>``. Les fichiers sont
+répartis sur un groupe de processus.
+
+Exemple ::
+
+    python batch.py exports/*.csv --output rapports --charts distribution heatmap --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from charts import CHARTS, chart_set, download_plot
+from downsampling import DEFAULT_POINT_BUDGET, LINE_METHODS
+from ingestion import FILE_FORMATS
+from render import EXPORT_FORMATS
+from startup import lazy_import
+
+# Rendu sans affichage : startup fixe le backend Agg avant l'import de pyplot
+plt = lazy_import("matplotlib.pyplot")
+
+
+def read_dataset(path):
+    """Lit un fichier CSV, Parquet ou Feather d'après son extension."""
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    file_format = FILE_FORMATS.get(extension, "csv")
+    if file_format == "parquet":
+        return pd.read_parquet(path)
+    if file_format == "feather":
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+
+def render_file(path, output_dir, charts=CHARTS, file_format="png", **options):
+    """Dessine et enregistre les graphiques d'un fichier ; renvoie les chemins écrits."""
+    data = read_dataset(path)
+    target = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(target, exist_ok=True)
+    written = []
+    # Le groupe de processus répartit déjà les fichiers : pas de parallélisme imbriqué
+    for chart, fig in chart_set(data, charts, parallel=False, **options):
+        filename = os.path.join(target, f"{chart}.{file_format}")
+        try:
+            with open(filename, "wb") as f:
+                f.write(download_plot(fig, filename).getvalue())
+        finally:
+            plt.close(fig)
+        written.append(filename)
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rendu en lot des graphiques EasyViz.")
+    parser.add_argument("files", nargs="+", help="fichiers CSV, Parquet ou Feather")
+    parser.add_argument("-o", "--output", default="rapports", help="répertoire de sortie (défaut : rapports)")
+    parser.add_argument("--charts", nargs="+", choices=CHARTS, default=CHARTS, help="graphiques à produire")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="png", help="format des images")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="nombre de processus")
+    parser.add_argument("-x", "--x-column", help="colonne de l'axe X (défaut : la première)")
+    parser.add_argument("-y", "--y-column", help="colonne de l'axe Y (défaut : la première colonne numérique)")
+    parser.add_argument("--bins", type=int, default=10, help="nombre de classes de l'histogramme")
+    parser.add_argument("--point-budget", type=int, default=DEFAULT_POINT_BUDGET,
+                        help="nombre maximal de points par graphique")
+    parser.add_argument("--full-resolution", action="store_true", help="tracer toutes les lignes, sans décimation")
+    parser.add_argument("--pairplot-columns", nargs="+", help="colonnes du pairplot (défaut : les deux premières)")
+    parser.add_argument("--corr-method", choices=["pearson", "spearman"], default="pearson",
+                        help="coefficient de corrélation de la heatmap")
+    parser.add_argument("--line-method", choices=list(LINE_METHODS), default="lttb",
+                        help="décimation du graphique en ligne")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        "x_column": args.x_column,
+        "y_column": args.y_column,
+        "bins": args.bins,
+        "point_budget": args.point_budget,
+        "full_resolution": args.full_resolution,
+        "pairplot_columns": args.pairplot_columns,
+        "corr_method": args.corr_method,
+        "line_method": args.line_method,
+    }
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    start = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        futures = {
+            pool.submit(render_file, path, args.output, args.charts, args.format, **options): path
+            for path in args.files
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                written = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(futures)}] {path} : erreur : {e}", file=sys.stderr)
+            else:
+                print(f"[{done}/{len(futures)}] {path} : {len(written)} graphique(s)")
+    print(f"{len(futures) - failures} fichier(s) traité(s) en {time.perf_counter() - start:.1f} s, {failures} erreur(s).")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
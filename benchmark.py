@@ -0,0 +1,356 @@
+"""Mesures de performance des étapes de chargement et de rendu d'EasyViz.
+
+Génère des CSV synthétiques (colonnes de types mélangés) pour chaque taille
+demandée, puis chronomètre chaque étape du chemin suivi par l'application et
+mesure le pic de mémoire allouée pendant l'étape : lecture du CSV,
+``select_dtypes``, histogramme, scatterplot, graphique en ligne, pairplot,
+heatmap, export d'image (``download_plot``) et sérialisation d'une figure
+Plotly. L'étape ``startup`` mesure, dans un nouveau processus, le temps
+d'affichage de la page de téléversement de chaque application (imports
+compris). Les résultats sont écrits dans un rapport JSON qui peut être
+comparé à celui d'une exécution précédente. L'étape ``histplot`` vérifie
+aussi que la courbe KDE est à l'échelle des barres (code de sortie 1 sinon).
+
+Exemples ::
+
+    python benchmark.py --rows 10000 1000000 --columns 2 50 --output rapport.json
+    python benchmark.py --rows 50000000 --columns 500 --stages read_csv select_dtypes
+    python benchmark.py --stages startup --repeat 3
+    python benchmark.py --compare reference.json --output rapport.json --max-slowdown 1.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+
+from charts import (
+    correlation_heatmap_figure, distribution_figure, download_plot, lineplot_figure, scatterplot_figure
+)
+from correlation import ANNOT_MAX_COLUMNS
+from downsampling import DEFAULT_POINT_BUDGET, downsample_line, downsample_scatter
+from pairplot import PAIRPLOT_SAMPLE_ROWS, pairplot_figure
+from rasterize import RASTER_AUTO_ROWS
+from startup import lazy_import
+from webgl import binary_columns, resolve_render_mode
+
+# Rendu sans affichage : startup fixe le backend Agg avant l'import de pyplot
+matplotlib = lazy_import("matplotlib")
+plt = lazy_import("matplotlib.pyplot")
+
+# Étapes mesurées, dans l'ordre d'exécution
+STAGES = [
+    "read_csv", "select_dtypes", "histplot", "scatterplot", "lineplot",
+    "pairplot", "heatmap", "download_plot", "plotly_json",
+]
+
+# Mesure du démarrage à froid de chaque application (indépendante des jeux de données)
+STARTUP_STAGE = "startup"
+
+# Applications dont le démarrage est mesuré
+STARTUP_APPS = ["app.py", "app2", "app3.py", "app5.py", "appp.py", "Appv4.py"]
+
+# Types des colonnes synthétiques, attribués à tour de rôle
+COLUMN_KINDS = ["float", "int", "category", "datetime"]
+
+# Nombre de lignes écrites à la fois lors de la génération d'un CSV
+GENERATION_CHUNK_ROWS = 1_000_000
+
+# Nombre maximal de colonnes du pairplot mesuré (comme l'interface par défaut : quelques colonnes)
+PAIRPLOT_COLUMNS = 4
+
+# Version du format du rapport
+REPORT_VERSION = 1
+
+# Rapport admis entre le sommet de la KDE et la plus haute barre de l'histogramme
+KDE_BAR_RATIO_RANGE = (0.5, 1.5)
+
+
+def column_names(columns):
+    """Noms des colonnes synthétiques : les deux premières sont numériques (axes X et Y)."""
+    return [f"{COLUMN_KINDS[i % len(COLUMN_KINDS)]}_{i}" for i in range(columns)]
+
+
+def synthetic_frame(rows, columns, seed=0, start=0):
+    """DataFrame synthétique de ``rows`` lignes ; ``start`` décale l'index (génération par morceaux)."""
+    rng = np.random.default_rng([seed, start])
+    data = {}
+    for name in column_names(columns):
+        kind = name.split("_")[0]
+        if kind == "float":
+            data[name] = rng.normal(size=rows)
+        elif kind == "int":
+            data[name] = rng.integers(0, 1000, size=rows)
+        elif kind == "category":
+            data[name] = pd.Categorical.from_codes(rng.integers(0, 20, size=rows), [f"cat{i}" for i in range(20)])
+        else:
+            data[name] = pd.Timestamp("2020-01-01") + pd.to_timedelta(np.arange(start, start + rows), unit="s")
+    return pd.DataFrame(data)
+
+
+def write_synthetic_csv(path, rows, columns, seed=0, chunk_rows=GENERATION_CHUNK_ROWS):
+    """Écrit un CSV synthétique par morceaux, sans jamais tenir tout le fichier en mémoire."""
+    with open(path, "w", newline="") as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = synthetic_frame(min(chunk_rows, rows - start), columns, seed=seed, start=start)
+            chunk.to_csv(f, index=False, header=start == 0)
+    return path
+
+
+def dataset_path(data_dir, rows, columns, seed=0):
+    """Chemin du CSV synthétique ``rows`` × ``columns``, généré s'il n'existe pas encore."""
+    path = os.path.join(data_dir, f"synthetic_{rows}x{columns}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        # Écriture dans un fichier temporaire : un CSV interrompu n'est jamais réutilisé
+        write_synthetic_csv(path + ".tmp", rows, columns, seed=seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def measure(function, *args, trace_memory=True, **kwargs):
+    """Exécute ``function`` ; renvoie (résultat, secondes, pic de mémoire allouée en octets)."""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter() - start
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def _scatterplot(data, x_column, y_column):
+    # Même choix que l'interface : image rastérisée au-delà de RASTER_AUTO_ROWS lignes
+    if len(data) > RASTER_AUTO_ROWS:
+        return scatterplot_figure(data, x_column, y_column, rasterized=True)
+    return scatterplot_figure(downsample_scatter(data, x_column, y_column, DEFAULT_POINT_BUDGET), x_column, y_column)
+
+
+def _lineplot(data, x_column, y_column):
+    return lineplot_figure(downsample_line(data, x_column, y_column, DEFAULT_POINT_BUDGET), x_column, y_column)
+
+
+def kde_bar_ratio(fig):
+    """Sommet de la courbe KDE divisé par la hauteur de la plus haute barre (``None`` sans KDE)."""
+    ax = fig.axes[0]
+    if not ax.lines or not ax.patches:
+        return None
+    peak = max(line.get_ydata().max() for line in ax.lines)
+    return float(peak / max(patch.get_height() for patch in ax.patches))
+
+
+def _heatmap(data, numeric_columns):
+    return correlation_heatmap_figure(data, numeric_columns, reorder=len(numeric_columns) > ANNOT_MAX_COLUMNS)
+
+
+def _plotly_json(data, x_column, y_column):
+    plot_data = downsample_scatter(data, x_column, y_column, DEFAULT_POINT_BUDGET)
+    fig = px.scatter(
+        binary_columns(plot_data, [x_column, y_column]), x=x_column, y=y_column,
+        render_mode=resolve_render_mode("auto", len(plot_data))
+    )
+    return fig.to_json()
+
+
+def run_case(path, stages=STAGES, repeat=1, trace_memory=True):
+    """Mesures des étapes ``stages`` sur le CSV ``path`` : une entrée par étape (meilleur temps)."""
+    results = {}
+
+    def record(stage, function, *args):
+        best = None
+        for _ in range(repeat):
+            value, seconds, peak = measure(function, *args, trace_memory=trace_memory)
+            if isinstance(value, plt.Figure):
+                plt.close(value)
+            if best is None or seconds < best["seconds"]:
+                best = {"seconds": seconds, "peak_bytes": peak}
+        results[stage] = best
+        return value
+
+    # Lecture et sélection des colonnes : nécessaires aux autres étapes, même non demandées
+    if "read_csv" in stages:
+        data = record("read_csv", pd.read_csv, path)
+    else:
+        data = pd.read_csv(path)
+    if "select_dtypes" in stages:
+        numeric = record("select_dtypes", data.select_dtypes, "number")
+    else:
+        numeric = data.select_dtypes(include="number")
+    numeric_columns = numeric.columns.tolist()
+    x_column = numeric_columns[0]
+    y_column = numeric_columns[1] if len(numeric_columns) > 1 else numeric_columns[0]
+
+    if "histplot" in stages:
+        fig = record("histplot", distribution_figure, data, y_column)
+        # Contrôle du rendu : la KDE doit rester à l'échelle des barres
+        results["histplot"]["kde_bar_ratio"] = kde_bar_ratio(fig)
+    if "scatterplot" in stages:
+        record("scatterplot", _scatterplot, data, x_column, y_column)
+    if "lineplot" in stages:
+        record("lineplot", _lineplot, data, x_column, y_column)
+    if "pairplot" in stages and len(numeric_columns) > 1:
+        record("pairplot", pairplot_figure, data, numeric_columns[:PAIRPLOT_COLUMNS], "sample", PAIRPLOT_SAMPLE_ROWS)
+    if "heatmap" in stages and len(numeric_columns) > 1:
+        record("heatmap", _heatmap, data, numeric_columns)
+    if "download_plot" in stages and len(numeric_columns) > 1:
+        # Export PNG de la heatmap, la figure la plus chargée
+        fig = _heatmap(data, numeric_columns)
+        try:
+            record("download_plot", download_plot, fig)
+        finally:
+            plt.close(fig)
+    if "plotly_json" in stages:
+        record("plotly_json", _plotly_json, data, x_column, y_column)
+    return results
+
+
+def startup_seconds(app):
+    """Durée d'affichage de la page de téléversement de ``app`` dans un nouveau processus.
+
+    Comprend l'import de Streamlit et des modules de l'application, sans le
+    préchauffage en arrière-plan (désactivé pour ne mesurer que le chemin critique).
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), app)
+    code = (
+        "import time; start = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        f"AppTest.from_file({path!r}, default_timeout=600).run()\n"
+        "print(time.perf_counter() - start)"
+    )
+    env = dict(os.environ, EASYVIZ_PREWARM="0")
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env, cwd=os.path.dirname(path)
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def environment():
+    """Versions et machine, pour ne comparer que des rapports comparables."""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "plotly": plotly.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_benchmark(rows_list, columns_list, data_dir, stages=STAGES, repeat=1, trace_memory=True, seed=0, log=print):
+    """Rapport complet : une entrée par (lignes, colonnes, étape)."""
+    # pyplot importé avant les mesures : son import ne compte dans aucune étape
+    plt.get_backend()
+    results = []
+    if STARTUP_STAGE in stages:
+        for app in STARTUP_APPS:
+            seconds = min(startup_seconds(app) for _ in range(repeat))
+            # Lignes et colonnes à 0 : la comparaison des rapports reste indexée de la même façon
+            results.append({"rows": 0, "columns": 0, "stage": f"{STARTUP_STAGE}:{app}", "seconds": seconds, "peak_bytes": None})
+            log(f"{'démarrage':>10}   {app:<19} {seconds:9.3f} s")
+    if not any(stage in STAGES for stage in stages):
+        rows_list = []
+    for rows in rows_list:
+        for columns in columns_list:
+            path = dataset_path(data_dir, rows, columns, seed=seed)
+            for stage, measures in run_case(path, stages, repeat, trace_memory).items():
+                results.append({"rows": rows, "columns": columns, "stage": stage, **measures})
+                peak = measures["peak_bytes"]
+                log(f"{rows:>10} × {columns:<4} {stage:<14} {measures['seconds']:9.3f} s"
+                    + ("" if peak is None else f" {peak / 1024 ** 2:10.1f} Mo"))
+    return {
+        "version": REPORT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {"repeat": repeat, "trace_memory": trace_memory, "seed": seed},
+        "results": results,
+    }
+
+
+def compare_reports(report, baseline):
+    """Rapport des temps par rapport à ``baseline`` : une ligne par mesure présente dans les deux."""
+    reference = {(r["rows"], r["columns"], r["stage"]): r for r in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        previous = reference.get((result["rows"], result["columns"], result["stage"]))
+        if previous is None or not previous["seconds"]:
+            continue
+        rows.append({
+            "rows": result["rows"],
+            "columns": result["columns"],
+            "stage": result["stage"],
+            "baseline_seconds": previous["seconds"],
+            "seconds": result["seconds"],
+            "ratio": result["seconds"] / previous["seconds"],
+        })
+    return pd.DataFrame(rows, columns=["rows", "columns", "stage", "baseline_seconds", "seconds", "ratio"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mesures de performance des graphiques EasyViz.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="nombres de lignes des jeux de données synthétiques")
+    parser.add_argument("--columns", type=int, nargs="+", default=[2, 10, 50],
+                        help="nombres de colonnes des jeux de données synthétiques")
+    parser.add_argument("--stages", nargs="+", choices=STAGES + [STARTUP_STAGE], default=STAGES,
+                        help="étapes mesurées (startup : démarrage de chaque application)")
+    parser.add_argument("--repeat", type=int, default=1, help="répétitions par étape (le meilleur temps est retenu)")
+    parser.add_argument("--data-dir", default="benchmark_data", help="répertoire des CSV générés (réutilisés)")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="rapport JSON")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="ne pas mesurer la mémoire (tracemalloc ralentit les étapes en Python pur)")
+    parser.add_argument("--seed", type=int, default=0, help="graine des données synthétiques")
+    parser.add_argument("--compare", help="rapport JSON de référence")
+    parser.add_argument("--max-slowdown", type=float,
+                        help="avec --compare : code de sortie 1 si une étape est plus lente que ce ratio")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if any(columns < 2 for columns in args.columns):
+        raise SystemExit("Il faut au moins 2 colonnes (axes X et Y).")
+    report = run_benchmark(
+        args.rows, args.columns, args.data_dir, stages=args.stages, repeat=args.repeat,
+        trace_memory=not args.no_memory, seed=args.seed
+    )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Rapport écrit dans {args.output}")
+
+    low, high = KDE_BAR_RATIO_RANGE
+    misplaced = [
+        result for result in report["results"]
+        if result.get("kde_bar_ratio") is not None and not low <= result["kde_bar_ratio"] <= high
+    ]
+    for result in misplaced:
+        print(f"KDE hors d'échelle ({result['rows']} × {result['columns']}) : "
+              f"sommet = {result['kde_bar_ratio']:.3g} × la plus haute barre.")
+    if misplaced:
+        return 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare_reports(report, json.load(f))
+        print(comparison.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        if args.max_slowdown and (comparison["ratio"] > args.max_slowdown).any():
+            print(f"Régression : au moins une étape est plus de {args.max_slowdown} fois plus lente.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
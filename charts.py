@@ -0,0 +1,131 @@
+"""Graphiques d'EasyViz, indépendants de Streamlit.
+
+Les applications et le rendu en lot (``batch.py``) dessinent leurs
+graphiques avec les mêmes fonctions : chacune renvoie une figure matplotlib
+et ne dépend que du DataFrame et des paramètres du graphique. La décimation
+des points (``downsample_*``) reste à la charge de l'appelant, qui affiche
+le nombre de points retenus.
+"""
+import os
+from io import BytesIO
+
+from correlation import ANNOT_MAX_COLUMNS, correlation_matrix, heatmap_figure
+from distribution import ColumnHistogram, column_histogram, draw_distribution
+from downsampling import DEFAULT_POINT_BUDGET, downsample_line, downsample_scatter, numeric_values
+from pairplot import PAIRPLOT_SAMPLE_ROWS, pairplot_figure
+from profiling import span
+from rasterize import RASTER_AUTO_ROWS, draw_raster, rasterize_frame
+from startup import lazy_import
+
+# Bibliothèques de graphiques, importées au premier graphique (voir startup.py)
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+
+# Résolution des images rendues (celle qu'utilise st.pyplot)
+RENDER_DPI = 200
+
+# Graphiques disponibles, dans l'ordre des onglets
+CHARTS = ["distribution", "scatterplot", "lineplot", "pairplot", "heatmap"]
+
+
+# Fonction pour télécharger des graphiques (le format suit l'extension du nom de fichier)
+def download_plot(fig, filename="graphique.png"):
+    buf = BytesIO()
+    file_format = os.path.splitext(filename)[1].lstrip(".").lower() or "png"
+    with span(f"encodage {file_format.upper()}"):
+        fig.savefig(buf, format=file_format, bbox_inches="tight", dpi=RENDER_DPI)
+    buf.seek(0)
+    return buf
+
+
+def distribution_figure(data, column, bins=10, dataset_key=None):
+    """Histogramme et KDE de ``column``.
+
+    Avec ``dataset_key``, l'histogramme de base est pris dans le cache des histogrammes.
+    """
+    if dataset_key is None:
+        histogram = ColumnHistogram.from_values(numeric_values(data[column]))
+    else:
+        histogram = column_histogram(dataset_key, data, column)
+    return histogram_figure(histogram, column, bins)
+
+
+def histogram_figure(histogram, column, bins=10):
+    """Histogramme et KDE d'un histogramme de base déjà calculé (voir distribution.py)."""
+    fig, ax = plt.subplots()
+    draw_distribution(ax, histogram, bins, label=column)
+    ax.set_title(f"Distribution de {column}")
+    return fig
+
+
+def scatterplot_figure(data, x_column, y_column, rasterized=False, value_column=None):
+    """Nuage de points de ``data`` (déjà décimé), ou image rastérisée de toutes ses lignes."""
+    fig, ax = plt.subplots()
+    if rasterized:
+        # Agrégation des points sur une grille de pixels : coût indépendant du nombre de lignes
+        grid, extent = rasterize_frame(data, x_column, y_column, value_column)
+        draw_raster(
+            ax, grid, extent, log_scale=value_column is None,
+            label="Nombre de points" if value_column is None else f"Moyenne de {value_column}"
+        )
+        ax.set_xlabel(x_column)
+        ax.set_ylabel(y_column)
+    else:
+        sns.scatterplot(data=data, x=x_column, y=y_column, ax=ax, color="blue")
+    ax.set_title(f"Scatterplot : {y_column} vs {x_column}")
+    return fig
+
+
+def lineplot_figure(data, x_column, y_column):
+    """Graphique en ligne de ``data`` (déjà décimé)."""
+    fig, ax = plt.subplots()
+    data.plot(x=x_column, y=y_column, kind="line", ax=ax, color="purple")
+    ax.set_title(f"Graphique en ligne : {y_column} vs {x_column}")
+    return fig
+
+
+def correlation_heatmap_figure(data, columns, method="pearson", reorder=False):
+    """Heatmap des corrélations entre ``columns``."""
+    return heatmap_figure(correlation_matrix(data, columns, method=method), reorder=reorder)
+
+
+def default_columns(data):
+    """Colonnes X et Y proposées par défaut : la première colonne et la première colonne numérique distincte."""
+    numeric_columns = data.select_dtypes(include="number").columns.tolist()
+    x_column = data.columns[0] if len(data.columns) else None
+    candidates = [column for column in numeric_columns if column != x_column] or numeric_columns
+    return x_column, candidates[0] if candidates else None
+
+
+def chart_set(data, charts=CHARTS, x_column=None, y_column=None, bins=10, point_budget=DEFAULT_POINT_BUDGET,
+              full_resolution=False, pairplot_columns=None, corr_method="pearson", line_method="lttb", parallel=None):
+    """Figures des graphiques ``charts`` d'un jeu de données, une par une.
+
+    Produit des couples (nom, figure) avec les réglages par défaut de
+    l'interface ; les graphiques impossibles (colonnes manquantes) sont omis.
+    """
+    default_x, default_y = default_columns(data)
+    x_column = x_column or default_x
+    y_column = y_column or default_y
+    numeric_columns = data.select_dtypes(include="number").columns.tolist()
+    pairplot_columns = pairplot_columns or numeric_columns[:2]
+    for chart in charts:
+        if chart == "distribution" and y_column:
+            yield chart, distribution_figure(data, y_column, bins)
+        elif chart == "scatterplot" and x_column and y_column:
+            if len(data) > RASTER_AUTO_ROWS:
+                yield chart, scatterplot_figure(data, x_column, y_column, rasterized=True)
+            else:
+                plot_data = data if full_resolution else downsample_scatter(data, x_column, y_column, point_budget)
+                yield chart, scatterplot_figure(plot_data, x_column, y_column)
+        elif chart == "lineplot" and x_column and y_column:
+            plot_data = data if full_resolution else downsample_line(
+                data, x_column, y_column, point_budget, method=line_method
+            )
+            yield chart, lineplot_figure(plot_data, x_column, y_column)
+        elif chart == "pairplot" and len(pairplot_columns) >= 2:
+            sample_size = len(data) if full_resolution else PAIRPLOT_SAMPLE_ROWS
+            yield chart, pairplot_figure(data, pairplot_columns, sample_size=sample_size, parallel=parallel)
+        elif chart == "heatmap" and len(numeric_columns) > 1:
+            reorder = len(numeric_columns) > ANNOT_MAX_COLUMNS
+            yield chart, correlation_heatmap_figure(data, numeric_columns, method=corr_method, reorder=reorder)
\ No newline at end of file
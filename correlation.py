@@ -0,0 +1,221 @@
+"""Matrices de corrélation calculées par blocs, et heatmap des corrélations.
+
+Les corrélations sont obtenues à partir de sommes cumulées (effectifs,
+sommes, sommes des carrés et des produits), mises à jour bloc de lignes par
+bloc de lignes. Le calcul fonctionne donc sur un fichier lu en flux, plus
+grand que la mémoire, et les accumulateurs de plusieurs blocs peuvent être
+fusionnés. Les produits matriciels sont découpés en blocs de colonnes,
+calculés en parallèle pour les jeux de données très larges.
+
+Comme ``DataFrame.corr``, chaque couple de colonnes utilise les lignes où
+les deux valeurs sont renseignées.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from startup import lazy_import
+
+# Importés au premier dessin de heatmap : les calculs de corrélation n'en dépendent pas
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+
+# Nombre de lignes par bloc
+DEFAULT_CHUNKSIZE = 100_000
+
+# Largeur des blocs de colonnes des produits matriciels
+COLUMN_BLOCK_SIZE = 128
+
+# Au-delà de ce nombre de colonnes, la heatmap n'affiche plus les valeurs
+ANNOT_MAX_COLUMNS = 20
+
+# Nombre de classes par colonne pour les rangs approchés (Spearman en flux)
+RANK_BINS = 4096
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="easyviz-corr")
+    return _pool
+
+
+def _add_gram(out, a, b, block_size=COLUMN_BLOCK_SIZE):
+    """``out += a.T @ b``, calculé par blocs de colonnes en parallèle si nécessaire."""
+    k = a.shape[1]
+    if k <= block_size:
+        out += a.T @ b
+        return
+    blocks = [slice(start, start + block_size) for start in range(0, k, block_size)]
+
+    def _block(rows, columns):
+        out[rows, columns] += a[:, rows].T @ b[:, columns]
+
+    # NumPy relâche le GIL pendant les produits matriciels
+    futures = [_get_pool().submit(_block, rows, columns) for rows in blocks for columns in blocks]
+    for future in futures:
+        future.result()
+
+
+class CorrelationAccumulator:
+    """Sommes cumulées permettant de calculer une matrice de corrélation de Pearson."""
+
+    def __init__(self, columns, block_size=COLUMN_BLOCK_SIZE):
+        self.columns = list(columns)
+        self.block_size = block_size
+        k = len(self.columns)
+        self.shift = None
+        self.count = np.zeros((k, k))
+        self.sum = np.zeros((k, k))
+        self.sum_sq = np.zeros((k, k))
+        self.sum_prod = np.zeros((k, k))
+
+    def update(self, chunk):
+        """Ajoute un bloc de lignes (DataFrame contenant ``columns``)."""
+        values = chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        if self.shift is None:
+            # Décalage par la moyenne du premier bloc : limite les erreurs d'arrondi
+            valid = ~np.isnan(values)
+            self.shift = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+        values = values - self.shift
+        valid = ~np.isnan(values)
+        values = np.where(valid, values, 0.0)
+        mask = valid.astype(np.float64)
+        _add_gram(self.count, mask, mask, self.block_size)
+        _add_gram(self.sum, values, mask, self.block_size)
+        _add_gram(self.sum_sq, values * values, mask, self.block_size)
+        _add_gram(self.sum_prod, values, values, self.block_size)
+        return self
+
+    def merge(self, other):
+        """Fusionne un accumulateur calculé sur d'autres lignes."""
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift
+        # Ramène les sommes de l'autre accumulateur au décalage de celui-ci
+        delta = other.shift - self.shift
+        d_i, d_j = delta[:, None], delta[None, :]
+        self.sum_prod += other.sum_prod + d_j * other.sum + d_i * other.sum.T + other.count * d_i * d_j
+        self.sum_sq += other.sum_sq + 2 * d_i * other.sum + other.count * d_i ** 2
+        self.sum += other.sum + other.count * d_i
+        self.count += other.count
+        return self
+
+    def matrix(self):
+        """Matrice de corrélation de Pearson."""
+        n = self.count
+        numerator = n * self.sum_prod - self.sum * self.sum.T
+        var_i = n * self.sum_sq - self.sum ** 2
+        var_j = var_i.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = numerator / np.sqrt(var_i * var_j)
+        corr[(n < 2) | (var_i <= 0) | (var_j <= 0)] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        diagonal = np.diag(n) >= 2
+        corr[np.diag_indices_from(corr)] = np.where(diagonal & (np.diag(var_i) > 0), 1.0, np.nan)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def iter_frame_chunks(data, chunksize=DEFAULT_CHUNKSIZE):
+    """Blocs de lignes successifs d'un DataFrame (vues, sans copie)."""
+    for start in range(0, len(data), chunksize):
+        yield data.iloc[start:start + chunksize]
+
+
+def pearson_from_chunks(chunks, columns):
+    """Corrélation de Pearson sur une suite de blocs de lignes."""
+    accumulator = CorrelationAccumulator(columns)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator.matrix()
+
+
+def spearman_from_chunks(chunk_factory, columns, n_bins=RANK_BINS):
+    """Corrélation de Spearman approchée, en deux passes sur les blocs.
+
+    ``chunk_factory()`` renvoie un nouvel itérateur de blocs. La première passe
+    construit un histogramme fin de chaque colonne ; la seconde remplace chaque
+    valeur par le rang moyen de sa classe, puis accumule la corrélation de
+    Pearson de ces rangs.
+    """
+    columns = list(columns)
+    low = np.full(len(columns), np.inf)
+    high = np.full(len(columns), -np.inf)
+    for chunk in chunk_factory():
+        values = chunk[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        if len(values):
+            # fmin/fmax ignorent les NaN, sans avertissement pour une colonne entièrement vide
+            low = np.fmin(low, np.fmin.reduce(values, axis=0))
+            high = np.fmax(high, np.fmax.reduce(values, axis=0))
+    span = np.where(high > low, high - low, 1.0)
+
+    def _bins(values):
+        positions = (values - low) / span * n_bins
+        return np.clip(np.nan_to_num(positions, nan=0).astype(np.int64), 0, n_bins - 1)
+
+    counts = np.zeros((len(columns), n_bins))
+    for chunk in chunk_factory():
+        values = chunk[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        bins = _bins(values)
+        for i in range(len(columns)):
+            counts[i] += np.bincount(bins[~np.isnan(values[:, i]), i], minlength=n_bins)
+    # Rang moyen des valeurs de chaque classe
+    mid_ranks = np.cumsum(counts, axis=1) - (counts - 1) / 2
+
+    accumulator = CorrelationAccumulator(columns)
+    for chunk in chunk_factory():
+        values = chunk[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        ranks = np.take_along_axis(mid_ranks.T, _bins(values), axis=0)
+        ranks[np.isnan(values)] = np.nan
+        accumulator.update(pd.DataFrame(ranks, columns=columns))
+    return accumulator.matrix()
+
+
+def correlation_matrix(data, columns, method="pearson", chunksize=DEFAULT_CHUNKSIZE):
+    """Matrice de corrélation d'un DataFrame en mémoire, calculée par blocs.
+
+    Contrairement à ``data[columns].corr()``, le calcul ne recopie jamais
+    toutes les colonnes en flottants d'un coup.
+    """
+    columns = list(columns)
+    if method == "spearman":
+        # En mémoire, les rangs exacts sont disponibles
+        ranks = data[columns].rank()
+        return pearson_from_chunks(iter_frame_chunks(ranks, chunksize), columns)
+    return pearson_from_chunks(iter_frame_chunks(data, chunksize), columns)
+
+
+def cluster_order(corr):
+    """Ordre des colonnes regroupant les variables corrélées (sériation spectrale).
+
+    Les colonnes sont triées selon le vecteur de Fiedler du laplacien du
+    graphe pondéré par |corrélation|.
+    """
+    affinity = np.abs(np.nan_to_num(corr.to_numpy(), nan=0.0))
+    np.fill_diagonal(affinity, 0.0)
+    if len(affinity) < 3 or not affinity.any():
+        return list(corr.columns)
+    laplacian = np.diag(affinity.sum(axis=1)) - affinity
+    _, vectors = np.linalg.eigh(laplacian)
+    order = np.argsort(vectors[:, 1], kind="stable")
+    return [corr.columns[i] for i in order]
+
+
+def heatmap_figure(corr, title="Matrice de corrélation", reorder=False):
+    """Heatmap d'une matrice de corrélation, lisible même avec des centaines de colonnes."""
+    if reorder:
+        order = cluster_order(corr)
+        corr = corr.loc[order, order]
+    k = len(corr)
+    annot = k <= ANNOT_MAX_COLUMNS
+    size = max(10, min(0.25 * k, 40))
+    fig, ax = plt.subplots(figsize=(10, 6) if annot else (size, size * 0.8))
+    sns.heatmap(corr, annot=annot, cmap="coolwarm", vmin=-1, vmax=1, ax=ax,
+                xticklabels="auto", yticklabels="auto")
+    ax.set_title(title)
+    return fig
\ No newline at end of file
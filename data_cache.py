@@ -0,0 +1,208 @@
+"""Caches LRU bornés en mémoire, dont celui des jeux de données téléversés.
+
+Chaque interaction Streamlit relance le script complet : sans cache, le même
+fichier est relu par ``pd.read_csv`` à chaque mouvement de curseur. Le cache
+conserve les DataFrames déjà analysés en mémoire et évince les moins
+récemment utilisés lorsque le budget mémoire est dépassé. Les jeux de données
+sont indexés par l'empreinte du contenu du fichier.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Budget mémoire par défaut du cache (2 Go)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Budget mémoire des jeux de données, partagé par toutes les sessions du serveur
+# (EASYVIZ_MAX_DATASET_BYTES, en octets ; 2 Go par défaut)
+DATASET_MAX_BYTES = int(os.environ.get("EASYVIZ_MAX_DATASET_BYTES") or DEFAULT_MAX_BYTES)
+
+
+def content_hash(raw_bytes):
+    """Empreinte du contenu brut d'un fichier."""
+    return hashlib.blake2b(raw_bytes, digest_size=16).hexdigest()
+
+
+def frame_nbytes(data):
+    """Mémoire occupée par un DataFrame, chaînes de caractères comprises."""
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+
+def value_nbytes(value):
+    """Mémoire occupée par une valeur mise en cache (DataFrame ou octets)."""
+    if isinstance(value, pd.DataFrame):
+        return frame_nbytes(value)
+    return len(value)
+
+
+class LRUCache:
+    """Cache LRU borné en mémoire, avec compteurs de succès/échecs.
+
+    ``on_evict`` est appelé avec chaque valeur évincée ou vidée du cache, pour
+    libérer les ressources qu'elle détient.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, on_evict=None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def keys(self):
+        """Clés en cache, de la moins à la plus récemment utilisée."""
+        with self._lock:
+            return list(self._entries)
+
+    def nbytes(self, key):
+        """Mémoire comptée pour l'entrée ``key`` (0 si absente)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return 0 if entry is None else entry[1]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = value_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                previous, previous_nbytes = self._entries.pop(key)
+                if previous is value:
+                    self.current_bytes -= previous_nbytes
+                else:
+                    self._release(previous, previous_nbytes)
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def pop(self, key):
+        """Retire une entrée du cache et la renvoie (``None`` si absente)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.current_bytes -= entry[1]
+            return entry[0]
+
+    def get_or_load(self, key, loader):
+        """Renvoie la valeur en cache ou l'obtient via ``loader()``."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def _evict(self):
+        # L'entrée la plus récente est toujours conservée, même si elle dépasse le budget
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._release(*entry)
+            self.evictions += 1
+
+    def _release(self, value, nbytes):
+        self.current_bytes -= nbytes
+        if self.on_evict is not None:
+            self.on_evict(value)
+
+    def clear(self):
+        with self._lock:
+            while self._entries:
+                self._release(*self._entries.popitem(last=False)[1])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Les modules importés survivent aux relances du script : ce cache est partagé
+# par toutes les relances et toutes les sessions du processus Streamlit.
+dataset_cache = LRUCache(max_bytes=DATASET_MAX_BYTES)
+
+# Nombre d'empreintes de fichiers mémorisées (les plus récemment utilisées)
+MAX_FILE_HASHES = 256
+
+# Empreintes déjà calculées, par identifiant de fichier Streamlit, pour éviter
+# de re-hacher plusieurs centaines de Mo à chaque relance.
+_hash_by_file_id = OrderedDict()
+_hash_lock = threading.Lock()
+
+
+def uploaded_file_key(uploaded_file):
+    """Clé de cache d'un fichier téléversé (empreinte de son contenu)."""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None:
+        with _hash_lock:
+            if file_id in _hash_by_file_id:
+                _hash_by_file_id.move_to_end(file_id)
+                return _hash_by_file_id[file_id]
+    key = content_hash(uploaded_file.getvalue())
+    if file_id is not None:
+        with _hash_lock:
+            _hash_by_file_id[file_id] = key
+            while len(_hash_by_file_id) > MAX_FILE_HASHES:
+                _hash_by_file_id.popitem(last=False)
+    return key
+
+
+def read_csv_cached(uploaded_file, cache=None, **read_kwargs):
+    """Lit un CSV téléversé une seule fois, puis le sert depuis le cache."""
+    cache = dataset_cache if cache is None else cache
+    key = uploaded_file_key(uploaded_file)
+    if read_kwargs:
+        key = f"{key}:{sorted(read_kwargs.items())!r}"
+
+    def _load():
+        uploaded_file.seek(0)
+        return pd.read_csv(uploaded_file, **read_kwargs)
+
+    return cache.get_or_load(key, _load)
+
+
+def format_bytes(nbytes):
+    """Taille lisible (o, Ko, Mo, Go)."""
+    if abs(nbytes) < 1024:
+        return f"{nbytes:.0f} o"
+    for unit in ("Ko", "Mo"):
+        nbytes /= 1024
+        if abs(nbytes) < 1024:
+            return f"{nbytes:.1f} {unit}"
+    return f"{nbytes / 1024:.1f} Go"
+
+
+def cache_stats_caption(cache=None, label="Cache des données"):
+    """Résumé des compteurs d'un cache, à afficher dans la barre latérale."""
+    stats = (dataset_cache if cache is None else cache).stats()
+    return (
+        f"{label} : {stats['hits']} succès, {stats['misses']} échecs, "
+        f"{format_bytes(stats['bytes'])} / {format_bytes(stats['max_bytes'])}"
+    )
@@ -0,0 +1,196 @@
+"""Histogrammes et estimation de densité (KDE) pré-agrégés.
+
+Chaque colonne est parcourue une seule fois pour construire un histogramme
+fin de ``BASE_BINS`` classes, conservé en cache. Les histogrammes de 5 à 50
+classes affichés par l'onglet de distribution en sont dérivés sans relire les
+données, et la KDE est calculée sur cet histogramme par une convolution FFT,
+dont le coût ne dépend que de la taille de la grille.
+
+Le rendu reproduit celui de ``sns.histplot(kde=True)`` : classes de largeur
+constante entre le minimum et le maximum, largeur de bande de Scott, courbe
+limitée à l'étendue des données et mise à l'échelle des effectifs.
+"""
+import math
+
+import numpy as np
+
+from data_cache import LRUCache
+from startup import lazy_import
+
+# Importé au premier histogramme
+mcolors = lazy_import("matplotlib.colors")
+
+# Nombre de classes de l'histogramme de base. 55 440 est divisible par la
+# plupart des nombres de classes proposés (5 à 12, 14, 15, 16, 18, 20...) :
+# ces histogrammes sont alors exacts ; les autres sont interpolés à moins
+# d'une classe fine près.
+BASE_BINS = 55_440
+
+# Taille de la grille de la KDE (BASE_BINS / 36)
+KDE_GRID = 1_540
+
+# Nombre de points de la courbe KDE (celui de seaborn)
+KDE_POINTS = 200
+
+# Budget mémoire du cache des histogrammes de base (64 Mo)
+DEFAULT_MAX_BYTES = 64 * 1024 ** 2
+
+
+class ColumnHistogram:
+    """Histogramme fin d'une colonne et ses statistiques."""
+
+    def __init__(self, counts, low, high, n, std, mean=None):
+        self.counts = counts
+        self.low = low
+        self.high = high
+        self.n = n
+        self.std = std
+        # Moyenne, nécessaire pour mettre à jour l'écart type (voir extend)
+        self.mean = mean
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes
+
+    @classmethod
+    def from_values(cls, values):
+        """Histogramme de base d'un tableau de flottants (``NaN`` ignorés)."""
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return cls(np.zeros(BASE_BINS, dtype=np.int64), 0.0, 1.0, 0, 0.0)
+        low, high = float(values.min()), float(values.max())
+        std = float(values.std(ddof=1)) if n > 1 else 0.0
+        if high <= low:
+            # Valeur unique : même étendue que np.histogram
+            low, high = low - 0.5, high + 0.5
+        positions = ((values - low) / (high - low) * BASE_BINS).astype(np.int64)
+        counts = np.bincount(np.clip(positions, 0, BASE_BINS - 1), minlength=BASE_BINS)
+        return cls(counts, low, high, n, std, mean=float(values.mean()))
+
+    def extend(self, values):
+        """Ajoute des valeurs (``NaN`` ignorés) sans relire celles déjà comptées.
+
+        Si les nouvelles valeurs sortent de l'étendue, les classes fines
+        existantes sont redistribuées sur la nouvelle étendue, à une classe fine
+        près. L'effectif, la moyenne et l'écart type sont fusionnés exactement.
+        """
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        if self.n == 0 or self.mean is None:
+            added = ColumnHistogram.from_values(values)
+            if self.n == 0:
+                self.__dict__.update(added.__dict__)
+                return self
+            # Histogramme construit sans moyenne : centre des classes fines à la place
+            step = (self.high - self.low) / BASE_BINS
+            self.mean = float(np.average(self.low + (np.arange(BASE_BINS) + 0.5) * step, weights=self.counts))
+
+        occupied = np.flatnonzero(self.counts)
+        if len(occupied) == 1 and self.high - self.low == 1.0:
+            # Valeur unique, étendue élargie de ±0,5 par from_values
+            low = high = self.low + 0.5
+        else:
+            low, high = self.low, self.high
+        low, high = min(low, float(values.min())), max(high, float(values.max()))
+        if high <= low:
+            low, high = low - 0.5, high + 0.5
+        if (low, high) != (self.low, self.high):
+            step = (self.high - self.low) / BASE_BINS
+            centers = self.low + (occupied + 0.5) * step
+            positions = ((centers - low) / (high - low) * BASE_BINS).astype(np.int64)
+            self.counts = np.bincount(
+                np.clip(positions, 0, BASE_BINS - 1), weights=self.counts[occupied], minlength=BASE_BINS
+            ).astype(np.int64)
+            self.low, self.high = low, high
+        positions = ((values - low) / (high - low) * BASE_BINS).astype(np.int64)
+        self.counts += np.bincount(np.clip(positions, 0, BASE_BINS - 1), minlength=BASE_BINS)
+
+        # Fusion des moyennes et des sommes des carrés des écarts (Chan et al.)
+        n_added = len(values)
+        mean_added = float(values.mean())
+        m2 = self.std ** 2 * (self.n - 1) + float(((values - mean_added) ** 2).sum())
+        delta = mean_added - self.mean
+        n = self.n + n_added
+        m2 += delta ** 2 * self.n * n_added / n
+        self.mean += delta * n_added / n
+        self.n = n
+        self.std = float(np.sqrt(m2 / (n - 1))) if n > 1 else 0.0
+        return self
+
+    def coarse(self, bins):
+        """Effectifs et bornes d'un histogramme de ``bins`` classes."""
+        edges = np.linspace(self.low, self.high, bins + 1)
+        if BASE_BINS % bins == 0:
+            return self.counts.reshape(bins, -1).sum(axis=1), edges
+        cumulative = np.r_[0, np.cumsum(self.counts)]
+        positions = np.linspace(0, BASE_BINS, bins + 1)
+        cdf = np.round(np.interp(positions, np.arange(BASE_BINS + 1), cumulative))
+        return np.diff(cdf).astype(np.int64), edges
+
+    def kde(self, points=KDE_POINTS):
+        """Courbe KDE (abscisses, densité × effectif), ou ``None`` si elle n'est pas définie."""
+        if self.n < 2 or self.std <= 0:
+            return None
+        grid = _linear_binning(self.counts, KDE_GRID)
+        step = (self.high - self.low) / KDE_GRID
+        # Règle de Scott, comme scipy.stats.gaussian_kde
+        bandwidth = self.std * self.n ** (-1 / 5)
+        half_width = min(int(np.ceil(5 * bandwidth / step)) + 1, KDE_GRID)
+        # Noyau moyenné sur chaque case : reste juste quand la bande est plus étroite qu'une case
+        bounds = (np.arange(-half_width, half_width + 2) - 0.5) * step / (bandwidth * math.sqrt(2))
+        kernel = np.diff(_erf(bounds)) / (2 * step)
+        size = 1 << int(np.ceil(np.log2(KDE_GRID + 2 * half_width + 1)))
+        smoothed = np.fft.irfft(np.fft.rfft(grid, size) * np.fft.rfft(kernel, size), size)
+        density = np.maximum(smoothed[half_width:half_width + KDE_GRID], 0)
+        centers = self.low + (np.arange(KDE_GRID) + 0.5) * step
+        x = np.linspace(self.low, self.high, points)
+        return x, np.interp(x, centers, density)
+
+
+def _erf(values):
+    return np.array([math.erf(value) for value in values])
+
+
+def _linear_binning(counts, size):
+    """Répartit les classes fines sur ``size`` points de grille, au prorata de la distance."""
+    factor = len(counts) // size
+    # Position du centre de chaque classe fine, en unités de la grille
+    positions = (np.arange(len(counts)) + 0.5) / factor - 0.5
+    lower = np.floor(positions).astype(np.int64)
+    weight = positions - lower
+    grid = np.bincount(np.clip(lower, 0, size - 1), weights=counts * (1 - weight), minlength=size)
+    grid += np.bincount(np.clip(lower + 1, 0, size - 1), weights=counts * weight, minlength=size)
+    return grid
+
+
+histogram_cache = LRUCache(max_bytes=DEFAULT_MAX_BYTES)
+
+
+def column_histogram(dataset_key, data, column, cache=None):
+    """Histogramme de base de ``data[column]``, calculé une fois par jeu de données."""
+    cache = histogram_cache if cache is None else cache
+    key = (dataset_key, column)
+    histogram = cache.get(key)
+    if histogram is None:
+        values = data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        histogram = ColumnHistogram.from_values(values)
+        cache.put(key, histogram, nbytes=histogram.nbytes)
+    return histogram
+
+
+def draw_distribution(ax, histogram, bins, label=None, kde=True):
+    """Dessine l'histogramme à ``bins`` classes et sa KDE sur ``ax``."""
+    counts, edges = histogram.coarse(bins)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge",
+           facecolor=mcolors.to_rgba("C0", 0.5), edgecolor="white", linewidth=0.5)
+    if kde:
+        curve = histogram.kde()
+        if curve is not None:
+            # Densité × effectif × largeur de classe : à l'échelle des barres, comme seaborn
+            x, density = curve
+            ax.plot(x, density * (edges[1] - edges[0]), color="C0")
+    ax.set_xlabel(label or "")
+    ax.set_ylabel("Count")
+    return ax
\ No newline at end of file
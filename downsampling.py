@@ -0,0 +1,173 @@
+"""Réduction du nombre de points des nuages de points et graphiques en ligne.
+
+Au-delà de quelques centaines de milliers de points, matplotlib met plusieurs
+minutes à dessiner et les figures Plotly deviennent trop lourdes pour le
+navigateur. Ces fonctions choisissent un sous-ensemble de lignes qui respecte
+un budget de points tout en conservant l'allure du graphique :
+
+- graphiques en ligne : LTTB (Largest-Triangle-Three-Buckets) ou min/max par
+  tranche, qui conservent les pics ;
+- nuages de points : échantillonnage stratifié sur une grille, qui conserve
+  les zones peu denses et les valeurs extrêmes.
+"""
+import numpy as np
+import pandas as pd
+
+# Nombre de points affichés par défaut sur un graphique décimé
+DEFAULT_POINT_BUDGET = 10_000
+
+# Résolution de la grille d'échantillonnage des nuages de points
+DEFAULT_GRID_SIZE = 64
+
+# Méthodes de décimation des graphiques en ligne, et leur libellé
+LINE_METHODS = {"lttb": "LTTB (allure de la courbe)", "minmax": "Min/max par tranche (pics)"}
+
+
+def lttb_indices(x, y, n_out):
+    """Positions des points retenus par l'algorithme LTTB.
+
+    ``x`` doit être croissant. Le premier et le dernier point sont toujours
+    conservés ; chaque tranche intermédiaire garde le point formant le plus
+    grand triangle avec le point retenu précédemment et la moyenne de la
+    tranche suivante.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        area = np.abs((x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """Positions du minimum et du maximum de ``y`` dans chaque tranche."""
+    n = len(y)
+    if n_buckets < 1 or 2 * n_buckets >= n:
+        return np.arange(n)
+    # Tranches de tailles quasi égales, toutes non vides (comme np.array_split)
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    sizes = np.diff(np.r_[starts, n])
+    buckets = np.repeat(np.arange(n_buckets), sizes)
+    selected = [[0, n - 1]]
+    # fmin/fmax ignorent les NaN ; une tranche entièrement vide de valeurs ne retient aucun point
+    for extreme in (np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts)):
+        matches = np.flatnonzero(y == np.repeat(extreme, sizes))
+        # Première position atteignant l'extrême dans chaque tranche
+        _, first = np.unique(buckets[matches], return_index=True)
+        selected.append(matches[first])
+    return np.unique(np.concatenate(selected))
+
+
+def _grid_cells(values, grid_size):
+    low, high = values.min(), values.max()
+    if high <= low:
+        return np.zeros(len(values), dtype=np.int64)
+    cells = ((values - low) / (high - low) * grid_size).astype(np.int64)
+    return np.minimum(cells, grid_size - 1)
+
+
+def _per_cell_cap(counts, n_out):
+    """Plus grand quota par cellule dont le total ne dépasse pas ``n_out``."""
+    low, high = 0, int(counts.max())
+    while low < high:
+        middle = (low + high + 1) // 2
+        if np.minimum(counts, middle).sum() <= n_out:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def stratified_indices(x, y, n_out, grid_size=DEFAULT_GRID_SIZE, seed=0):
+    """Positions d'un échantillon stratifié sur une grille ``grid_size`` × ``grid_size``.
+
+    Chaque cellule reçoit le même quota de points : les cellules peu peuplées
+    sont conservées entièrement, les plus denses sont sous-échantillonnées.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    cells = _grid_cells(x, grid_size) * grid_size + _grid_cells(y, grid_size)
+    # Ordre aléatoire à l'intérieur de chaque cellule
+    order = rng.permutation(n)
+    order = order[np.argsort(cells[order], kind="stable")]
+    sorted_cells = cells[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_cells)) + 1]
+    counts = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, counts)
+    cap = _per_cell_cap(counts, n_out)
+    if cap < 1:
+        # Plus de cellules que de points autorisés : un point tiré par cellule
+        keep = rng.choice(order[rank == 0], n_out, replace=False)
+    else:
+        keep = order[rank < cap]
+    return np.sort(keep)
+
+
+def numeric_values(column):
+    """Valeurs d'une colonne en flottants ; les catégories sont remplacées par leur code."""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=np.float64, na_value=np.nan)
+    codes, _ = pd.factorize(column)
+    values = codes.astype(np.float64)
+    values[codes < 0] = np.nan
+    return values
+
+
+def downsample_line(data, x_column, y_column, budget=DEFAULT_POINT_BUDGET, method="lttb"):
+    """Lignes de ``data`` à tracer pour un graphique en ligne d'au plus ``budget`` points.
+
+    Si ``x_column`` vaut ``None`` ou n'est pas croissante, la position des
+    lignes sert d'abscisse, comme dans le tracé d'origine qui suit l'ordre des
+    lignes.
+    """
+    if len(data) <= budget:
+        return data
+    y = numeric_values(data[y_column])
+    positions = np.arange(len(data), dtype=np.float64)
+    x = positions if x_column is None else numeric_values(data[x_column])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    rows = np.flatnonzero(valid)
+    x, y = x[valid], y[valid]
+    if len(x) > 1 and not (np.diff(x) >= 0).all():
+        x = positions[valid]
+    if method == "minmax":
+        selected = minmax_indices(y, (budget - 2) // 2)
+    else:
+        selected = lttb_indices(x, y, budget)
+    return data.iloc[rows[selected]]
+
+
+def downsample_scatter(data, x_column, y_column, budget=DEFAULT_POINT_BUDGET, grid_size=DEFAULT_GRID_SIZE):
+    """Lignes de ``data`` à tracer pour un nuage de points d'au plus ``budget`` points."""
+    if len(data) <= budget:
+        return data
+    x = numeric_values(data[x_column])
+    y = numeric_values(data[y_column])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    rows = np.flatnonzero(valid)
+    selected = stratified_indices(x[valid], y[valid], budget, grid_size=grid_size)
+    return data.iloc[rows[selected]]
+
+
+def decimation_caption(shown, total):
+    """Message indiquant qu'un graphique a été décimé."""
+    shown, total = f"{shown:,}".replace(",", " "), f"{total:,}".replace(",", " ")
+    return (
+        f"⚠️ Graphique décimé : {shown} points affichés sur {total}. "
+        "Cochez « Pleine résolution » dans la barre latérale pour tout afficher."
+    )
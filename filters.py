@@ -0,0 +1,235 @@
+"""Filtres de lignes indexés pour la barre latérale.
+
+Les index d'une colonne sont construits une seule fois par jeu de données, à
+la première utilisation de la colonne dans un filtre, et conservés en cache :
+
+- colonne numérique : positions des lignes triées par valeur. Un intervalle
+  se résout par deux recherches dichotomiques (``searchsorted``) et donne
+  directement les lignes retenues ;
+- colonne catégorielle : positions des lignes regroupées par code, chaque
+  groupe jouant le rôle de la liste des lignes d'une catégorie (bitmap
+  compressé). Une sélection de catégories réunit ces groupes.
+
+Chaque changement de filtre coûte donc une recherche dans les index et
+l'intersection des lignes retenues, proportionnelles au nombre de lignes
+sélectionnées, au lieu d'une comparaison de toutes les lignes. Sans filtre
+actif, le jeu de données d'origine est utilisé tel quel, sans copie.
+"""
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_cache import LRUCache, frame_nbytes
+
+# Nombre maximal de catégories d'une colonne texte filtrable
+MAX_FILTER_CATEGORIES = 200
+
+# Budget mémoire du cache des index (256 Mo)
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+# Budget mémoire du cache des vues filtrées (1 Go)
+VIEW_MAX_BYTES = 1024 ** 3
+
+
+class NumericIndex:
+    """Lignes d'une colonne numérique triées par valeur (``NaN`` exclus)."""
+
+    def __init__(self, column):
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        order = np.argsort(values, kind="stable")
+        valid = int((~np.isnan(values)).sum())
+        # argsort place les NaN à la fin
+        self.order = order[:valid]
+        self.sorted_values = values[self.order]
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.sorted_values.nbytes
+
+    @property
+    def bounds(self):
+        """Plus petite et plus grande valeur, ou ``None`` si la colonne est vide."""
+        if not len(self.sorted_values):
+            return None
+        return self.sorted_values[0], self.sorted_values[-1]
+
+    def rows(self, low, high):
+        """Positions (triées) des lignes dont la valeur est comprise entre ``low`` et ``high`` inclus."""
+        start = np.searchsorted(self.sorted_values, low, side="left")
+        end = np.searchsorted(self.sorted_values, high, side="right")
+        return np.sort(self.order[start:end])
+
+
+class CategoryIndex:
+    """Lignes d'une colonne catégorielle regroupées par code."""
+
+    def __init__(self, column):
+        codes, categories = pd.factorize(column, sort=True)
+        self.categories = list(categories)
+        # Tri stable : les lignes de chaque catégorie restent dans l'ordre du fichier
+        self.order = np.argsort(codes, kind="stable")
+        self.starts = np.searchsorted(codes[self.order], np.arange(len(self.categories) + 1))
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.starts.nbytes
+
+    def rows(self, values):
+        """Positions (triées) des lignes dont la valeur fait partie de ``values``."""
+        wanted = [self.categories.index(value) for value in values if value in self.categories]
+        if not wanted:
+            return np.empty(0, dtype=np.int64)
+        groups = [self.order[self.starts[code]:self.starts[code + 1]] for code in sorted(wanted)]
+        return np.sort(np.concatenate(groups)) if len(groups) > 1 else groups[0]
+
+
+def is_category_column(column, max_categories=MAX_FILTER_CATEGORIES):
+    """Vrai si ``column`` peut être filtrée par une liste de catégories."""
+    if isinstance(column.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(column):
+        return True
+    if pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+        return column.nunique(dropna=True) <= max_categories
+    return False
+
+
+class DatasetIndex:
+    """Index des colonnes d'un jeu de données, construits à la première utilisation.
+
+    Seuls les index sont conservés, pas le jeu de données : il reste libre
+    d'être évincé du cache des jeux de données.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._filterable = None
+        self._lock = threading.Lock()
+
+    def filterable_columns(self, data, max_categories=MAX_FILTER_CATEGORIES):
+        """Colonnes proposées dans le panneau de filtres (calculées une fois)."""
+        with self._lock:
+            if self._filterable is None:
+                self._filterable = [
+                    name for name in data.columns
+                    if pd.api.types.is_numeric_dtype(data[name]) or is_category_column(data[name], max_categories)
+                ]
+            return self._filterable
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(index.nbytes for index in self._indexes.values())
+
+    def column(self, data, name):
+        """Index de la colonne ``name`` (:class:`NumericIndex` ou :class:`CategoryIndex`)."""
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                column = data[name]
+                if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+                    index = NumericIndex(column)
+                else:
+                    index = CategoryIndex(column)
+                self._indexes[name] = index
+            return index
+
+    def select(self, data, filters):
+        """Positions des lignes qui vérifient tous les filtres, ou ``None`` sans filtre.
+
+        ``filters`` associe à chaque colonne un couple ``(min, max)`` (numérique)
+        ou une liste de valeurs (catégorielle).
+        """
+        selections = []
+        for name, condition in filters.items():
+            index = self.column(data, name)
+            if isinstance(index, NumericIndex):
+                low, high = condition
+                selections.append(index.rows(low, high))
+            else:
+                selections.append(index.rows(condition))
+        if not selections:
+            return None
+        # Intersection en partant de la sélection la plus petite
+        selections.sort(key=len)
+        rows = selections[0]
+        for other in selections[1:]:
+            rows = rows[np.isin(rows, other, assume_unique=True)]
+        return rows
+
+
+index_cache = LRUCache(max_bytes=DEFAULT_MAX_BYTES)
+view_cache = LRUCache(max_bytes=VIEW_MAX_BYTES)
+
+
+def dataset_index(dataset_key, cache=None):
+    """Index du jeu de données ``dataset_key``, partagé par toutes les sessions."""
+    cache = index_cache if cache is None else cache
+    index = cache.get(dataset_key)
+    if index is None:
+        index = DatasetIndex()
+        cache.put(dataset_key, index, nbytes=0)
+    return index
+
+
+def filter_signature(filters):
+    """Empreinte courte des filtres, pour les clés de cache des graphiques."""
+    text = repr(sorted((name, repr(condition)) for name, condition in filters.items()))
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def filtered_view(data, dataset_key, filters, indexes=None, cache=None):
+    """Lignes de ``data`` qui vérifient ``filters``, et la clé de cette vue.
+
+    Sans filtre restrictif, renvoie ``data`` et ``dataset_key`` inchangés.
+    """
+    if not filters:
+        return data, dataset_key
+    indexes = index_cache if indexes is None else indexes
+    cache = view_cache if cache is None else cache
+    key = (dataset_key, "filtre", filter_signature(filters))
+    view = cache.get(key)
+    if view is not None:
+        return view, key
+    index = dataset_index(dataset_key, indexes)
+    rows = index.select(data, filters)
+    # Compte la mémoire des index construits pour ces filtres
+    indexes.put(dataset_key, index, nbytes=index.nbytes)
+    if len(rows) == len(data):
+        return data, dataset_key
+    view = data.take(rows)
+    cache.put(key, view, nbytes=frame_nbytes(view))
+    return view, key
+
+
+def filter_panel(data, dataset_key, max_categories=MAX_FILTER_CATEGORIES):
+    """Filtres de la barre latérale ; renvoie la vue filtrée de ``data`` et sa clé."""
+    index = dataset_index(dataset_key)
+    filters = {}
+    with st.sidebar.expander("🔎 Filtrer les lignes"):
+        for name in st.multiselect("Colonnes à filtrer :", index.filterable_columns(data, max_categories)):
+            column_index = index.column(data, name)
+            if isinstance(column_index, NumericIndex):
+                bounds = column_index.bounds
+                if bounds is None or bounds[0] == bounds[1]:
+                    continue
+                low, high = bounds
+                if pd.api.types.is_integer_dtype(data[name]):
+                    low, high = int(low), int(high)
+                else:
+                    low, high = float(low), float(high)
+                selected = st.slider(name, min_value=low, max_value=high, value=(low, high), key=f"filtre-{name}")
+                if selected != (low, high):
+                    filters[name] = selected
+            else:
+                selected = st.multiselect(
+                    name, column_index.categories, default=column_index.categories, key=f"filtre-{name}"
+                )
+                if len(selected) < len(column_index.categories):
+                    filters[name] = selected
+        view, key = filtered_view(data, dataset_key, filters)
+        if view is not data:
+            shown, total = f"{len(view):,}".replace(",", " "), f"{len(data):,}".replace(",", " ")
+            st.caption(f"{shown} lignes retenues sur {total}")
+    return view, key
@@ -0,0 +1,441 @@
+"""Lecture des fichiers téléversés : lecture en flux par blocs pour les gros CSV.
+
+La lecture par blocs tourne dans un fil d'exécution en arrière-plan. Le premier
+bloc est exposé dès qu'il est lu, ce qui permet d'afficher l'aperçu et la liste
+des colonnes sans attendre la fin de l'analyse du fichier complet.
+
+Le mode compact réduit les types à la lecture (entiers et flottants les plus
+étroits possibles, texte peu varié en catégories).
+
+Les fichiers Parquet et Feather (Arrow IPC) sont copiés une fois sur disque,
+puis lus en projection de colonnes et par projection mémoire (memory map).
+La copie est supprimée quand le jeu de données est retiré pour inactivité.
+
+Chaque chargement vérifie les limites de taille et de nombre de lignes du
+serveur, et note l'utilisation du jeu de données par la session (voir
+:mod:`store`).
+"""
+import os
+import tempfile
+import threading
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from data_cache import dataset_cache, format_bytes, frame_nbytes, read_csv_cached, uploaded_file_key
+from profiling import profiled
+from store import check_row_count, check_upload_size, dataset_store
+from summary import SummaryAccumulator, summary_cache
+
+# Taille à partir de laquelle un CSV est lu en flux plutôt que d'un seul bloc (50 Mo)
+STREAMING_THRESHOLD_BYTES = 50 * 1024 ** 2
+
+# Nombre de lignes par bloc
+DEFAULT_CHUNKSIZE = 200_000
+
+# Extensions acceptées par le téléverseur, et format de lecture associé
+FILE_FORMATS = {
+    "csv": "csv",
+    "parquet": "parquet",
+    "pq": "parquet",
+    "feather": "feather",
+    "arrow": "feather",
+    "ipc": "feather",
+}
+UPLOAD_TYPES = list(FILE_FORMATS)
+
+# Répertoire des copies sur disque des fichiers téléversés
+SPILL_DIR = os.path.join(tempfile.gettempdir(), "easyviz")
+
+# Une colonne texte devient catégorielle si son nombre de valeurs distinctes
+# ne dépasse pas cette part du nombre de lignes
+CATEGORY_MAX_RATIO = 0.5
+
+
+def concat_chunks(chunks):
+    """Assemble des blocs colonne par colonne.
+
+    Chaque colonne est retirée des blocs dès qu'elle est assemblée : le
+    surcoût mémoire reste borné par la taille d'une colonne, au lieu de doubler
+    la taille du jeu de données comme le ferait ``pd.concat(chunks)``.
+    """
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    columns = {}
+    for column in list(chunks[0].columns):
+        pieces = [chunk.pop(column) for chunk in chunks]
+        columns[column] = pd.concat(pieces, ignore_index=True)
+        del pieces
+    return pd.DataFrame(columns, copy=False)
+
+
+def _compact_column(column, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Type le plus étroit possible pour une colonne, sans perte d'information."""
+    if pd.api.types.is_bool_dtype(column):
+        return column
+    if pd.api.types.is_integer_dtype(column):
+        downcast = "unsigned" if len(column) and column.min() >= 0 else "integer"
+        return pd.to_numeric(column, downcast=downcast)
+    if pd.api.types.is_float_dtype(column):
+        narrowed = column.astype(np.float32)
+        # float32 uniquement si toutes les valeurs sont représentées exactement
+        restored = narrowed.astype(column.dtype)
+        if ((restored == column) | column.isna()).all():
+            return narrowed
+        return column
+    if pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+        n_unique = column.nunique(dropna=True)
+        if len(column) and n_unique <= category_max_ratio * len(column):
+            return column.astype("category")
+    return column
+
+
+def compact_dtypes(data, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Réduit les types d'un DataFrame et renvoie le rapport mémoire par colonne.
+
+    Les entiers et flottants prennent le type le plus étroit qui conserve
+    toutes les valeurs ; les colonnes texte peu variées deviennent catégorielles.
+    """
+    columns = {}
+    rows = []
+    for name in data.columns:
+        column = data[name]
+        compacted = _compact_column(column, category_max_ratio)
+        columns[name] = compacted
+        before = int(column.memory_usage(index=False, deep=True))
+        after = int(compacted.memory_usage(index=False, deep=True))
+        rows.append((name, str(column.dtype), str(compacted.dtype), before, after))
+    compact = pd.DataFrame(columns, index=data.index, copy=False)
+
+    report = pd.DataFrame(rows, columns=["Colonne", "Type initial", "Type compact", "avant", "après"])
+    total = ("Total", "", "", report["avant"].sum(), report["après"].sum())
+    report.loc[len(report)] = total
+    report["Gain"] = (1 - report["après"] / report["avant"].where(report["avant"] > 0)).fillna(0).map("{:.0%}".format)
+    report["Mémoire initiale"] = report.pop("avant").map(format_bytes)
+    report["Mémoire compacte"] = report.pop("après").map(format_bytes)
+    report = report[["Colonne", "Type initial", "Type compact", "Mémoire initiale", "Mémoire compacte", "Gain"]]
+    return compact, report.set_index("Colonne")
+
+
+
+class CompactDataset:
+    """Jeu de données compacté et son rapport mémoire, mis en cache ensemble.
+
+    Le rapport est ainsi évincé du cache en même temps que le jeu de données.
+    """
+
+    def __init__(self, data, report):
+        self.data = data
+        self.report = report
+
+    @property
+    def nbytes(self):
+        return frame_nbytes(self.data) + frame_nbytes(self.report)
+
+
+def _finish(data, compact):
+    """Compacte le jeu de données si demandé ; renvoie le jeu de données et son rapport mémoire."""
+    if compact:
+        return compact_dtypes(data)
+    return data, None
+
+
+def _cache_put(cache, key, data, report):
+    if report is None:
+        cache.put(key, data)
+    else:
+        compacted = CompactDataset(data, report)
+        cache.put(key, compacted, nbytes=compacted.nbytes)
+
+
+def _cache_get(cache, key):
+    """Jeu de données en cache et son rapport mémoire (``None`` s'ils sont absents)."""
+    value = cache.get(key) if key in cache else None
+    if isinstance(value, CompactDataset):
+        return value.data, value.report
+    return value, None
+
+
+def memory_report(key, cache=None):
+    """Rapport mémoire par colonne d'un jeu de données chargé en mode compact."""
+    return _cache_get(dataset_cache if cache is None else cache, key)[1]
+
+
+class StreamingLoad:
+    """Lecture d'un CSV par blocs dans un fil d'exécution en arrière-plan."""
+
+    def __init__(self, key, raw_bytes, chunksize=DEFAULT_CHUNKSIZE, compact=False, cache=None, read_kwargs=None,
+                 max_rows=None):
+        self.key = key
+        self.chunksize = chunksize
+        self.compact = compact
+        self.max_rows = max_rows
+        self.total_bytes = len(raw_bytes)
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.preview = None
+        self.error = None
+        # Statistiques descriptives mises à jour à chaque bloc lu
+        self.summary = SummaryAccumulator()
+        self._raw_bytes = raw_bytes
+        self._cache = dataset_cache if cache is None else cache
+        self._read_kwargs = read_kwargs or {}
+        self._data = None
+        self._report = None
+        self._first_chunk = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"easyviz-load-{key[:8]}", daemon=True)
+
+    @classmethod
+    def completed(cls, key, data, report=None):
+        """Lecture déjà terminée (jeu de données servi par le cache)."""
+        load = cls(key, b"")
+        load._data = data
+        load._report = report
+        load.preview = data.head()
+        load.rows_read = len(data)
+        load._first_chunk.set()
+        load._done.set()
+        return load
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            buffer = BytesIO(self._raw_bytes)
+            chunks = []
+            with pd.read_csv(buffer, chunksize=self.chunksize, **self._read_kwargs) as reader:
+                for chunk in reader:
+                    self.rows_read += len(chunk)
+                    # Arrêt dès que la limite est franchie, sans lire le reste du fichier
+                    check_row_count(self.rows_read, self.max_rows)
+                    chunks.append(chunk)
+                    self.summary.update(chunk)
+                    self.bytes_read = buffer.tell()
+                    if self.preview is None:
+                        self.preview = chunk.head()
+                        self._first_chunk.set()
+            if not chunks:
+                # Fichier sans ligne de données : on laisse pandas produire le DataFrame vide
+                chunks.append(pd.read_csv(BytesIO(self._raw_bytes), **self._read_kwargs))
+                self.preview = chunks[0]
+            summary_cache.put(self.key, self.summary.result())
+            self._data, self._report = _finish(concat_chunks(chunks), self.compact)
+            self.bytes_read = self.total_bytes
+            _cache_put(self._cache, self.key, self._data, self._report)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._raw_bytes = None
+            self._first_chunk.set()
+            self._done.set()
+            _active_loads.pop(self.key, None)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def columns(self):
+        return [] if self.preview is None else self.preview.columns.tolist()
+
+    @property
+    def memory_report(self):
+        return self._report
+
+    @property
+    def progress(self):
+        """Avancement de la lecture, entre 0 et 1."""
+        if self.done or not self.total_bytes:
+            return 1.0
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+    def wait_for_preview(self, timeout=None):
+        """Attend le premier bloc ; lève l'erreur de lecture s'il y en a une."""
+        self._first_chunk.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.preview
+
+    def result(self, timeout=None):
+        """Jeu de données complet ; attend la fin de la lecture."""
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self._data
+
+
+# Lectures en cours, par clé de contenu : une relance du script retrouve la
+# lecture lancée par la relance précédente au lieu d'en démarrer une nouvelle.
+_active_loads = {}
+_active_loads_lock = threading.Lock()
+
+
+def stream_csv(uploaded_file, chunksize=DEFAULT_CHUNKSIZE, threshold=STREAMING_THRESHOLD_BYTES,
+               compact=False, cache=None, max_rows=None):
+    """Lit un CSV téléversé, en flux s'il dépasse ``threshold`` octets.
+
+    Avec ``compact=True``, la version aux types réduits est mise en cache avec
+    son rapport mémoire ; une version pleine largeur déjà en cache y reste.
+    Renvoie toujours un :class:`StreamingLoad` ; pour les petits fichiers ou
+    les fichiers déjà en cache, la lecture est déjà terminée.
+    """
+    cache = dataset_cache if cache is None else cache
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        size = len(uploaded_file.getvalue())
+    content_key = uploaded_file_key(uploaded_file)
+    key = f"{content_key}:compact" if compact else content_key
+    data, report = _cache_get(cache, key)
+    if data is None and compact and content_key in cache:
+        # Version pleine largeur déjà en mémoire (peut-être utilisée par une autre
+        # session) : on la compacte sans relire le fichier, sans la retirer du cache
+        data, report = _finish(cache.get(content_key), compact)
+        _cache_put(cache, key, data, report)
+    elif data is None and size < threshold:
+        if compact:
+            uploaded_file.seek(0)
+            data, report = _finish(pd.read_csv(uploaded_file), compact)
+            _cache_put(cache, key, data, report)
+        else:
+            data = read_csv_cached(uploaded_file, cache=cache)
+    if data is not None:
+        try:
+            check_row_count(len(data), max_rows)
+        except ValueError:
+            cache.pop(key)
+            raise
+        return StreamingLoad.completed(key, data, report)
+    with _active_loads_lock:
+        load = _active_loads.get(key)
+        if load is None:
+            load = StreamingLoad(
+                key, uploaded_file.getvalue(), chunksize=chunksize, compact=compact, cache=cache, max_rows=max_rows
+            )
+            _active_loads[key] = load
+            load.start()
+    return load
+
+
+
+def file_format(uploaded_file):
+    """Format de lecture d'un fichier téléversé (``csv``, ``parquet`` ou ``feather``)."""
+    extension = os.path.splitext(getattr(uploaded_file, "name", ""))[1].lstrip(".").lower()
+    return FILE_FORMATS.get(extension, "csv")
+
+
+def is_columnar(uploaded_file):
+    return file_format(uploaded_file) != "csv"
+
+
+def spill_to_disk(uploaded_file):
+    """Copie (une seule fois) un fichier téléversé sur disque et renvoie son chemin."""
+    extension = os.path.splitext(getattr(uploaded_file, "name", ""))[1].lower()
+    path = os.path.join(SPILL_DIR, uploaded_file_key(uploaded_file) + extension)
+    if not os.path.exists(path):
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        partial = f"{path}.{threading.get_ident()}.part"
+        with open(partial, "wb") as f:
+            f.write(uploaded_file.getvalue())
+        os.replace(partial, path)
+    return path
+
+
+@dataset_store.on_evict
+def remove_spilled_files(dataset_key):
+    """Supprime les copies sur disque d'un fichier dont plus aucun jeu de données n'est utilisé.
+
+    Plusieurs jeux de données (projections de colonnes, mode compact) partagent
+    la copie d'un même fichier : elle n'est supprimée qu'au retrait du dernier.
+    """
+    content_key = dataset_key.split(":")[0]
+    if any(key.split(":")[0] == content_key for key in dataset_store.active_keys()):
+        return
+    try:
+        names = os.listdir(SPILL_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.startswith(content_key):
+            try:
+                os.remove(os.path.join(SPILL_DIR, name))
+            except OSError:
+                # Fichier encore ouvert (Windows) ou déjà supprimé par un autre fil
+                pass
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow.dataset as ds
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("La lecture des fichiers Parquet et Feather nécessite le paquet pyarrow.") from e
+    return ds, feather, pq
+
+
+def columnar_columns(uploaded_file):
+    """Colonnes d'un fichier Parquet ou Feather, lues dans ses seules métadonnées."""
+    ds, _, _ = _import_pyarrow()
+    path = spill_to_disk(uploaded_file)
+    schema = ds.dataset(path, format=file_format(uploaded_file)).schema
+    return [name for name in schema.names if not name.startswith("__index_level_")]
+
+
+def columnar_row_count(uploaded_file):
+    """Nombre de lignes d'un fichier Parquet ou Feather, lu dans ses métadonnées."""
+    ds, _, _ = _import_pyarrow()
+    path = spill_to_disk(uploaded_file)
+    return ds.dataset(path, format=file_format(uploaded_file)).count_rows()
+
+
+def read_columnar(uploaded_file, columns=None):
+    """Lit un fichier Parquet ou Feather, limité aux colonnes ``columns``."""
+    _, feather, pq = _import_pyarrow()
+    path = spill_to_disk(uploaded_file)
+    columns = list(columns) if columns else None
+    if file_format(uploaded_file) == "parquet":
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    # split_blocks évite la consolidation (et donc la copie) des colonnes par type
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+@profiled("chargement")
+def load_uploaded_file(uploaded_file, columns=None, compact=False, cache=None):
+    """Charge un fichier téléversé, quel que soit son format.
+
+    Les CSV passent par :func:`stream_csv` ; pour les formats en colonnes, seules
+    les colonnes ``columns`` sont lues (toutes si ``None``). Lève ``ValueError``
+    si le fichier dépasse les limites du serveur.
+    """
+    cache = dataset_cache if cache is None else cache
+    check_upload_size(uploaded_file)
+    if not is_columnar(uploaded_file):
+        load = stream_csv(uploaded_file, compact=compact, cache=cache)
+    else:
+        key = uploaded_file_key(uploaded_file)
+        if columns:
+            key = f"{key}:columns={tuple(columns)!r}"
+        if compact:
+            key = f"{key}:compact"
+        data, report = _cache_get(cache, key)
+        if data is None:
+            check_row_count(columnar_row_count(uploaded_file))
+            data, report = _finish(read_columnar(uploaded_file, columns), compact)
+            _cache_put(cache, key, data, report)
+        load = StreamingLoad.completed(key, data, report)
+    if cache is dataset_cache:
+        dataset_store.touch(load.key)
+    return load
+
+
+def to_parquet_bytes(data):
+    """Contenu d'un fichier Parquet équivalent au jeu de données."""
+    buf = BytesIO()
+    data.to_parquet(buf, index=False)
+    return buf.getvalue()
\ No newline at end of file
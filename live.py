@@ -0,0 +1,231 @@
+"""Suivi en direct d'un fichier CSV local qui grossit (journaux, exports continus).
+
+À chaque rafraîchissement, seuls les octets ajoutés depuis la dernière
+lecture sont lus et analysés, jusqu'à la dernière ligne complète : une ligne
+en cours d'écriture est reprise au rafraîchissement suivant. Les nouvelles
+lignes sont ajoutées au jeu de données en mémoire, et les graphiques du suivi
+sont mis à jour à partir de ces seules lignes :
+
+- histogrammes : les classes fines de chaque colonne numérique sont
+  complétées (:meth:`distribution.ColumnHistogram.extend`) ;
+- corrélations : les sommes cumulées de
+  :class:`correlation.CorrelationAccumulator` reçoivent le nouveau bloc ;
+- graphique en ligne : les points déjà décimés sont complétés par les
+  nouvelles lignes, puis décimés de nouveau au-delà du double du budget.
+
+Un fichier tronqué ou remplacé (rotation des journaux) est relu depuis le
+début. Le suivi n'est proposé que pour les fichiers du répertoire
+``EASYVIZ_LIVE_DIR`` : sans cette variable, il est désactivé.
+"""
+import os
+import threading
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from correlation import CorrelationAccumulator
+from distribution import ColumnHistogram
+from downsampling import DEFAULT_POINT_BUDGET, downsample_line
+from store import check_row_count
+
+# Répertoire des fichiers qui peuvent être suivis (EASYVIZ_LIVE_DIR ; désactivé par défaut)
+LIVE_DIR = os.environ.get("EASYVIZ_LIVE_DIR") or None
+
+# Intervalle de rafraîchissement par défaut, en secondes
+DEFAULT_REFRESH_SECONDS = 2.0
+
+# Octets lus au plus par rafraîchissement (64 Mo) : un gros retard se rattrape en plusieurs fois
+MAX_READ_BYTES = 64 * 1024 ** 2
+
+# Nombre de dernières lignes conservées pour l'aperçu
+PREVIEW_ROWS = 10
+
+
+def resolve_live_path(path, live_dir=None):
+    """Chemin absolu de ``path``, qui doit se trouver dans le répertoire de suivi.
+
+    Lève ``ValueError`` si le suivi est désactivé ou si le fichier est hors du répertoire.
+    """
+    live_dir = LIVE_DIR if live_dir is None else live_dir
+    if not live_dir:
+        raise ValueError("Suivi en direct désactivé : définissez EASYVIZ_LIVE_DIR.")
+    root = os.path.realpath(live_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Le fichier doit se trouver dans {root}.")
+    return resolved
+
+
+def _line_columns(x_column, y_column):
+    return list(dict.fromkeys([x_column, y_column]))
+
+
+class LiveTail:
+    """Jeu de données d'un CSV suivi en direct, et ses agrégats incrémentaux."""
+
+    def __init__(self, path, point_budget=DEFAULT_POINT_BUDGET, max_read_bytes=MAX_READ_BYTES):
+        self.path = path
+        self.point_budget = point_budget
+        self.max_read_bytes = max_read_bytes
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Oublie tout ce qui a été lu : la prochaine lecture repart du début du fichier."""
+        with self._lock:
+            self.offset = 0
+            self.columns = None
+            self.numeric_columns = []
+            self.rows = 0
+            # Incrémenté à chaque ajout : les graphiques en cache sont indexés par version
+            self.version = 0
+            self._chunks = []
+            self._frame = None
+            self._histograms = {}
+            self._correlation = None
+            self._lines = {}
+            self._identity = None
+
+    @property
+    def key(self):
+        """Clé du jeu de données dans son état actuel (pour le cache des graphiques)."""
+        return ("live", self.path, self.version)
+
+    def _read_new_bytes(self):
+        """Octets ajoutés depuis la dernière lecture, jusqu'à la dernière ligne complète."""
+        stat = os.stat(self.path)
+        identity = (stat.st_dev, stat.st_ino)
+        if self._identity is not None and (identity != self._identity or stat.st_size < self.offset):
+            # Fichier tronqué ou remplacé : relecture complète
+            self.reset()
+        self._identity = identity
+        if stat.st_size == self.offset:
+            return b""
+        with open(self.path, "rb") as handle:
+            handle.seek(self.offset)
+            raw = handle.read(self.max_read_bytes)
+        end = raw.rfind(b"\n") + 1
+        if end == 0 and len(raw) == self.max_read_bytes:
+            raise ValueError(f"Ligne de plus de {self.max_read_bytes} octets dans {self.path}.")
+        self.offset += end
+        return raw[:end]
+
+    def poll(self):
+        """Lit les lignes ajoutées au fichier et met à jour les agrégats ; renvoie leur nombre."""
+        with self._lock:
+            raw = self._read_new_bytes()
+            if self.columns is None:
+                if not raw:
+                    return 0
+                # Première lecture : la première ligne donne les noms des colonnes
+                header_end = raw.find(b"\n") + 1
+                self.columns = pd.read_csv(BytesIO(raw[:header_end]), nrows=0).columns.tolist()
+                raw = raw[header_end:]
+            if not raw.strip():
+                return 0
+            delta = pd.read_csv(BytesIO(raw), header=None, names=self.columns)
+            check_row_count(self.rows + len(delta))
+            # Numéros de ligne dans le fichier complet
+            delta.index = pd.RangeIndex(self.rows, self.rows + len(delta))
+            if not self.rows:
+                self.numeric_columns = delta.select_dtypes(include="number").columns.tolist()
+                self._correlation = CorrelationAccumulator(self.numeric_columns)
+            else:
+                # Une valeur mal formée dans les nouvelles lignes devient NaN, sans changer le type de la colonne
+                for column in self.numeric_columns:
+                    if not pd.api.types.is_numeric_dtype(delta[column]):
+                        delta[column] = pd.to_numeric(delta[column], errors="coerce")
+            self._update(delta)
+            self._chunks.append(delta)
+            self.rows += len(delta)
+            self.version += 1
+            return len(delta)
+
+    def _update(self, delta):
+        for column in self.numeric_columns:
+            values = delta[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            previous = self._histograms.get(column)
+            if previous is None:
+                histogram = ColumnHistogram.from_values(values)
+            else:
+                # Copie : une autre session peut être en train de dessiner l'histogramme précédent
+                histogram = ColumnHistogram(
+                    previous.counts.copy(), previous.low, previous.high, previous.n, previous.std, mean=previous.mean
+                ).extend(values)
+            self._histograms[column] = histogram
+        if len(self.numeric_columns):
+            self._correlation.update(delta)
+        for (x_column, y_column), line in self._lines.items():
+            self._lines[(x_column, y_column)] = self._extend_line(line, delta, x_column, y_column)
+
+    def _extend_line(self, line, delta, x_column, y_column):
+        line = pd.concat([line, delta[_line_columns(x_column, y_column)]])
+        if len(line) > 2 * self.point_budget:
+            line = downsample_line(line, x_column, y_column, self.point_budget)
+        return line
+
+    def frame(self):
+        """Jeu de données complet (les blocs lus depuis le dernier appel y sont ajoutés)."""
+        with self._lock:
+            if self._chunks:
+                pieces = ([] if self._frame is None else [self._frame]) + self._chunks
+                self._frame = pd.concat(pieces, ignore_index=True)
+                self._chunks = []
+            return self._frame if self._frame is not None else pd.DataFrame(columns=self.columns or [])
+
+    def preview(self, rows=PREVIEW_ROWS):
+        """Dernières lignes lues, sans assembler le jeu de données complet."""
+        with self._lock:
+            pieces = []
+            needed = rows
+            for chunk in reversed(([] if self._frame is None else [self._frame]) + self._chunks):
+                pieces.insert(0, chunk.tail(needed))
+                needed -= len(pieces[0])
+                if needed <= 0:
+                    break
+            if not pieces:
+                return pd.DataFrame(columns=self.columns or [])
+            return pd.concat(pieces)
+
+    def histogram(self, column):
+        """Histogramme de base de ``column`` (voir :func:`distribution.draw_distribution`)."""
+        with self._lock:
+            return self._histograms[column]
+
+    def correlation(self):
+        """Matrice de corrélation de Pearson des colonnes numériques."""
+        with self._lock:
+            return self._correlation.matrix()
+
+    def line(self, x_column, y_column):
+        """Lignes à tracer pour le graphique en ligne (au plus deux fois le budget de points)."""
+        with self._lock:
+            key = (x_column, y_column)
+            if key not in self._lines:
+                # Premier affichage de ce couple de colonnes : décimation de tout ce qui a été lu
+                data = self.frame()[_line_columns(x_column, y_column)]
+                self._lines[key] = downsample_line(data, x_column, y_column, self.point_budget)
+            return self._lines[key]
+
+
+_tails = {}
+_tails_lock = threading.Lock()
+
+
+def get_live_tail(path, live_dir=None):
+    """Suivi du fichier ``path``, partagé par toutes les sessions qui le regardent."""
+    path = resolve_live_path(path, live_dir)
+    if not os.path.isfile(path):
+        raise ValueError(f"Fichier introuvable : {path}")
+    with _tails_lock:
+        if path not in _tails:
+            _tails[path] = LiveTail(path)
+        return _tails[path]
+
+
+def live_caption(tail, added):
+    """Message d'état du suivi après un rafraîchissement."""
+    rows = f"{tail.rows:,}".replace(",", " ")
+    added = f"{added:,}".replace(",", " ")
+    return f"🔴 Suivi en direct de {os.path.basename(tail.path)} : {rows} lignes ({added} nouvelles)"
@@ -0,0 +1,169 @@
+"""Pairplot pour les grands jeux de données.
+
+``sns.pairplot`` trace toutes les lignes dans chacun des k² panneaux, en
+série. Au-delà de ``PAIRPLOT_SAMPLE_ROWS`` lignes, les panneaux hors
+diagonale sont tracés à partir d'un échantillon de lignes (ou d'un
+histogramme 2D sur toutes les lignes), et les histogrammes sont calculés
+dans un groupe de processus sur tous les cœurs avant d'être assemblés en une
+seule grille. En dessous de ce seuil, ``sns.pairplot`` est utilisé tel quel.
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from startup import lazy_import
+
+# Importés au premier pairplot ; les processus de calcul des histogrammes ne les chargent pas
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+mcolors = lazy_import("matplotlib.colors")
+
+# En dessous de ce nombre de lignes, sns.pairplot est utilisé tel quel
+PAIRPLOT_SAMPLE_ROWS = 5_000
+
+# Nombre de classes par axe des histogrammes 2D
+DEFAULT_BINS_2D = 60
+
+# Nombre de cellules (lignes × colonnes) à partir duquel les histogrammes
+# sont calculés dans le groupe de processus plutôt que dans le processus courant
+PARALLEL_MIN_CELLS = 2_000_000
+
+# Hauteur d'un panneau, en pouces (celle de sns.pairplot)
+PANEL_HEIGHT = 2.5
+
+# Nombre de processus du groupe de rendu
+POOL_WORKERS = os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(max_workers=None):
+    """Groupe de processus partagé, créé au premier usage."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=max_workers or POOL_WORKERS, mp_context=context)
+        return _pool
+
+
+def _bin_index(values, edges):
+    """Classe de chaque valeur pour des classes de largeur constante (comme np.histogram)."""
+    n_bins = len(edges) - 1
+    positions = (values - edges[0]) / (edges[-1] - edges[0]) * n_bins
+    return np.clip(positions.astype(np.int64), 0, n_bins - 1)
+
+
+def _panel_counts(values, i, j, edges_i, edges_j):
+    """Histogramme d'une colonne (diagonale) ou histogramme 2D d'un couple de colonnes.
+
+    Les classes sont de largeur constante : un simple ``np.bincount`` remplace
+    ``np.histogram2d``, bien plus lent.
+    """
+    if i == j:
+        column = np.asarray(values[i])
+        return np.histogram(column[~np.isnan(column)], bins=edges_i)[0]
+    x = np.asarray(values[j])
+    y = np.asarray(values[i])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    n_x, n_y = len(edges_j) - 1, len(edges_i) - 1
+    flat = _bin_index(x[valid], edges_j) * n_y + _bin_index(y[valid], edges_i)
+    return np.bincount(flat, minlength=n_x * n_y).reshape(n_x, n_y)
+
+
+def _panel_task(path, i, j, edges_i, edges_j):
+    # Les colonnes sont lues par projection mémoire : rien n'est copié entre processus
+    values = np.load(path, mmap_mode="r")
+    return i, j, _panel_counts(values, i, j, edges_i, edges_j)
+
+
+def compute_panels(values, tasks, parallel):
+    """Calcule les histogrammes ``tasks`` = [(i, j, edges_i, edges_j), ...].
+
+    ``values`` contient une colonne par ligne (forme k × n).
+    """
+    if not parallel:
+        return {(i, j): _panel_counts(values, i, j, edges_i, edges_j) for i, j, edges_i, edges_j in tasks}
+    path = os.path.join(tempfile.gettempdir(), f"easyviz-pairplot-{uuid.uuid4().hex}.npy")
+    np.save(path, values)
+    try:
+        futures = [get_pool().submit(_panel_task, path, *task) for task in tasks]
+        return {(i, j): counts for i, j, counts in (future.result() for future in futures)}
+    finally:
+        os.remove(path)
+
+
+def _diagonal_edges(column, sample):
+    finite = column[~np.isnan(column)]
+    if len(finite) == 0:
+        return np.array([0.0, 1.0])
+    low, high = float(finite.min()), float(finite.max())
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    sample = sample[~np.isnan(sample)]
+    return np.histogram_bin_edges(sample if len(sample) else finite, bins="auto", range=(low, high))
+
+
+def pairplot_figure(data, columns, mode="sample", sample_size=PAIRPLOT_SAMPLE_ROWS,
+                    bins_2d=DEFAULT_BINS_2D, parallel=None, seed=0):
+    """Figure du pairplot de ``columns``.
+
+    ``mode`` vaut ``"sample"`` (nuages de points sur un échantillon de lignes)
+    ou ``"hist2d"`` (histogrammes 2D sur toutes les lignes). Les histogrammes
+    de la diagonale portent toujours sur toutes les lignes.
+    """
+    if len(data) <= sample_size:
+        return sns.pairplot(data[columns]).figure
+
+    k = len(columns)
+    values = np.ascontiguousarray(data[columns].to_numpy(dtype=np.float64, na_value=np.nan).T)
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(values.shape[1], sample_size, replace=False))
+    sample = values[:, sample_rows]
+
+    diag_edges = [_diagonal_edges(values[i], sample[i]) for i in range(k)]
+    grid_edges = [np.linspace(edges[0], edges[-1], bins_2d + 1) for edges in diag_edges]
+    tasks = [(i, i, diag_edges[i], diag_edges[i]) for i in range(k)]
+    if mode == "hist2d":
+        # Le panneau (j, i) est le transposé du panneau (i, j) : un seul calcul par couple
+        tasks += [(i, j, grid_edges[i], grid_edges[j]) for i in range(k) for j in range(i)]
+    if parallel is None:
+        parallel = values.size >= PARALLEL_MIN_CELLS and (os.cpu_count() or 1) > 1
+    panels = compute_panels(values, tasks, parallel)
+
+    fig, axes = plt.subplots(
+        k, k, figsize=(PANEL_HEIGHT * k, PANEL_HEIGHT * k),
+        sharex="col", sharey="row", squeeze=False
+    )
+    for i in range(k):
+        for j in range(k):
+            ax = axes[i, j]
+            if i == j:
+                # Axe jumeau : l'échelle des effectifs ne perturbe pas l'axe Y partagé de la ligne
+                diag_ax = ax.twinx()
+                diag_ax.stairs(panels[(i, i)], diag_edges[i], fill=True, color="C0", alpha=0.75)
+                diag_ax.set_yticks([])
+                diag_ax.set_ylim(bottom=0)
+                diag_ax.spines[["top", "right"]].set_visible(False)
+            elif mode == "hist2d":
+                counts = panels[(i, j)] if (i, j) in panels else panels[(j, i)].T
+                masked = np.ma.masked_equal(counts, 0)
+                norm = mcolors.LogNorm(vmin=1, vmax=max(counts.max(), 1))
+                ax.pcolormesh(grid_edges[j], grid_edges[i], masked.T, cmap="Blues", norm=norm)
+            else:
+                ax.scatter(sample[j], sample[i], s=plt.rcParams["lines.markersize"] ** 2,
+                           color="C0", edgecolor="white", linewidth=0.75)
+            ax.spines[["top", "right"]].set_visible(False)
+            if i == k - 1:
+                ax.set_xlabel(columns[j])
+            if j == 0:
+                ax.set_ylabel(columns[i])
+    fig.tight_layout()
+    return fig
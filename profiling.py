@@ -0,0 +1,325 @@
+"""Mesures de performance de chaque exécution du script (optionnelles).
+
+Activées par la variable d'environnement ``EASYVIZ_PROFILE=1`` ou par le
+paramètre d'URL ``?profile=1``. Le temps écoulé et le pic de mémoire allouée
+(``tracemalloc``) sont mesurés dans des étapes (``span``) imbriquées :
+chargement, calcul de chaque onglet, dessin des figures, encodage des images
+et des graphiques Plotly. En fin d'exécution, les étapes sont :
+
+- affichées dans un panneau repliable de la barre latérale ;
+- écrites sur une ligne JSON du journal ``easyviz.profiling`` ;
+- ajoutées aux compteurs du processus, au format texte de Prometheus,
+  téléchargeables depuis le panneau et écrits dans ``EASYVIZ_METRICS_FILE``
+  (pour le collecteur « textfile » de node_exporter).
+
+Hors mesure, ``span`` ne coûte qu'une lecture de variable locale au thread.
+Les mesures ne portent que sur le thread du script : les rendus précalculés
+en arrière-plan n'y figurent pas. ``tracemalloc`` étant global au processus,
+le pic de mémoire inclut les allocations des autres sessions simultanées.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+
+from data_cache import format_bytes
+from startup import prewarm_timings
+from store import current_session_id
+
+# Variable d'environnement qui active les mesures pour toutes les sessions
+PROFILE_ENV = "EASYVIZ_PROFILE"
+
+# Paramètre d'URL qui active les mesures pour une session (?profile=1)
+PROFILE_PARAM = "profile"
+
+# Fichier des compteurs au format Prometheus, réécrit après chaque exécution mesurée
+METRICS_FILE = os.environ.get("EASYVIZ_METRICS_FILE")
+
+# Préfixe des compteurs Prometheus
+METRICS_PREFIX = "easyviz"
+
+logger = logging.getLogger("easyviz.profiling")
+
+# Mesures de l'exécution en cours, propres au thread du script
+_local = threading.local()
+
+# Nombre d'exécutions mesurées en cours qui ont besoin de tracemalloc
+_tracing_users = 0
+_tracing_lock = threading.Lock()
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class RunProfile:
+    """Étapes mesurées pendant une exécution du script."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.spans = []
+        self._stack = []
+        self._start = time.perf_counter()
+        self.seconds = None
+        self._tracing = None
+        if trace_memory:
+            _start_tracing()
+            # Libère tracemalloc même si l'exécution est abandonnée (Stop, session fermée) :
+            # le thread du script disparaît, et ces mesures avec lui
+            self._tracing = weakref.finalize(self, _stop_tracing)
+
+    def stop_tracing(self):
+        """Rend tracemalloc (une seule fois ; sans effet si la mémoire n'est pas mesurée)."""
+        if self._tracing is not None:
+            self._tracing()
+
+    def _memory(self):
+        return tracemalloc.get_traced_memory() if self.trace_memory and tracemalloc.is_tracing() else (0, 0)
+
+    def _reset_peak(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    @contextmanager
+    def span(self, name):
+        """Mesure le bloc ``name`` (durée et pic de mémoire, étapes imbriquées comprises)."""
+        current, peak = self._memory()
+        if self._stack:
+            # Le pic déjà atteint appartient à l'étape parente
+            self._stack[-1]["high"] = max(self._stack[-1]["high"], peak)
+        self._reset_peak()
+        record = {"name": name, "depth": len(self._stack), "seconds": None, "peak_bytes": None}
+        self.spans.append(record)
+        frame = {"start": current, "high": current}
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            frame["high"] = max(frame["high"], self._memory()[1])
+            self._stack.pop()
+            if self.trace_memory:
+                record["peak_bytes"] = frame["high"] - frame["start"]
+                self._reset_peak()
+            if self._stack:
+                self._stack[-1]["high"] = max(self._stack[-1]["high"], frame["high"])
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+        return self
+
+    def table(self):
+        """Tableau des étapes, indentées selon leur imbrication."""
+        total = self.seconds or time.perf_counter() - self._start
+        return pd.DataFrame(
+            [
+                {
+                    "Étape": "\u2003" * span["depth"] + span["name"],
+                    "Durée (ms)": round(span["seconds"] * 1000, 1),
+                    "Part (%)": round(100 * span["seconds"] / total, 1) if total else 0.0,
+                    "Pic mémoire": "" if span["peak_bytes"] is None else format_bytes(span["peak_bytes"]),
+                }
+                for span in self.spans if span["seconds"] is not None
+            ],
+            columns=["Étape", "Durée (ms)", "Part (%)", "Pic mémoire"]
+        )
+
+    def log_record(self, session_id=None):
+        """Enregistrement JSON de l'exécution, pour le journal."""
+        return {
+            "event": "rerun",
+            "session": session_id,
+            "seconds": round(self.seconds, 6),
+            "spans": [
+                {
+                    "name": span["name"],
+                    "depth": span["depth"],
+                    "seconds": round(span["seconds"], 6),
+                    "peak_bytes": span["peak_bytes"],
+                }
+                for span in self.spans if span["seconds"] is not None
+            ],
+        }
+
+
+class MetricsRegistry:
+    """Compteurs cumulés du processus, au format texte de Prometheus."""
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.prefix = prefix
+        self.reruns = 0
+        self.rerun_seconds = 0.0
+        self.span_calls = {}
+        self.span_seconds = {}
+        self.span_peak_bytes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, profile):
+        with self._lock:
+            self.reruns += 1
+            self.rerun_seconds += profile.seconds
+            for span in profile.spans:
+                if span["seconds"] is None:
+                    continue
+                name = span["name"]
+                self.span_calls[name] = self.span_calls.get(name, 0) + 1
+                self.span_seconds[name] = self.span_seconds.get(name, 0.0) + span["seconds"]
+                if span["peak_bytes"] is not None:
+                    self.span_peak_bytes[name] = max(self.span_peak_bytes.get(name, 0), span["peak_bytes"])
+
+    def exposition(self):
+        """Compteurs au format d'exposition texte de Prometheus."""
+        p = self.prefix
+        with self._lock:
+            lines = [
+                f"# HELP {p}_reruns_total Exécutions du script mesurées.",
+                f"# TYPE {p}_reruns_total counter",
+                f"{p}_reruns_total {self.reruns}",
+                f"# HELP {p}_rerun_seconds_total Durée cumulée des exécutions mesurées.",
+                f"# TYPE {p}_rerun_seconds_total counter",
+                f"{p}_rerun_seconds_total {self.rerun_seconds:.6f}",
+                f"# HELP {p}_span_calls_total Nombre de passages dans chaque étape.",
+                f"# TYPE {p}_span_calls_total counter",
+            ]
+            lines += [f'{p}_span_calls_total{{span="{_label(n)}"}} {v}' for n, v in sorted(self.span_calls.items())]
+            lines += [
+                f"# HELP {p}_span_seconds_total Durée cumulée de chaque étape.",
+                f"# TYPE {p}_span_seconds_total counter",
+            ]
+            lines += [f'{p}_span_seconds_total{{span="{_label(n)}"}} {v:.6f}' for n, v in sorted(self.span_seconds.items())]
+            lines += [
+                f"# HELP {p}_span_peak_bytes Pic de mémoire allouée le plus élevé de chaque étape.",
+                f"# TYPE {p}_span_peak_bytes gauge",
+            ]
+            lines += [f'{p}_span_peak_bytes{{span="{_label(n)}"}} {v}' for n, v in sorted(self.span_peak_bytes.items())]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Écrit les compteurs dans ``path`` (remplacement atomique)."""
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            f.write(self.exposition())
+        os.replace(partial, path)
+
+
+def _label(value):
+    """Valeur d'étiquette Prometheus échappée."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+
+def _configure_logger():
+    # Streamlit ne configure que ses propres journaux : sans configuration, ces lignes seraient perdues
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+
+
+def profiling_enabled():
+    """Vrai si les mesures sont demandées (variable d'environnement ou paramètre d'URL)."""
+    if os.environ.get(PROFILE_ENV, "") not in ("", "0"):
+        return True
+    import streamlit as st
+    return st.query_params.get(PROFILE_PARAM) == "1"
+
+
+def start_run(enabled=None, trace_memory=True):
+    """Début d'une exécution du script : renvoie ses mesures, ou ``None`` si elles sont désactivées."""
+    previous = getattr(_local, "profile", None)
+    if previous is not None:
+        # Exécution précédente interrompue (st.rerun) avant finish_run()
+        previous.stop_tracing()
+    enabled = profiling_enabled() if enabled is None else enabled
+    _local.profile = RunProfile(trace_memory=trace_memory) if enabled else None
+    return _local.profile
+
+
+def current_run():
+    """Mesures de l'exécution en cours dans ce thread, ou ``None``."""
+    return getattr(_local, "profile", None)
+
+
+@contextmanager
+def span(name):
+    """Mesure le bloc ``name`` si l'exécution en cours est mesurée."""
+    profile = getattr(_local, "profile", None)
+    if profile is None:
+        yield None
+        return
+    with profile.span(name) as record:
+        yield record
+
+
+def profiled(name):
+    """Décorateur : chaque appel de la fonction est une étape ``name``."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def prewarm_caption(timings):
+    """Durées du préchauffage au démarrage (voir :mod:`startup`), en une ligne."""
+    steps = [
+        f"{label} {'échec' if seconds is None else f'{seconds * 1000:.0f} ms'}"
+        for label, seconds in dict(timings).items()
+    ]
+    return "Préchauffage : " + ", ".join(steps)
+
+
+def finish_run(session_id=None):
+    """Fin de l'exécution mesurée : journal, compteurs, puis panneau de la barre latérale."""
+    profile = getattr(_local, "profile", None)
+    _local.profile = None
+    if profile is None:
+        return None
+    profile.stop_tracing()
+    profile.finish()
+    _configure_logger()
+    session_id = current_session_id() if session_id is None else session_id
+    logger.info(json.dumps(profile.log_record(session_id), ensure_ascii=False))
+    metrics.observe(profile)
+    if METRICS_FILE:
+        metrics.write(METRICS_FILE)
+
+    import streamlit as st
+    with st.sidebar.expander("Performances de l'exécution"):
+        st.caption(f"Durée totale : {profile.seconds * 1000:.0f} ms")
+        st.dataframe(profile.table(), use_container_width=True, hide_index=True)
+        if prewarm_timings:
+            st.caption(prewarm_caption(prewarm_timings))
+        st.download_button(
+            label="Compteurs Prometheus",
+            data=metrics.exposition(),
+            file_name="easyviz_metrics.prom",
+            mime="text/plain"
+        )
+    return profile
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Rendu rastérisé des très grands nuages de points.
+
+Les points sont agrégés côté serveur sur une grille de pixels de taille fixe
+(comptage ou moyenne d'une colonne), par un binning NumPy vectorisé. Le coût
+du dessin ne dépend plus que de la taille de la grille, et non du nombre de
+lignes : la figure matplotlib produite ne contient qu'une image.
+"""
+import numpy as np
+
+from downsampling import numeric_values
+from startup import lazy_import
+
+# Importé au premier nuage rastérisé
+mcolors = lazy_import("matplotlib.colors")
+
+# Taille par défaut de la grille, en pixels (largeur, hauteur)
+DEFAULT_CANVAS = (480, 360)
+
+# Au-delà de ce nombre de lignes, le mode rastérisé est proposé par défaut
+RASTER_AUTO_ROWS = 1_000_000
+
+
+def _axis_range(values):
+    low, high = float(values.min()), float(values.max())
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    return low, high
+
+
+def _pixel_index(values, low, high, size):
+    pixels = ((values - low) / (high - low) * size).astype(np.int64)
+    return np.clip(pixels, 0, size - 1)
+
+
+def rasterize(x, y, width, height, values=None):
+    """Agrège des points sur une grille ``height`` × ``width``.
+
+    Renvoie la grille (nombre de points par pixel, ou moyenne de ``values``
+    par pixel ; ``NaN`` pour les pixels vides) et son étendue
+    ``(xmin, xmax, ymin, ymax)``.
+    """
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if values is not None:
+        valid &= ~np.isnan(values)
+    x, y = x[valid], y[valid]
+    if len(x) == 0:
+        return np.full((height, width), np.nan), (0.0, 1.0, 0.0, 1.0)
+    x_low, x_high = _axis_range(x)
+    y_low, y_high = _axis_range(y)
+    flat = _pixel_index(y, y_low, y_high, height) * width + _pixel_index(x, x_low, x_high, width)
+    counts = np.bincount(flat, minlength=width * height).reshape(height, width).astype(np.float64)
+    if values is None:
+        grid = counts
+    else:
+        sums = np.bincount(flat, weights=values[valid], minlength=width * height).reshape(height, width)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            grid = sums / counts
+    grid[counts == 0] = np.nan
+    return grid, (x_low, x_high, y_low, y_high)
+
+
+def rasterize_frame(data, x_column, y_column, value_column=None, canvas=DEFAULT_CANVAS):
+    """Grille rastérisée de ``y_column`` en fonction de ``x_column``."""
+    width, height = canvas
+    x = numeric_values(data[x_column])
+    y = numeric_values(data[y_column])
+    values = None if value_column is None else numeric_values(data[value_column])
+    return rasterize(x, y, width, height, values)
+
+
+def draw_raster(ax, grid, extent, label="Nombre de points", log_scale=True, cmap="viridis"):
+    """Dessine une grille rastérisée sur ``ax`` avec sa barre de couleurs."""
+    norm = None
+    if log_scale and np.nanmax(grid, initial=0) > 1:
+        norm = mcolors.LogNorm(vmin=1, vmax=np.nanmax(grid))
+    image = ax.imshow(
+        grid, origin="lower", extent=extent, aspect="auto",
+        interpolation="nearest", cmap=cmap, norm=norm
+    )
+    ax.figure.colorbar(image, ax=ax, label=label)
+    return image
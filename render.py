@@ -0,0 +1,140 @@
+"""Rendu unique et cache des graphiques matplotlib/seaborn.
+
+Chaque figure est dessinée une seule fois : l'image PNG produite sert à la
+fois à l'affichage et au téléchargement, et les autres formats (SVG, PDF) ne
+sont générés qu'au clic sur le bouton de téléchargement, à partir de la même
+figure. La figure est retirée de pyplot dès son rendu, et libérée quand elle
+quitte le cache.
+
+Les rendus sont conservés en mémoire, indexés par (jeu de données, type de
+graphique, colonnes, paramètres) : un onglet dont les paramètres n'ont pas
+changé est servi directement depuis le cache.
+"""
+import threading
+from functools import partial
+
+import numpy as np
+
+from charts import download_plot
+from data_cache import LRUCache
+from profiling import span
+from startup import lazy_import
+
+# pyplot n'est importé qu'au premier rendu
+plt = lazy_import("matplotlib.pyplot")
+
+# Budget mémoire par défaut du cache des graphiques (256 Mo)
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+# Formats de téléchargement proposés et leur type MIME
+EXPORT_FORMATS = ["png", "svg", "pdf"]
+EXPORT_MIME_TYPES = {"png": "image/png", "svg": "image/svg+xml", "pdf": "application/pdf"}
+
+
+def _figure_nbytes(fig):
+    """Estimation de la mémoire des données tracées dans une figure."""
+    nbytes = 0
+    for artist in fig.findobj():
+        for getter in ("get_offsets", "get_xydata", "get_array"):
+            values = getattr(artist, getter, None)
+            if values is None:
+                continue
+            try:
+                values = values()
+            except (TypeError, ValueError, AttributeError):
+                continue
+            if isinstance(values, np.ndarray):
+                nbytes += values.nbytes
+    return nbytes
+
+
+class RenderedFigure:
+    """Figure dessinée une seule fois, exportable dans plusieurs formats."""
+
+    def __init__(self, fig):
+        # Retirée de pyplot : seule cette instance garde la figure en vie
+        plt.close(fig)
+        self._figure = fig
+        self._exports = {"png": download_plot(fig).getvalue()}
+        self._lock = threading.Lock()
+        self.nbytes = len(self._exports["png"]) + _figure_nbytes(fig)
+        # Nombre de lignes tracées, noté par decimated_figure (None sinon)
+        self.rows = getattr(fig, "easyviz_rows", None)
+
+    @property
+    def png(self):
+        return self._exports["png"]
+
+    def export(self, file_format):
+        """Contenu du graphique dans ``file_format`` (généré au premier appel)."""
+        with self._lock:
+            if file_format not in self._exports:
+                if self._figure is None:
+                    raise RuntimeError("La figure a été libérée ; relancez l'affichage du graphique.")
+                self._exports[file_format] = download_plot(self._figure, f"graphique.{file_format}").getvalue()
+            return self._exports[file_format]
+
+    def exporter(self, file_format):
+        """Fonction sans argument pour ``st.download_button(data=...)`` : export différé au clic."""
+        return partial(self.export, file_format)
+
+    def release(self):
+        """Libère la figure ; les exports déjà produits restent disponibles."""
+        with self._lock:
+            if self._figure is not None:
+                self._figure.clear()
+                self._figure = None
+
+
+def decimated_figure(data, decimate, draw):
+    """Figure ``draw(lignes)`` des lignes de ``data`` retenues par ``decimate`` (toutes si ``None``).
+
+    Passée à :func:`cached_render`, la décimation n'a lieu qu'en l'absence du
+    graphique en cache ; le nombre de lignes tracées reste disponible dans
+    ``RenderedFigure.rows``.
+    """
+    plot_data = data if decimate is None else decimate(data)
+    fig = draw(plot_data)
+    fig.easyviz_rows = len(plot_data)
+    return fig
+
+
+figure_cache = LRUCache(max_bytes=DEFAULT_MAX_BYTES, on_evict=RenderedFigure.release)
+
+# pyplot n'est pas thread-safe : un seul dessin à la fois (sessions, précalcul en arrière-plan)
+_render_lock = threading.RLock()
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def figure_key(dataset_key, chart, *params):
+    """Clé de cache d'un graphique : jeu de données, type et paramètres."""
+    return (dataset_key, chart) + tuple(_freeze(param) for param in params)
+
+
+def cached_render(key, build, cache=None):
+    """Rendu du graphique ``key``, dessiné par ``build()`` s'il n'est pas en cache.
+
+    ``build`` renvoie une figure matplotlib. En cas d'erreur pendant le dessin,
+    les figures ouvertes par ``build`` sont fermées.
+    """
+    cache = figure_cache if cache is None else cache
+    rendered = cache.get(key)
+    if rendered is None:
+        with _render_lock:
+            # Le même graphique a pu être dessiné pendant l'attente du verrou
+            rendered = cache.get(key) if key in cache else None
+            if rendered is None:
+                open_figures = set(plt.get_fignums())
+                try:
+                    with span(f"dessin {key[1]}"):
+                        rendered = RenderedFigure(build())
+                finally:
+                    for number in set(plt.get_fignums()) - open_figures:
+                        plt.close(number)
+                cache.put(key, rendered, nbytes=rendered.nbytes)
+    return rendered
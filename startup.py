@@ -0,0 +1,108 @@
+"""Démarrage rapide : imports différés et préchauffage en arrière-plan.
+
+Importer ``matplotlib.pyplot``, ``seaborn`` et ``plotly.express`` (et
+construire le cache des polices de matplotlib) prend plusieurs secondes. Les
+modules de l'application les importent avec :func:`lazy_import` : l'import
+n'a lieu qu'au premier attribut lu, c'est-à-dire au premier graphique, et la
+page de téléversement s'affiche sans les attendre.
+
+Le backend matplotlib est fixé à ``Agg`` (aucun affichage, pas de recherche
+d'un backend interactif au démarrage). :func:`start_prewarm` importe ensuite
+ces bibliothèques et dessine une première figure dans un thread
+d'arrière-plan, une fois par processus (désactivable avec
+``EASYVIZ_PREWARM=0``). Le groupe de processus du pairplot n'est pas
+préchauffé : il démarre au premier grand pairplot (voir pairplot.py).
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+# Backend matplotlib non interactif, fixé avant tout import de matplotlib
+MPL_BACKEND = "Agg"
+os.environ.setdefault("MPLBACKEND", MPL_BACKEND)
+
+# Bibliothèques importées par le préchauffage, dans l'ordre
+PREWARM_MODULES = ["matplotlib.pyplot", "seaborn", "plotly.express"]
+
+# Préchauffage au démarrage (EASYVIZ_PREWARM=0 pour le désactiver)
+PREWARM = os.environ.get("EASYVIZ_PREWARM", "1") != "0"
+
+_prewarm_thread = None
+_prewarm_lock = threading.Lock()
+
+# Durée de chaque étape du préchauffage, en secondes (None en cas d'échec),
+# affichée dans le panneau des performances (voir profiling.finish_run)
+prewarm_timings = {}
+
+
+def _import(name):
+    if name.startswith("matplotlib") and "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        matplotlib.use(MPL_BACKEND)
+    return importlib.import_module(name)
+
+
+class LazyModule:
+    """Module importé à la première lecture d'un de ses attributs."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = _import(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "importé" if self._module is not None else "non importé"
+        return f"<module différé {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Module ``name``, importé seulement à son premier usage."""
+    return LazyModule(name)
+
+
+def _warm_fonts():
+    # Le premier dessin construit le cache des polices et charge le moteur de rendu.
+    # Figure hors de pyplot : aucune figure n'apparaît dans plt.get_fignums(),
+    # que render.cached_render compare pendant un rendu concurrent.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure()
+    fig.subplots().set_title("EasyViz")
+    FigureCanvasAgg(fig).draw()
+
+
+def prewarm():
+    """Importe les bibliothèques de graphiques et dessine une première figure ; renvoie les durées."""
+    steps = [(name, lambda name=name: _import(name)) for name in PREWARM_MODULES]
+    steps.append(("polices", _warm_fonts))
+    for label, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            # Le préchauffage n'est qu'une optimisation : l'erreur réapparaîtra au premier graphique
+            prewarm_timings[label] = None
+            continue
+        prewarm_timings[label] = time.perf_counter() - start
+    return prewarm_timings
+
+
+def start_prewarm():
+    """Lance :func:`prewarm` en arrière-plan, une seule fois par processus."""
+    global _prewarm_thread
+    if not PREWARM:
+        return None
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=prewarm, name="easyviz-prewarm", daemon=True)
+            _prewarm_thread.start()
+    return _prewarm_thread
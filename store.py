@@ -0,0 +1,191 @@
+"""Registre des jeux de données partagé par toutes les sessions du serveur.
+
+Les jeux de données sont conservés une seule fois par processus dans
+``dataset_cache``, indexés par l'empreinte de leur contenu : deux analystes qui
+téléversent le même export partagent la même copie. Ce registre note en plus
+quelle session utilise quel jeu de données et quand, pour :
+
+- afficher la mémoire utilisée par session et au total ;
+- retirer du cache les jeux de données qu'aucune session n'a utilisés depuis
+  ``IDLE_TIMEOUT_SECONDS`` ;
+- refuser, avec un message explicite, les fichiers plus gros que
+  ``MAX_UPLOAD_BYTES`` ou de plus de ``MAX_ROWS`` lignes.
+
+La vue d'administration (mémoire de toutes les sessions) n'est accessible
+qu'avec le jeton ``EASYVIZ_ADMIN_TOKEN``, passé en paramètre d'URL
+``?admin=<jeton>`` ; sans cette variable, elle est désactivée.
+
+Les limites se règlent par variables d'environnement (voir les constantes).
+"""
+import hmac
+import os
+import threading
+import time
+
+import pandas as pd
+
+from data_cache import dataset_cache, format_bytes
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# Taille maximale d'un fichier téléversé (EASYVIZ_MAX_UPLOAD_BYTES, 1 Go par défaut)
+MAX_UPLOAD_BYTES = _env_int("EASYVIZ_MAX_UPLOAD_BYTES", 1024 ** 3)
+
+# Nombre maximal de lignes d'un jeu de données (EASYVIZ_MAX_ROWS, 50 millions par défaut)
+MAX_ROWS = _env_int("EASYVIZ_MAX_ROWS", 50_000_000)
+
+# Durée sans utilisation après laquelle un jeu de données est retiré du cache
+# (EASYVIZ_IDLE_TIMEOUT_SECONDS, 30 minutes par défaut)
+IDLE_TIMEOUT_SECONDS = _env_int("EASYVIZ_IDLE_TIMEOUT_SECONDS", 30 * 60)
+
+# Jeton d'accès à la vue d'administration (EASYVIZ_ADMIN_TOKEN ; désactivée par défaut)
+ADMIN_TOKEN = os.environ.get("EASYVIZ_ADMIN_TOKEN") or None
+
+# Session utilisée hors d'un serveur Streamlit (scripts, tests)
+LOCAL_SESSION = "local"
+
+
+def is_admin(token, admin_token=None):
+    """Vrai si ``token`` (paramètre d'URL ``admin``) ouvre la vue d'administration."""
+    admin_token = ADMIN_TOKEN if admin_token is None else admin_token
+    if not admin_token or not token:
+        return False
+    # Comparaison en temps constant : le jeton ne se devine pas caractère par caractère
+    return hmac.compare_digest(token.encode(), admin_token.encode())
+
+
+def check_upload_size(uploaded_file, max_bytes=None):
+    """Lève ``ValueError`` si le fichier dépasse la taille autorisée."""
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        size = len(uploaded_file.getvalue())
+    if size > max_bytes:
+        raise ValueError(
+            f"Fichier trop volumineux : {format_bytes(size)} (maximum autorisé : {format_bytes(max_bytes)})."
+        )
+
+
+def check_row_count(rows, max_rows=None):
+    """Lève ``ValueError`` si le jeu de données dépasse le nombre de lignes autorisé."""
+    max_rows = MAX_ROWS if max_rows is None else max_rows
+    if rows > max_rows:
+        raise ValueError(f"Jeu de données trop long : plus de {max_rows:,} lignes (maximum autorisé).")
+
+
+def current_session_id():
+    """Identifiant de la session Streamlit en cours (``LOCAL_SESSION`` hors serveur)."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return LOCAL_SESSION
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return LOCAL_SESSION if ctx is None else ctx.session_id
+
+
+class DatasetStore:
+    """Utilisation des jeux de données d'un cache par les sessions."""
+
+    def __init__(self, cache, idle_timeout=IDLE_TIMEOUT_SECONDS):
+        self.cache = cache
+        self.idle_timeout = idle_timeout
+        # Dernier accès à chaque jeu de données, toutes sessions confondues et par session
+        self._last_used = {}
+        self._sessions = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def on_evict(self, callback):
+        """Appelle ``callback(key)`` pour chaque jeu de données retiré pour inactivité.
+
+        Permet de libérer ce qui dépend du jeu de données hors du cache
+        (moteurs hors mémoire, copies sur disque...).
+        """
+        with self._lock:
+            self._listeners.append(callback)
+        return callback
+
+    def active_keys(self):
+        """Jeux de données utilisés depuis moins de ``idle_timeout`` secondes."""
+        with self._lock:
+            return list(self._last_used)
+
+    def touch(self, key, session_id=None, now=None):
+        """Note l'utilisation du jeu de données ``key`` par une session, puis évince les inactifs."""
+        session_id = current_session_id() if session_id is None else session_id
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_used[key] = now
+            self._sessions.setdefault(session_id, {})[key] = now
+        self.evict_idle(now)
+
+    def evict_idle(self, now=None):
+        """Retire du cache les jeux de données inutilisés depuis ``idle_timeout`` secondes."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Un jeu de données mis en cache sans passer par touch() a droit au même délai
+            for key in self.cache.keys():
+                self._last_used.setdefault(key, now)
+            idle = [key for key, last in self._last_used.items() if now - last > self.idle_timeout]
+            for key in idle:
+                del self._last_used[key]
+            for session_id in list(self._sessions):
+                used = self._sessions[session_id]
+                for key in [key for key in used if key not in self._last_used]:
+                    del used[key]
+                if not used:
+                    del self._sessions[session_id]
+        with self._lock:
+            listeners = list(self._listeners)
+        for key in idle:
+            self.cache.pop(key)
+            for callback in listeners:
+                callback(key)
+        return idle
+
+    def usage(self, now=None):
+        """Tableaux (jeux de données, sessions) de la mémoire utilisée."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last_used = dict(self._last_used)
+            sessions = {session_id: dict(used) for session_id, used in self._sessions.items()}
+        sizes = {key: self.cache.nbytes(key) for key in self.cache.keys()}
+        datasets = pd.DataFrame(
+            [
+                {
+                    "Jeu de données": key[:12],
+                    "Mémoire": format_bytes(nbytes),
+                    "Sessions": sum(key in used for used in sessions.values()),
+                    "Inutilisé depuis (s)": round(now - last_used.get(key, now)),
+                }
+                for key, nbytes in sizes.items()
+            ],
+            columns=["Jeu de données", "Mémoire", "Sessions", "Inutilisé depuis (s)"]
+        )
+        sessions = pd.DataFrame(
+            [
+                {
+                    "Session": session_id[:8],
+                    "Jeux de données": len(used),
+                    "Mémoire": format_bytes(sum(sizes.get(key, 0) for key in used)),
+                    "Inactive depuis (s)": round(now - max(used.values())),
+                }
+                for session_id, used in sessions.items()
+            ],
+            columns=["Session", "Jeux de données", "Mémoire", "Inactive depuis (s)"]
+        )
+        return datasets, sessions
+
+
+dataset_store = DatasetStore(dataset_cache)
+
+
+def memory_caption(caches):
+    """Mémoire totale des caches ``{libellé: cache}``, à afficher dans la vue d'administration."""
+    parts = [f"{label} : {format_bytes(cache.stats()['bytes'])}" for label, cache in caches.items()]
+    total = sum(cache.stats()["bytes"] for cache in caches.values())
+    return f"Mémoire totale : {format_bytes(total)} ({', '.join(parts)})"
\ No newline at end of file
@@ -0,0 +1,317 @@
+"""Statistiques descriptives calculées bloc par bloc.
+
+Remplace ``data.describe()``, qui trie chaque colonne numérique pour calculer
+ses quantiles à chaque affichage. Ici, chaque bloc de lignes met à jour :
+
+- effectif, moyenne, variance, minimum et maximum, en une passe vectorisée
+  (formules de fusion de Chan) ;
+- un sketch de quantiles KLL par colonne numérique ;
+- le nombre de valeurs manquantes et une estimation HyperLogLog du nombre de
+  valeurs distinctes, pour toutes les colonnes.
+
+Tous ces accumulateurs se fusionnent : le résumé peut être construit pendant
+la lecture en flux d'un fichier, puis il est conservé en cache par jeu de
+données. Les quantiles sont exacts tant qu'une colonne compte au plus
+``KLL_K`` valeurs.
+
+Pour un DataFrame déjà entièrement en mémoire, :func:`summarize` n'utilise
+pas les sketches : chaque colonne est traitée d'un seul tenant, avec des
+quantiles exacts obtenus par sélection partielle (``np.quantile``, sans tri
+complet).
+"""
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_cache import LRUCache
+
+# Taille du sketch KLL : erreur de rang de l'ordre de 1 / KLL_K
+KLL_K = 1_000
+
+# Précision HyperLogLog : 2 ** 12 registres, erreur relative d'environ 1,6 %
+HLL_PRECISION = 12
+
+# Rangs possibles d'un hachage (calculés sur 32 bits : de 1 à 33)
+RANK_SLOTS = 34
+
+# Nombre de lignes par bloc pour un jeu de données déjà en mémoire
+DEFAULT_CHUNKSIZE = 200_000
+
+# Budget mémoire du cache des résumés (32 Mo)
+DEFAULT_MAX_BYTES = 32 * 1024 ** 2
+
+QUANTILES = [0.25, 0.5, 0.75]
+SUMMARY_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max", "nulls", "distinct (≈)"]
+
+
+class QuantileSketch:
+    """Sketch de quantiles KLL (Karnin, Lang, Liberty), fusionnable.
+
+    Les valeurs du niveau ``h`` représentent chacune ``2 ** h`` valeurs
+    d'origine. Un niveau plein est trié, puis une valeur sur deux (paires ou
+    impaires, au hasard) passe au niveau supérieur.
+    """
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Les niveaux bas, de faible poids, sont plus petits
+        depth = len(self.levels) - 1 - level
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _add(self, level, items):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], items])
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                odd = len(items) % 2
+                self.levels[level] = items[len(items) - odd:]
+                self._add(level + 1, items[self._rng.integers(2):len(items) - odd:2])
+            level += 1
+
+    def update(self, values):
+        """Ajoute des valeurs (sans ``NaN``)."""
+        m = len(values)
+        if m == 0:
+            return self
+        self.n += m
+        level = math.ceil(math.log2(m / self.k)) if m > self.k else 0
+        if level:
+            # Un gros bloc entre directement à son niveau : une valeur de rang
+            # sur 2 ** level, comme après ``level`` compactions successives
+            stride = 1 << level
+            values = np.sort(values)[self._rng.integers(stride)::stride]
+        self._add(level, values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        self.n += other.n
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Quantiles ``qs`` (interpolation linéaire, comme pandas)."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        if len(self.levels) == 1:
+            # Aucune compaction : toutes les valeurs sont là, quantiles exacts
+            return np.interp(qs * (len(items) - 1), np.arange(len(items)), items)
+        # Fonction de répartition inverse : une valeur répétée reste exacte
+        cumulative = np.cumsum(weights)
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side="right")
+        return items[np.minimum(positions, len(items) - 1)]
+
+    @property
+    def nbytes(self):
+        return sum(items.nbytes for items in self.levels)
+
+
+def _rank(values, bits):
+    """Position du premier bit à 1 parmi les ``bits`` bits de poids fort (``bits + 1`` s'ils sont tous nuls)."""
+    top = (values >> np.uint64(64 - bits)).astype(np.float64)
+    # Entiers de moins de 53 bits : frexp donne exactement leur nombre de bits
+    return bits + 1 - np.frexp(top)[1]
+
+
+class CardinalitySketch:
+    """Estimation HyperLogLog du nombre de valeurs distinctes, fusionnable."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, column):
+        """Ajoute les valeurs non manquantes d'une colonne (Series)."""
+        column = column.dropna()
+        if len(column) == 0:
+            return self
+        if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            # 1 et 1.0 doivent avoir le même hachage d'un bloc à l'autre
+            column = column.astype(np.float64)
+        hashes = pd.util.hash_pandas_object(column, index=False).to_numpy()
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # Rang calculé sur les 32 bits suivants : suffisant jusqu'à des milliards de valeurs
+        rank = _rank(hashes << p, 32).astype(np.intp)
+        # Rang maximal par registre, sans np.maximum.at (lent) : table registre × rang des rangs vus
+        seen = np.zeros((len(self.registers), RANK_SLOTS), dtype=bool)
+        seen[index, rank] = True
+        highest = RANK_SLOTS - 1 - np.argmax(seen[:, ::-1], axis=1)
+        np.maximum(self.registers, np.where(seen.any(axis=1), highest, 0).astype(np.uint8), out=self.registers)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            # Correction des petites cardinalités (comptage linéaire)
+            return m * math.log(m / empty)
+        return raw
+
+
+class SummaryAccumulator:
+    """Statistiques descriptives d'un jeu de données, mises à jour bloc par bloc."""
+
+    def __init__(self):
+        self.columns = None
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def _start(self, columns, numeric_columns):
+        self.columns = list(columns)
+        self.numeric_columns = list(numeric_columns)
+        k = len(self.numeric_columns)
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.minimum = np.full(k, np.inf)
+        self.maximum = np.full(k, -np.inf)
+        self.quantile_sketches = [QuantileSketch() for _ in range(k)]
+        self.nulls = pd.Series(0, index=self.columns, dtype=np.int64)
+        self.distinct = {column: CardinalitySketch() for column in self.columns}
+        # Colonnes numériques dont un bloc ultérieur contient du texte
+        self.demoted = set()
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum):
+        # Formules de fusion de Chan et al. pour la moyenne et la variance
+        total = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = self.m2 + m2 + np.where(total > 0, delta ** 2 * self.count * count / total, 0.0)
+        self.count = total
+        self.minimum = np.fmin(self.minimum, minimum)
+        self.maximum = np.fmax(self.maximum, maximum)
+
+    def update(self, chunk):
+        """Ajoute un bloc de lignes (DataFrame)."""
+        with self._lock:
+            if self.columns is None:
+                self._start(chunk.columns, chunk.select_dtypes(include="number").columns)
+            self.rows += len(chunk)
+            self.nulls = self.nulls.add(chunk.isna().sum(), fill_value=0).astype(np.int64)
+            for column in self.columns:
+                self.distinct[column].update(chunk[column])
+            numeric = [
+                i for i, column in enumerate(self.numeric_columns)
+                if column not in self.demoted and pd.api.types.is_numeric_dtype(chunk[column])
+            ]
+            for i, column in enumerate(self.numeric_columns):
+                if i not in numeric:
+                    self.demoted.add(column)
+            values = np.full((len(chunk), len(self.numeric_columns)), np.nan)
+            if numeric:
+                selected = [self.numeric_columns[i] for i in numeric]
+                values[:, numeric] = chunk[selected].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            count = valid.sum(axis=0)
+            filled = np.where(valid, values, 0.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(count > 0, filled.sum(axis=0) / count, 0.0)
+            m2 = (np.where(valid, values - mean, 0.0) ** 2).sum(axis=0)
+            minimum = np.where(valid, values, np.inf).min(axis=0, initial=np.inf)
+            maximum = np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf)
+            self._merge_moments(count, mean, m2, minimum, maximum)
+            for i in numeric:
+                self.quantile_sketches[i].update(values[valid[:, i], i])
+        return self
+
+    def merge(self, other):
+        """Fusionne le résumé d'autres lignes du même jeu de données."""
+        if other.columns is None:
+            return self
+        with self._lock:
+            if self.columns is None:
+                self._start(other.columns, other.numeric_columns)
+            self.rows += other.rows
+            self.nulls = self.nulls.add(other.nulls, fill_value=0).astype(np.int64)
+            self.demoted |= other.demoted
+            self._merge_moments(other.count, other.mean, other.m2, other.minimum, other.maximum)
+            for sketch, other_sketch in zip(self.quantile_sketches, other.quantile_sketches):
+                sketch.merge(other_sketch)
+            for column, sketch in other.distinct.items():
+                self.distinct[column].merge(sketch)
+        return self
+
+    def result(self):
+        """Tableau des statistiques : une colonne par colonne du jeu de données."""
+        with self._lock:
+            if self.columns is None:
+                return pd.DataFrame(index=SUMMARY_INDEX)
+            table = pd.DataFrame(np.nan, index=SUMMARY_INDEX, columns=self.columns)
+            table.loc["count"] = self.rows - self.nulls.reindex(self.columns).to_numpy()
+            table.loc["nulls"] = self.nulls.reindex(self.columns).to_numpy()
+            table.loc["distinct (≈)"] = [round(self.distinct[column].estimate()) for column in self.columns]
+            for i, column in enumerate(self.numeric_columns):
+                if column in self.demoted or self.count[i] == 0:
+                    continue
+                std = math.sqrt(self.m2[i] / (self.count[i] - 1)) if self.count[i] > 1 else np.nan
+                quantiles = self.quantile_sketches[i].quantiles(QUANTILES)
+                table[column] = [self.count[i], self.mean[i], std, self.minimum[i], *quantiles,
+                                 self.maximum[i], table.at["nulls", column], table.at["distinct (≈)", column]]
+            return table
+
+
+def summarize(data):
+    """Résumé d'un DataFrame en mémoire, même tableau que :meth:`SummaryAccumulator.result`."""
+    columns = list(data.columns)
+    if not columns:
+        return pd.DataFrame(index=SUMMARY_INDEX)
+    table = pd.DataFrame(np.nan, index=SUMMARY_INDEX, columns=columns)
+    numeric_columns = set(data.select_dtypes(include="number").columns)
+    for column in columns:
+        series = data[column]
+        nulls = int(series.isna().sum())
+        table.at["count", column] = len(series) - nulls
+        table.at["nulls", column] = nulls
+        if column not in numeric_columns:
+            # Texte et catégories : le comptage exact (factorisation) coûte moins que le hachage
+            table.at["distinct (≈)", column] = series.nunique()
+            continue
+        table.at["distinct (≈)", column] = round(CardinalitySketch().update(series).estimate())
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        if nulls:
+            values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            continue
+        mean = values.mean()
+        std = math.sqrt(np.dot(values - mean, values - mean) / (n - 1)) if n > 1 else np.nan
+        low, *quantiles, high = np.quantile(values, [0.0, *QUANTILES, 1.0])
+        table[column] = [n, mean, std, low, *quantiles, high, nulls, table.at["distinct (≈)", column]]
+    return table
+
+
+summary_cache = LRUCache(max_bytes=DEFAULT_MAX_BYTES)
+
+
+def dataset_summary(key, data, cache=None):
+    """Résumé du jeu de données ``key``, calculé une seule fois."""
+    cache = summary_cache if cache is None else cache
+    return cache.get_or_load(key, lambda: summarize(data))
\ No newline at end of file
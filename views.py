@@ -0,0 +1,72 @@
+"""Onglets paresseux : seul l'onglet affiché calcule ses graphiques.
+
+Par défaut, ``st.tabs`` exécute le contenu de tous les onglets à chaque
+exécution du script : le pairplot et la heatmap sont recalculés même quand
+seul l'histogramme est regardé. Ici, les onglets suivent l'onglet actif
+(``on_change="rerun"``) et chaque onglet masqué ne crée que ses widgets, qui
+gardent ainsi leur valeur, sans rien calculer.
+
+Les graphiques des onglets masqués peuvent être précalculés en arrière-plan
+dans le cache des graphiques : ils s'affichent alors immédiatement à
+l'ouverture de l'onglet.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from render import cached_render, figure_cache
+
+# Clé de l'onglet actif dans st.session_state
+VIEW_KEY = "active_view"
+
+# Un seul rendu en arrière-plan à la fois : il ne concurrence pas l'onglet affiché
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def lazy_tabs(labels, key=VIEW_KEY):
+    """Onglets qui relancent le script au changement d'onglet et exposent ``tab.open``."""
+    return st.tabs(labels, key=key, on_change="rerun")
+
+
+def is_visible(tab):
+    """Vrai si l'onglet est affiché (ou si les onglets ne suivent pas l'onglet actif)."""
+    return tab.open is not False
+
+
+def _prefetch_job(key, build, cache):
+    try:
+        cached_render(key, build, cache=cache)
+    except Exception:
+        # Le même rendu sera retenté, erreur comprise, à l'ouverture de l'onglet
+        pass
+    finally:
+        with _pending_lock:
+            _pending.discard(key)
+
+
+def prefetch(key, build, cache=None):
+    """Lance en arrière-plan le rendu du graphique ``key`` s'il n'est ni en cache ni déjà prévu."""
+    cache = figure_cache if cache is None else cache
+    if key in cache:
+        return
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    _prefetch_pool.submit(_prefetch_job, key, build, cache)
+
+
+def render_view(tab, key, build, prefetch_hidden=False):
+    """Rendu du graphique d'un onglet, ou ``None`` si l'onglet est masqué.
+
+    Avec ``prefetch_hidden``, le graphique d'un onglet masqué est précalculé
+    en arrière-plan.
+    """
+    if is_visible(tab):
+        return cached_render(key, build)
+    if prefetch_hidden:
+        prefetch(key, build)
+    return None
\ No newline at end of file
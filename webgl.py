@@ -0,0 +1,61 @@
+"""Rendu SVG ou WebGL des graphiques Plotly.
+
+Une trace SVG (``scatter``) crée un élément du DOM par point : au-delà de
+quelques dizaines de milliers de points, le graphique cesse d'être fluide.
+Une trace WebGL (``scattergl``) dessine les points sur le GPU. En mode
+« auto », le rendu passe en WebGL au-delà d'un seuil de lignes réglable.
+
+Les colonnes tracées sont converties en tableaux numpy de flottants (float32
+quand la précision le permet) : Plotly les transmet au navigateur en
+tableaux binaires encodés en base64 plutôt qu'en listes de nombres JSON.
+"""
+import numpy as np
+import pandas as pd
+
+from downsampling import numeric_values
+
+# Modes de rendu proposés pour chaque graphique
+RENDER_MODES = ["auto", "svg", "webgl"]
+
+# Libellés des modes de rendu
+RENDER_MODE_LABELS = {"auto": "Automatique", "svg": "SVG", "webgl": "WebGL"}
+
+# Nombre de lignes au-delà duquel le mode « auto » passe en WebGL
+WEBGL_AUTO_ROWS = 10_000
+
+
+def resolve_render_mode(mode, rows, threshold=WEBGL_AUTO_ROWS):
+    """Mode de rendu effectif (``"svg"`` ou ``"webgl"``) pour ``rows`` points."""
+    if mode == "auto":
+        return "webgl" if rows > threshold else "svg"
+    return mode
+
+
+def compact_floats(values):
+    """float32 si la précision perdue reste négligeable à l'échelle de l'axe, sinon float64."""
+    if len(values) == 0:
+        return values.astype(np.float32)
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return values.astype(np.float32)
+    low, high = float(finite.min()), float(finite.max())
+    span = high - low if high > low else 1.0
+    # float32 garde ~7 chiffres : erreur < 1/1000 de l'étendue tant que |v| < 10 000 × étendue
+    if max(abs(low), abs(high)) <= span * 1e4:
+        return values.astype(np.float32)
+    return values
+
+
+def binary_columns(data, columns):
+    """Colonnes ``columns`` de ``data``, les numériques en tableaux de flottants compacts.
+
+    Les autres colonnes (texte, dates) sont reprises telles quelles.
+    """
+    result = {}
+    for column in dict.fromkeys(column for column in columns if column is not None):
+        values = data[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            result[column] = compact_floats(numeric_values(values))
+        else:
+            result[column] = values.to_numpy()
+    return pd.DataFrame(result)
\ No newline at end of file